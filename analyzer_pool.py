@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def create_pose():
+    import mediapipe as mp
+
+    return mp.solutions.pose.Pose(
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+        model_complexity=1
+    )
+
+
+def create_face_mesh(max_num_faces=1):
+    import mediapipe as mp
+
+    return mp.solutions.face_mesh.FaceMesh(
+        max_num_faces=max_num_faces, refine_landmarks=True,
+        min_detection_confidence=0.6, min_tracking_confidence=0.6
+    )
+
+
+def create_face_cascade():
+    return cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+
+class ModelBundle:
+    # The expensive, stateless-between-sessions pieces of an analyzer
+    def __init__(self, use_microphone=True):
+        self.pose = create_pose()
+        self.face_mesh = create_face_mesh()
+        self.face_cascade = create_face_cascade()
+        self.audio = None
+        if use_microphone:
+            import pyaudio
+
+            self.audio = pyaudio.PyAudio()
+        self.sessions = 0
+        self.warm = False
+
+    def warm_up(self, classify=None, width=640, height=480):
+        # The first process() call allocates the graph's buffers; pay for it before a session starts
+        blank = np.zeros((height, width, 3), dtype=np.uint8)
+        self.pose.process(blank)
+        self.face_mesh.process(blank)
+        if classify is not None:
+            classify(np.zeros((48, 48, 3), dtype=np.uint8))
+        self.reset()
+        self.warm = True
+
+    def reset(self):
+        # Drop MediaPipe's tracking state so the next session starts from detection, not from
+        # the previous student's landmarks
+        self.pose.reset()
+        self.face_mesh.reset()
+
+    def close(self):
+        self.pose.close()
+        self.face_mesh.close()
+        if self.audio is not None:
+            self.audio.terminate()
+            self.audio = None
+
+
+class AnalyzerPool:
+    def __init__(self, size=2, max_size=None, use_microphone=True, classify=None, bundle_factory=None):
+        self.size = size
+        self.max_size = max(size, max_size or size)
+        self.classify = classify
+        self.bundle_factory = bundle_factory or (lambda: ModelBundle(use_microphone=use_microphone))
+        self.idle = queue.LifoQueue()  # Most recently used bundle first; its caches are hottest
+        self.lock = threading.Lock()
+        self.created = 0
+        self.checked_out = 0
+        self.cold_starts = 0
+        self.closed = False
+        self.warmup_thread = None
+        self.warmup_seconds = 0.0
+
+    def _create(self):
+        bundle = self.bundle_factory()
+        bundle.warm_up(self.classify)
+        return bundle
+
+    def prewarm(self, background=True):
+        if background:
+            self.warmup_thread = threading.Thread(target=self.prewarm, args=(False,), daemon=True)
+            self.warmup_thread.start()
+            return
+
+        start = time.perf_counter()
+        while True:
+            with self.lock:
+                if self.closed or self.created >= self.size:
+                    break
+                self.created += 1
+            try:
+                self.idle.put(self._create())
+            except Exception as e:
+                with self.lock:
+                    self.created -= 1
+                print(f"Error warming up analyzer models: {e}")
+                break
+        self.warmup_seconds = time.perf_counter() - start
+        print(f"Analyzer pool ready: {self.idle.qsize()} bundles in {self.warmup_seconds:.1f}s")
+
+    def acquire(self, timeout=30.0):
+        try:
+            bundle = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                grow = self.created < self.max_size
+                if grow:
+                    self.created += 1
+            if grow:
+                # Pool exhausted: build one now rather than make the session wait
+                try:
+                    bundle = self._create()
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+                with self.lock:
+                    self.cold_starts += 1
+            else:
+                bundle = self.idle.get(timeout=timeout)
+
+        with self.lock:
+            self.checked_out += 1
+        bundle.sessions += 1
+        return bundle
+
+    def release(self, bundle):
+        with self.lock:
+            self.checked_out -= 1
+            closed = self.closed
+        if closed:
+            bundle.close()
+            return
+        try:
+            bundle.reset()
+        except Exception as e:
+            # A bundle that cannot be reset is not safe to hand to another session
+            print(f"Discarding analyzer models: {e}")
+            with self.lock:
+                self.created -= 1
+            bundle.close()
+            return
+        self.idle.put(bundle)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'max_size': self.max_size,
+                'created': self.created,
+                'idle': self.idle.qsize(),
+                'checked_out': self.checked_out,
+                'cold_starts': self.cold_starts,
+                'warmup_seconds': self.warmup_seconds
+            }
@@ -1,53 +1,98 @@
 import firebase_admin
 from firebase_admin import credentials, db
 import os
+import queue
+import threading
 import time
 from flask import Flask, render_template, jsonify, request, Response
-import threading
-import cv2
-from real_time_analysis import RealTimeAttentionAnalyzer
+from real_time_analysis import EmotionAnalyzer, RealTimeAttentionAnalyzer
+from analyzer_pool import AnalyzerPool
+from classroom import ClassroomAnalyzer, StudentSession
+from report_jobs import ReportJobs
+from metrics import add_sample, render_prometheus
+from capture_hub import get_capture_hub
+from firebase_writer import replay_spools
+from pipeline import FramePipeline
+from mjpeg import MjpegBroadcaster
+from session_registry import SessionRegistry, SessionLimitError
 from flask_cors import CORS
 
 # Initialize Flask app
 app = Flask(__name__)
 
-CORS(app, resources={r"/*": {"origins": "http://localhost:4200"}}) 
+CORS(app, resources={r"/*": {"origins": "http://localhost:4200"}})
+
+# Per-stage timings cost one perf_counter() call per stage; METRICS_ENABLED=0 turns them off
+metrics_enabled = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+def create_analyzer(student_id, session_id):
+    try:
+        return RealTimeAttentionAnalyzer(
+            student_id=student_id,
+            session_id=session_id,
+            inference_mode=os.environ.get("INFERENCE_MODE", "parallel"),
+            model_pool=analyzer_pool,
+            report_jobs=report_jobs,
+            metrics_enabled=metrics_enabled,
+            inference_width=int(os.environ.get("INFERENCE_WIDTH", 480)) or None
+        )
+    except queue.Empty:
+        raise SessionLimitError("No analyzer models available")
 
-# Firebase Admin initialization
-cred = credentials.Certificate("key.json")  # Replace with the actual path
-firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://beekideeapp-default-rtdb.firebaseio.com/'  # Replace with your Firebase Realtime Database URL
-})
+def close_session(session):
+    if session.pipeline is not None:
+        session.pipeline.stop()
+    session.analyzer.is_tracking = False
+    session.analyzer.stop()
 
-# Initialize the real-time attention analyzer with student_id and session_id
-analyzer = None
-is_tracking = False
+# Classroom mode: one analyzer scores every face the camera sees; each tracked face is
+# registered as its own student session, so the per-student endpoints work unchanged
+classrooms = {}
+classrooms_lock = threading.Lock()
 
-s
-def generate_frames():
-    global is_tracking, analyzer
-    
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-    cap.set(cv2.CAP_PROP_FPS, 30)
+# Report workers rebuilt from a fork server import this file as __mp_main__; they only need
+# report_jobs.run_group, not Firebase, the model pool or the camera
+if __name__ != "__mp_main__":
+    # Firebase Admin initialization
+    cred = credentials.Certificate("key.json")  # Replace with the actual path
+    firebase_admin.initialize_app(cred, {
+        'databaseURL': 'https://beekideeapp-default-rtdb.firebaseio.com/'  # Replace with your Firebase Realtime Database URL
+    })
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            continue
+    # Session reports render on worker processes, forked here before any server thread starts
+    report_jobs = ReportJobs(
+        max_workers=int(os.environ.get("REPORT_WORKERS", 0)) or None,
+        dpi=int(os.environ.get("REPORT_DPI", 300)),
+        fmt=os.environ.get("REPORT_FORMAT", "png")
+    )
+    report_jobs.start()
 
-        frame = cv2.flip(frame, 1)
-        if analyzer and is_tracking:
-            frame = analyzer.process_frame(frame)
+    # Samples spooled by sessions that were closed, or a server that stopped, while Firebase was unreachable.
+    # Started only once the report workers are forked, so no child inherits its locks.
+    threading.Thread(target=replay_spools, args=(os.path.join("output", "firebase_spool"),), daemon=True).start()
 
-        ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-        frame = buffer.tobytes()
+    # Prewarmed MediaPipe graphs, Haar cascade and audio handles, checked out per session so
+    # tracking starts with hot models instead of paying the load on the first frames
+    analyzer_pool = AnalyzerPool(
+        size=int(os.environ.get("ANALYZER_POOL_SIZE", 2)),
+        max_size=int(os.environ.get("MAX_TRACKING_SESSIONS", 30)),
+        classify=EmotionAnalyzer.classify_face
+    )
+    analyzer_pool.prewarm()
 
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n\r\n')
+    # One analyzer per (student_id, session_id), so a single node can serve a whole classroom
+    sessions = SessionRegistry(
+        create_analyzer,
+        close_session,
+        max_sessions=int(os.environ.get("MAX_TRACKING_SESSIONS", 30)),
+        idle_timeout=float(os.environ.get("SESSION_IDLE_TIMEOUT", 900))
+    )
+    sessions.start_eviction()
 
-    cap.release()
+    # One capture thread for the camera, shared by every analyzer and /video_feed viewer
+    camera_hub = get_capture_hub(int(os.environ.get("CAMERA_SOURCE", 0)))
+    # Raw camera stream for viewers without a tracking session; encoded once per quality level
+    camera_feed = MjpegBroadcaster(source=camera_hub, name="video_feed")
 
 @app.route('/')
 def index():
@@ -55,80 +100,125 @@ def index():
 
 @app.route('/start_tracking', methods=['POST'])
 def start_tracking():
-    global is_tracking, analyzer
-
     student_id = request.json.get("student_id")
     session_id = request.json.get("session_id")
-    
+
     if not student_id or not session_id:
         return jsonify({"status": "Student ID and Session ID are required!"}), 400
 
-    if not is_tracking:
-        is_tracking = True
-        analyzer = RealTimeAttentionAnalyzer(student_id=student_id, session_id=session_id)
-        analyzer.is_tracking = True
-        
-        tracking_thread = threading.Thread(target=analyzer.run)
-        tracking_thread.daemon = True
-        tracking_thread.start()
+    try:
+        session, _ = sessions.create(student_id, session_id)
+    except SessionLimitError as e:
+        return jsonify({'status': str(e), 'student_id': student_id, 'session_id': session_id}), 503
 
-        return jsonify({'status': 'Tracking started!', 'student_id': student_id, 'session_id': session_id})
-    else:
-        return jsonify({'status': 'Tracking is already running!', 'student_id': student_id, 'session_id': session_id})
+    with session.lock:
+        if session.analyzer is None:
+            # A concurrent request reserved this session and its analyzer failed to build
+            sessions.discard(session)
+            return jsonify({'status': 'Could not start tracking', 'student_id': student_id,
+                            'session_id': session_id}), 503
+        if session.is_tracking:
+            return jsonify({'status': 'Tracking is already running!', 'student_id': student_id, 'session_id': session_id})
+
+        session.analyzer.is_tracking = True
+        # Whichever request gets here first starts the pipeline, not necessarily the creating one
+        if session.pipeline is None:
+            session.pipeline = FramePipeline(camera_hub, session.analyzer)
+            session.pipeline.start()
+
+    return jsonify({'status': 'Tracking started!', 'student_id': student_id, 'session_id': session_id})
 
 @app.route('/pause_tracking', methods=['POST'])
 def pause_tracking():
-    global is_tracking, analyzer
-    
     student_id = request.json.get("student_id")
-    
+    session_id = request.json.get("session_id")
+
     if not student_id:
         return jsonify({"status": "Student ID is required!"}), 400
-    
-    if is_tracking:
-        is_tracking = False
-        if analyzer:
-            analyzer.is_tracking = False
-        return jsonify({'status': 'Tracking paused!', 'student_id': student_id})
-    else:
-        return jsonify({'status': 'Tracking is already paused!', 'student_id': student_id})
+
+    session = sessions.get(student_id, session_id)
+    if session is None:
+        return jsonify({'status': 'Tracking is not running!', 'student_id': student_id})
+
+    with session.lock:
+        if session.is_tracking:
+            session.analyzer.is_tracking = False
+            return jsonify({'status': 'Tracking paused!', 'student_id': student_id, 'session_id': session.session_id})
+    return jsonify({'status': 'Tracking is already paused!', 'student_id': student_id, 'session_id': session.session_id})
 
 @app.route('/stop_tracking', methods=['POST'])
 def stop_tracking():
-    global is_tracking, analyzer
-
     student_id = request.json.get("student_id")
-    
+    session_id = request.json.get("session_id")
+
     if not student_id:
         return jsonify({"status": "Student ID is required!"}), 400
 
-    if is_tracking:
-        is_tracking = False
-        if analyzer:
-            analyzer.is_tracking = False
-            analyzer.stop()
-        analyzer = None
-        return jsonify({'status': 'Tracking stopped!', 'student_id': student_id})
-    else:
+    session = sessions.remove(student_id, session_id)
+    if session is None:
         return jsonify({'status': 'Tracking is not running!', 'student_id': student_id})
+    job = session.analyzer.report_job
+    return jsonify({
+        'status': 'Tracking stopped!',
+        'student_id': student_id,
+        'session_id': session.session_id,
+        'report': job.status() if job else None
+    })
+
+@app.route('/report_status/<student_id>', methods=['GET'])
+def report_status(student_id):
+    job_id = request.args.get("job_id")
+    job = report_jobs.get(job_id) if job_id else report_jobs.find(student_id, request.args.get("session_id"))
+    if job is None or job.key[0] != student_id:
+        return jsonify({'status': 'No report found', 'student_id': student_id}), 404
+    return jsonify(job.status())
 
 @app.route('/get_attention_data/<student_id>', methods=['GET'])
 def get_attention_data(student_id):
-    if analyzer and analyzer.data['timestamp']:
-        latest_data = analyzer.data
-        return jsonify({
-            'student_id': student_id,
-            'data': latest_data
-        })
-    else:
+    session = sessions.get(student_id, request.args.get("session_id"))
+    if session is None:
         return jsonify({'student_id': student_id, 'message': 'No data available'})
 
+    since = request.args.get("since")
+    try:
+        step = int(request.args.get("step", 1))
+    except ValueError:
+        return jsonify({"status": "step must be an integer!"}), 400
+
+    with session.lock:
+        analyzer = session.analyzer
+        if since is not None:
+            # Delta poll: only the samples appended after the cursor, optionally downsampled
+            try:
+                data, cursor, reset = analyzer.data.since(since, step)
+            except ValueError:
+                return jsonify({"status": "Invalid since cursor or step!"}), 400
+            return jsonify({
+                'student_id': student_id,
+                'session_id': session.session_id,
+                'data': data,
+                'cursor': cursor,
+                'reset': reset
+            })
+
+        if analyzer and len(analyzer.data):
+            return jsonify({
+                'student_id': student_id,
+                'session_id': session.session_id,
+                'data': analyzer.data.to_dict(),
+                'cursor': analyzer.data.cursor()
+            })
+    return jsonify({'student_id': student_id, 'message': 'No data available'})
+
 @app.route('/get_interval_attention/<student_id>', methods=['GET'])
 def get_interval_attention(student_id):
+    session = sessions.get(student_id, request.args.get("session_id"))
+    analyzer = session.analyzer if session else None
     if analyzer and analyzer.interval_data:
         with analyzer.interval_data_lock:
             return jsonify({
                 'student_id': student_id,
+                'session_id': session.session_id,
                 'interval_data': [
                     {'interval_start': d['interval_start'], 'overall_attention': d['overall_attention']}
                     for d in analyzer.interval_data
@@ -137,9 +227,257 @@ def get_interval_attention(student_id):
     else:
         return jsonify({'student_id': student_id, 'message': 'No interval data available'})
 
+@app.route('/stream/<student_id>', methods=['GET'])
+def stream_attention(student_id):
+    session = sessions.get(student_id, request.args.get("session_id"))
+    if session is None:
+        return jsonify({'student_id': student_id, 'message': 'Tracking is not running!'}), 404
+
+    # Server-sent events: one 'sample' per second and one 'interval' per 10 seconds
+    events = session.analyzer.events
+    subscription = events.subscribe()
+    return Response(
+        events.stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    return jsonify({
+        'max_sessions': sessions.max_sessions,
+        'sessions': [
+            {
+                'student_id': s.student_id,
+                'session_id': s.session_id,
+                'is_tracking': s.is_tracking,
+                'idle_seconds': round(time.time() - s.last_access, 1)
+            }
+            for s in sessions.list_sessions()
+        ]
+    })
+
+@app.route('/pipeline_stats/<student_id>', methods=['GET'])
+def pipeline_stats(student_id):
+    session = sessions.get(student_id, request.args.get("session_id"))
+    if session is None or session.pipeline is None:
+        return jsonify({'student_id': student_id, 'message': 'Tracking is not running!'})
+    return jsonify({
+        'student_id': student_id,
+        'session_id': session.session_id,
+        'camera': camera_hub.stats(),
+        'stages': session.pipeline.stats(),
+        'firebase': session.analyzer.firebase_writer.metrics() if session.analyzer.firebase_writer else None,
+        'emotion': session.analyzer.emotion_analyzer.worker.metrics() if session.analyzer.emotion_analyzer.worker else None,
+        'models': analyzer_pool.stats(),
+        'schedule': session.analyzer.scheduler.stats(),
+        'stream': session.pipeline.broadcaster.stats()
+    })
+
+def parse_seats(seats):
+    # {"student_id": [x, y], ...} with x, y as fractions of the frame width and height
+    if seats is None:
+        return {}
+    if not isinstance(seats, dict):
+        raise ValueError("seats must map student IDs to [x, y] positions")
+    parsed = {}
+    for student_id, position in seats.items():
+        if (not isinstance(position, (list, tuple)) or len(position) != 2
+                or not all(isinstance(v, (int, float)) and 0 <= v <= 1 for v in position)):
+            raise ValueError(f"Seat for {student_id} must be [x, y] between 0 and 1")
+        parsed[student_id] = (float(position[0]), float(position[1]))
+    return parsed
+
+@app.route('/start_classroom', methods=['POST'])
+def start_classroom():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"status": "Expected a JSON object body"}), 400
+    classroom_id = body.get("classroom_id")
+    session_id = body.get("session_id")
+    if not classroom_id or not session_id:
+        return jsonify({"status": "Classroom ID and Session ID are required!"}), 400
+    if "students" in body:
+        # A face that leaves and comes back gets a new track, so names in order of appearance drifted
+        return jsonify({"status": "'students' is no longer supported; bind names to positions with 'seats'"}), 400
+    try:
+        max_faces = int(body.get("max_faces", 30))
+    except (TypeError, ValueError):
+        return jsonify({"status": "max_faces must be a whole number"}), 400
+    if max_faces < 1:
+        return jsonify({"status": "max_faces must be at least 1"}), 400
+    try:
+        seats = parse_seats(body.get("seats"))
+    except ValueError as e:
+        return jsonify({"status": str(e)}), 400
+
+    def register_student(student):
+        try:
+            session = sessions.register(student.student_id, session_id, student)
+        except (SessionLimitError, ValueError) as e:
+            print(f"Classroom {classroom_id}: not registering {student.student_id}: {e}")
+            return
+        student.touch = session.touch
+
+    def remove_student(student):
+        # Unseated students whose face was dropped are finished; their session goes with them
+        sessions.remove(student.student_id, session_id)
+
+    with classrooms_lock:
+        if classroom_id in classrooms:
+            return jsonify({'status': 'Classroom is already running!', 'classroom_id': classroom_id})
+        classroom = ClassroomAnalyzer(
+            classroom_id,
+            session_id,
+            max_faces=max_faces,
+            seats=seats,
+            classify=EmotionAnalyzer.classify_face,
+            inference_width=int(os.environ.get("CLASSROOM_INFERENCE_WIDTH", 0)) or None,
+            metrics_enabled=metrics_enabled,
+            on_student=register_student,
+            on_student_lost=remove_student
+        )
+        classroom.is_tracking = True
+        pipeline = FramePipeline(camera_hub, classroom)
+        pipeline.start()
+        classrooms[classroom_id] = (classroom, pipeline)
+    return jsonify({'status': 'Classroom started!', 'classroom_id': classroom_id, 'session_id': session_id})
+
+@app.route('/stop_classroom', methods=['POST'])
+def stop_classroom():
+    classroom_id = request.json.get("classroom_id")
+    with classrooms_lock:
+        entry = classrooms.pop(classroom_id, None)
+    if entry is None:
+        return jsonify({'status': 'Classroom is not running!', 'classroom_id': classroom_id})
+    classroom, pipeline = entry
+    pipeline.stop()
+    summary = classroom.summary()
+    for student in summary['students']:
+        sessions.remove(student['student_id'], classroom.session_id)
+    classroom.stop()
+    return jsonify({'status': 'Classroom stopped!', 'classroom_id': classroom_id, 'students': summary['students']})
+
+@app.route('/classroom/<classroom_id>', methods=['GET'])
+def classroom_status(classroom_id):
+    with classrooms_lock:
+        entry = classrooms.get(classroom_id)
+    if entry is None:
+        return jsonify({'classroom_id': classroom_id, 'message': 'Classroom is not running!'}), 404
+    classroom, pipeline = entry
+    return jsonify(dict(classroom.summary(), stages=pipeline.stats(), schedule=classroom.scheduler.stats()))
+
+def collect_stream_metrics(broadcaster, labels, families):
+    stream = broadcaster.stats()
+    add_sample(families, 'stream_frames_published_total', 'counter', 'Frames offered to video viewers',
+               labels, stream['published'])
+    add_sample(families, 'stream_jpeg_encodes_total', 'counter', 'JPEG encodes shared by all video viewers',
+               labels, stream['encodes'])
+    add_sample(families, 'stream_viewers', 'gauge', 'Connected video viewers', labels, len(stream['clients']))
+    add_sample(families, 'stream_frames_skipped_total', 'counter',
+               'Frames connected viewers skipped because they were slow or rate limited', labels,
+               sum(client['skipped'] for client in stream['clients']))
+
+def collect_analyzer_metrics(analyzer, pipeline, labels, families):
+    analyzer.metrics.collect(labels, families)
+    for stage, schedule in analyzer.scheduler.stats().items():
+        add_sample(families, 'stage_rate_hz', 'gauge', 'Current scheduled rate of each analysis stage',
+                   dict(labels, stage=stage), schedule['rate'])
+        add_sample(families, 'stage_over_budget_total', 'counter',
+                   'Analysis stage runs that exceeded their latency budget', dict(labels, stage=stage),
+                   schedule['over_budget'])
+    if pipeline is not None:
+        for stage, stats in pipeline.stats().items():
+            stage_labels = dict(labels, stage=stage)
+            add_sample(families, 'pipeline_frames_processed_total', 'counter',
+                       'Frames handled by each pipeline stage', stage_labels, stats['processed'])
+            add_sample(families, 'pipeline_frames_dropped_total', 'counter',
+                       'Frames dropped before reaching each pipeline stage', stage_labels, stats['dropped'])
+            add_sample(families, 'pipeline_errors_total', 'counter',
+                       'Frames that failed in each pipeline stage', stage_labels, stats['errors'])
+            if 'queue_depth' in stats:
+                add_sample(families, 'pipeline_queue_depth', 'gauge',
+                           'Frames waiting in front of each pipeline stage', stage_labels, stats['queue_depth'])
+        collect_stream_metrics(pipeline.broadcaster, labels, families)
+
+def collect_session_metrics(session, families):
+    labels = {'student_id': session.student_id, 'session_id': session.session_id}
+    # Classroom students share their classroom's models and pipeline, which are reported once per classroom
+    if not isinstance(session.analyzer, StudentSession):
+        collect_analyzer_metrics(session.analyzer, session.pipeline, labels, families)
+    worker = session.analyzer.emotion_analyzer.worker
+    if worker is not None:
+        emotion = worker.metrics()
+        add_sample(families, 'emotion_requests_dropped_total', 'counter',
+                   'Face crops replaced before the emotion worker picked them up', labels, emotion['dropped'])
+        add_sample(families, 'emotion_failures_total', 'counter',
+                   'Emotion classifications that raised', labels, emotion['failed'])
+    writer = session.analyzer.firebase_writer
+    if writer is not None:
+        firebase = writer.metrics()
+        add_sample(families, 'firebase_queue_depth', 'gauge',
+                   'Samples waiting to be written to Firebase', labels, firebase['queue_depth'])
+        add_sample(families, 'firebase_samples_written_total', 'counter',
+                   'Samples written to Firebase', labels, firebase['written'])
+        add_sample(families, 'firebase_failed_writes_total', 'counter',
+                   'Failed Firebase write attempts', labels, firebase['failed_writes'])
+        add_sample(families, 'firebase_samples_spooled_total', 'counter',
+                   'Samples spooled to disk while Firebase was unreachable', labels, firebase['spooled'])
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    families = {}
+    active = sessions.list_sessions()
+    add_sample(families, 'sessions', 'gauge', 'Open tracking sessions', {}, len(active))
+    for session in active:
+        collect_session_metrics(session, families)
+
+    camera = camera_hub.stats()
+    add_sample(families, 'camera_frames_captured_total', 'counter', 'Frames read from the camera', {},
+               camera['frames_captured'])
+    add_sample(families, 'camera_read_failures_total', 'counter', 'Failed camera reads', {}, camera['read_failures'])
+    add_sample(families, 'camera_open_failures_total', 'counter', 'Failed attempts to open the camera', {},
+               camera['open_failures'])
+    for subscriber in camera['subscribers']:
+        add_sample(families, 'camera_frames_dropped_total', 'counter',
+                   'Camera frames a subscriber missed because it was still busy',
+                   {'subscriber': subscriber['name']}, subscriber['dropped'])
+
+    collect_stream_metrics(camera_feed, {'student_id': '', 'session_id': ''}, families)
+
+    with classrooms_lock:
+        running = list(classrooms.values())
+    for classroom, pipeline in running:
+        labels = {'classroom_id': classroom.classroom_id, 'session_id': classroom.session_id}
+        collect_analyzer_metrics(classroom, pipeline, labels, families)
+        add_sample(families, 'classroom_tracked_faces', 'gauge', 'Faces currently tracked in a classroom', labels,
+                   len(classroom.tracker.ids))
+
+    pool = analyzer_pool.stats()
+    add_sample(families, 'model_bundles', 'gauge', 'Analyzer model bundles by state', {'state': 'idle'}, pool['idle'])
+    add_sample(families, 'model_bundles', 'gauge', 'Analyzer model bundles by state', {'state': 'checked_out'},
+               pool['checked_out'])
+    add_sample(families, 'model_bundle_cold_starts_total', 'counter',
+               'Bundles built on demand because the pool was empty', {}, pool['cold_starts'])
+    return Response(render_prometheus(families), mimetype='text/plain; version=0.0.4')
+
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # Optional ?quality=10-95 and ?fps= per viewer; slow viewers skip to the newest frame
+    quality = request.args.get("quality", type=int)
+    fps = request.args.get("fps", type=float)
+    student_id = request.args.get("student_id")
+    if student_id:
+        session = sessions.get(student_id, request.args.get("session_id"))
+        if session is not None and session.pipeline is not None:
+            broadcaster = session.pipeline.broadcaster
+            client = broadcaster.subscribe(quality, fps, name=request.remote_addr or "viewer")
+            return Response(broadcaster.stream(client, on_frame=session.touch),
+                            mimetype='multipart/x-mixed-replace; boundary=frame')
+    client = camera_feed.subscribe(quality, fps, name=request.remote_addr or "viewer")
+    return Response(camera_feed.stream(client), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 if __name__ == "__main__":
-    app.run(debug=True, threaded=True)
\ No newline at end of file
+    # No reloader: it re-imports this module in a child process, which would fork a second set of
+    # report workers and prewarm a second model pool next to the first
+    app.run(debug=True, use_reloader=False, threaded=True)
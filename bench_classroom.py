@@ -0,0 +1,198 @@
+import argparse
+import json
+import platform
+import resource
+import tempfile
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from bench_replay import ReplayModel, git_revision, latency_summary, print_latency, stub_classifier
+from classroom import ClassroomAnalyzer, FaceTracker
+from landmark_features import face_features
+from metrics import SessionMetrics
+
+
+class ArrayLandmarks:
+    # One synthetic face mesh result backed by an array; points are built on access like MediaPipe's
+    def __init__(self, points, offset):
+        self.points = points
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, index):
+        x, y = self.points[index] + self.offset
+        return SimpleNamespace(x=float(x), y=float(y), z=0.0)
+
+
+def seat_positions(count):
+    # Faces on a grid like rows of desks, far enough apart that tracks cannot be confused
+    columns = 8
+    rows = (count + columns - 1) // columns
+    row_y = np.linspace(0.15, 0.85, rows) if rows > 1 else np.array([0.5])
+    return np.array([(0.08 + 0.12 * (i % columns), row_y[i // columns]) for i in range(count)])
+
+
+def classroom_results(count, frames, rng, dropout=0.02):
+    # Each face is a fixed mesh around its seat plus a slow drift; faces come back in random order
+    # and occasionally go missing, as MediaPipe's multi-face output does
+    seats = seat_positions(count)
+    templates = seats[:, None, :] + rng.uniform(-0.025, 0.025, size=(count, 478, 2))
+    drift = np.clip(np.cumsum(rng.normal(0, 0.001, size=(frames, count, 2)), axis=0), -0.02, 0.02)
+    results = []
+    centroids = []
+    for i in range(frames):
+        visible = [face for face in rng.permutation(count) if rng.random() >= dropout]
+        results.append(SimpleNamespace(multi_face_landmarks=[
+            SimpleNamespace(landmark=ArrayLandmarks(templates[face], drift[i, face])) for face in visible
+        ] or None))
+        centroids.append([(face, templates[face].mean(axis=0) + drift[i, face]) for face in visible])
+    return results, centroids
+
+
+def tracker_switches(centroids):
+    # Faces whose track ID changes while they stay in view (brief dropouts are within max_missed)
+    tracker = FaceTracker()
+    first = {}
+    switches = 0
+    for visible in centroids:
+        points = np.array([c for _, c in visible]).reshape(-1, 2)
+        track_ids, _ = tracker.update(points)
+        for (face, _), track_id in zip(visible, track_ids):
+            if first.setdefault(face, track_id) != track_id:
+                switches += 1
+                first[face] = track_id
+    return switches
+
+
+def replay_classroom(count, frames, frame, args, rng):
+    results, centroids = classroom_results(count, frames, rng)
+    metrics = SessionMetrics(keep_samples=True)
+    with tempfile.TemporaryDirectory() as output_folder:
+        classroom = ClassroomAnalyzer(
+            "bench", "replay", max_faces=count, live=False, output_folder=output_folder,
+            face_mesh=ReplayModel(results, args.model_ms / 1000.0),
+            classify=stub_classifier(args.emotion_ms / 1000.0), metrics=metrics
+        )
+        classroom.is_tracking = True
+        start = time.perf_counter()
+        for i in range(frames):
+            classroom.process_frame(frame.copy(), draw_overlay=args.overlay, timestamp=i / args.fps)
+        wall = time.perf_counter() - start
+        tracks = classroom.tracker.next_id - 1
+        emotion = classroom.emotion_worker.metrics()
+        classroom.stop()
+
+    end_to_end = latency_summary(metrics.samples.get('process_frame', []))
+    return {
+        'faces': count,
+        'frames': frames,
+        'processed_frames': end_to_end['count'] if end_to_end else 0,
+        'wall_seconds': wall,
+        'tracks_created': tracks,
+        'tracker_switches': tracker_switches(centroids),
+        'end_to_end': end_to_end,
+        'per_face_ms': end_to_end['mean_ms'] / count if end_to_end else None,
+        # Classified off the frame thread; emotion_model below is the worker's time per crop
+        'emotion_classified': emotion['completed'],
+        'stages': {
+            stage: latency_summary(values) for stage, values in metrics.samples.items() if stage != 'process_frame'
+        }
+    }
+
+
+def bench_batching(count, repeat, width, height, rng):
+    # One batched feature call for all faces against one call per face
+    points = rng.uniform(0.2, 0.8, size=(count, 13, 2))
+    batched = []
+    looped = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        face_features(points, width, height)
+        batched.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for face in points:
+            face_features(face, width, height)
+        looped.append(time.perf_counter() - start)
+    return {'batched': latency_summary(batched), 'per_face': latency_summary(looped)}
+
+
+def linear_fit(counts, means):
+    slope, intercept = np.polyfit(counts, means, 1)
+    predicted = slope * np.asarray(counts) + intercept
+    residual = ((np.asarray(means) - predicted) ** 2).sum()
+    total = ((np.asarray(means) - np.mean(means)) ** 2).sum()
+    return {
+        'per_face_ms': float(slope),
+        'fixed_ms': float(intercept),
+        'r_squared': float(1 - residual / total) if total else 1.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay synthetic multi-face landmarks through classroom mode and check it scales linearly"
+    )
+    parser.add_argument("--faces", default="1,2,4,8,16,32", help="Comma-separated face counts to replay")
+    parser.add_argument("--frames", type=int, default=600, help="Frames per face count (default: 20 s at 30 fps)")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--model-ms", type=float, default=0.0, help="Simulated latency per face mesh call")
+    parser.add_argument("--emotion-ms", type=float, default=150.0,
+                        help="Simulated latency per emotion call (default: roughly DeepFace on CPU)")
+    parser.add_argument("--overlay", action="store_true", help="Draw the overlay on every frame")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls for the batching comparison")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    counts = [int(c) for c in args.faces.split(",")]
+    frame = rng.integers(0, 256, size=(args.height, args.width, 3), dtype=np.uint8)
+    runs = [replay_classroom(count, args.frames, frame, args, rng) for count in counts]
+    measured = [run for run in runs if run['end_to_end']]
+
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'config': vars(args),
+        'runs': runs,
+        'fit': linear_fit([r['faces'] for r in measured], [r['end_to_end']['mean_ms'] for r in measured])
+        if len(measured) > 1 else None,
+        'batching': {count: bench_batching(count, args.repeat, args.width, args.height, rng) for count in counts},
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+    print(f"{'Faces':>5} {'Tracks':>7} {'Switches':>9} {'Analysed':>9} {'Mean ms':>9} {'p95 ms':>9} {'ms/face':>9}")
+    for run in measured:
+        print(f"{run['faces']:>5} {run['tracks_created']:>7} {run['tracker_switches']:>9} "
+              f"{run['processed_frames']:>9} {run['end_to_end']['mean_ms']:>9.3f} "
+              f"{run['end_to_end']['p95_ms']:>9.3f} {run['per_face_ms']:>9.3f}")
+    fit = results['fit']
+    if fit:
+        print(f"Linear fit: {fit['fixed_ms']:.3f} ms + {fit['per_face_ms']:.3f} ms/face (R^2 {fit['r_squared']:.3f})")
+    if measured:
+        largest = measured[-1]
+        print(f"Stages at {largest['faces']} faces:")
+        print(f"{'Stage':<18} {'Count':>7} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Max ms':>9}")
+        for stage, summary in sorted(largest['stages'].items()):
+            print_latency(f"  {stage}", summary)
+    print(f"{'Faces':>5} {'Batched us':>11} {'Per-face us':>12}")
+    for count, timing in results['batching'].items():
+        print(f"{count:>5} {timing['batched']['mean_ms'] * 1000:>11.1f} {timing['per_face']['mean_ms'] * 1000:>12.1f}")
+    print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
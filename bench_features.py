@@ -0,0 +1,177 @@
+import argparse
+import json
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+from landmark_features import (LEFT_EYE_KEY, NOSE_TIP, POSE_FEATURE_INDICES, RIGHT_EYE_KEY, face_features,
+                               face_landmark_array, pose_features, pose_landmark_array)
+from real_time_analysis import EyeTracker
+
+# The per-landmark code the vectorized features replaced, kept as their reference
+LEFT_EYE_CENTER = LEFT_EYE_KEY[0]
+RIGHT_EYE_CENTER = RIGHT_EYE_KEY[0]
+NOSE, LEFT_EAR, RIGHT_EAR, LEFT_SHOULDER, RIGHT_SHOULDER = POSE_FEATURE_INDICES
+
+
+def synthetic_frames(frames, rng):
+    # Landmark objects shaped like MediaPipe's: 478 face mesh points and 33 pose points
+    def points(count):
+        xy = rng.uniform(0.3, 0.7, size=(count, 2))
+        return [SimpleNamespace(x=float(x), y=float(y), z=0.0) for x, y in xy]
+    return [(points(478), points(33)) for _ in range(frames)]
+
+
+def extract_landmarks(landmarks, indices, img_w, img_h):
+    return [
+        [int(landmarks[i].x * img_w), int(landmarks[i].y * img_h)]
+        for i in indices
+    ]
+
+
+def calculate_ear(eye_points):
+    if len(eye_points) < 6:
+        return 0.25
+    p = np.array(eye_points, dtype=np.float32)
+    v1 = np.linalg.norm(p[1] - p[5])
+    v2 = np.linalg.norm(p[2] - p[4])
+    h = np.linalg.norm(p[0] - p[3])
+    return (v1 + v2) / (2.0 * h) if h > 0 else 0.25
+
+
+def calculate_gaze_score(landmarks, img_w, img_h, gaze_history):
+    try:
+        nose = landmarks[NOSE_TIP]
+        left = landmarks[LEFT_EYE_CENTER]
+        right = landmarks[RIGHT_EYE_CENTER]
+
+        nose_x = nose.x * img_w
+        eye_center_x = (left.x + right.x) / 2 * img_w
+        dx = abs((nose_x + eye_center_x) / 2 - img_w / 2)
+        dy = abs(nose.y * img_h - img_h / 2)
+
+        max_dx, max_dy = img_w * 0.3, img_h * 0.25
+        gaze_score = max(0, 1 - (dx / max_dx)) * 0.7 + max(0, 1 - (dy / max_dy)) * 0.3
+
+        gaze_history.append(gaze_score)
+        return max(0.0, min(1.0, np.mean(gaze_history)))
+    except Exception:
+        return 0.5
+
+
+def calculate_angles(landmarks):
+    nose = landmarks[NOSE]
+    left_ear = landmarks[LEFT_EAR]
+    right_ear = landmarks[RIGHT_EAR]
+    left_shoulder = landmarks[LEFT_SHOULDER]
+    right_shoulder = landmarks[RIGHT_SHOULDER]
+
+    ear_center_x = (left_ear.x + right_ear.x) / 2
+    head_turn_ratio = (nose.x - ear_center_x) / (right_ear.x - left_ear.x)
+
+    shoulder_center_x = (left_shoulder.x + right_shoulder.x) / 2
+    shoulder_turn_ratio = (nose.x - shoulder_center_x) / (right_shoulder.x - left_shoulder.x)
+
+    ear_center_y = (left_ear.y + right_ear.y) / 2
+    shoulder_center_y = (left_shoulder.y + right_shoulder.y) / 2
+
+    head_tilt_ratio = (nose.y - ear_center_y) / abs(ear_center_y - shoulder_center_y) if abs(ear_center_y - shoulder_center_y) > 0 else 0
+
+    return head_turn_ratio, shoulder_turn_ratio, head_tilt_ratio
+
+
+def scalar_features(gaze_history, face, pose, w, h):
+    left_eye = extract_landmarks(face, LEFT_EYE_KEY, w, h)
+    right_eye = extract_landmarks(face, RIGHT_EYE_KEY, w, h)
+    avg_ear = (calculate_ear(left_eye) + calculate_ear(right_eye)) / 2
+    gaze = calculate_gaze_score(face, w, h, gaze_history)
+    angles = calculate_angles(pose)
+    return avg_ear, gaze, angles
+
+
+def vector_features(eye_tracker, face, pose, w, h):
+    ears, raw_gaze = face_features(face_landmark_array(face), w, h)
+    gaze = eye_tracker.smooth_gaze(raw_gaze)
+    angles = pose_features(pose_landmark_array(pose))
+    return float(ears[0] + ears[1]) / 2, gaze, angles
+
+
+def time_per_frame(fn, frames, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for face, pose in frames:
+            fn(face, pose)
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames)
+
+
+def time_batched(points, w, h, repeat, calls=200):
+    # One call for every face in the batch, as classroom mode does per frame
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            face_features(points, w, h)
+        best = min(best, time.perf_counter() - start)
+    return best / calls / len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark per-frame landmark feature extraction")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32, help="Faces per call for the batched face features")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    w, h = 1280, 720
+    frames = synthetic_frames(args.frames, np.random.default_rng(0))
+    eye_tracker = EyeTracker()
+    gaze_history = deque(maxlen=eye_tracker.gaze_history.maxlen)
+
+    # Both paths must agree before their speed is worth comparing
+    max_ear_diff = max_gaze_diff = max_angle_diff = 0.0
+    for face, pose in frames[:200]:
+        gaze_history.clear()
+        ear_a, gaze_a, angles_a = scalar_features(gaze_history, face, pose, w, h)
+        eye_tracker.gaze_history.clear()
+        ear_b, gaze_b, angles_b = vector_features(eye_tracker, face, pose, w, h)
+        max_ear_diff = max(max_ear_diff, float(abs(ear_a - ear_b)))
+        max_gaze_diff = max(max_gaze_diff, float(abs(gaze_a - gaze_b)))
+        max_angle_diff = max(max_angle_diff, float(np.max(np.abs(np.array(angles_a) - angles_b))))
+
+    scalar = time_per_frame(lambda f, p: scalar_features(gaze_history, f, p, w, h), frames, args.repeat)
+    vector = time_per_frame(lambda f, p: vector_features(eye_tracker, f, p, w, h), frames, args.repeat)
+    batch = np.stack([face_landmark_array(face) for face, _ in frames[:args.batch]])
+    batched = time_batched(batch, w, h, args.repeat)
+    single = time_batched(batch[:1], w, h, args.repeat)
+
+    results = {
+        'frames': args.frames,
+        'scalar_us_per_frame': scalar * 1e6,
+        'vectorized_us_per_frame': vector * 1e6,
+        'speedup': scalar / vector,
+        'face_features_us_single': single * 1e6,
+        'face_features_us_per_face_batched': batched * 1e6,
+        'batch': len(batch),
+        'max_ear_diff': max_ear_diff,
+        'max_gaze_diff': max_gaze_diff,
+        'max_angle_diff': max_angle_diff
+    }
+    print(f"Scalar features     : {results['scalar_us_per_frame']:.1f} us/frame")
+    print(f"Vectorized features : {results['vectorized_us_per_frame']:.1f} us/frame")
+    print(f"Speedup             : {results['speedup']:.2f}x")
+    print(f"Face features, 1 face       : {results['face_features_us_single']:.1f} us/face")
+    print(f"Face features, {len(batch)} per call : {results['face_features_us_per_face_batched']:.2f} us/face")
+    print(f"Max difference      : EAR {max_ear_diff:.2e}, gaze {max_gaze_diff:.2e}, angles {max_angle_diff:.2e}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
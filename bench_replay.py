@@ -0,0 +1,366 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import wave
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from analyzer_pool import AnalyzerPool, create_face_cascade
+from firebase_writer import FirebaseWriter, LocalRealtimeDatabase
+from landmark_features import face_features, face_landmark_array, pose_features, pose_landmark_array
+from metrics import SessionMetrics
+from real_time_analysis import EyeTracker, NoiseDetector, PostureAnalyzer, RealTimeAttentionAnalyzer
+
+EMOTIONS = ["neutral", "happy", "neutral", "sad", "surprise", "neutral", "angry"]
+
+
+def landmark_sequence(count, frames, rng, dropout):
+    # A face/body that drifts slowly and jitters a little, like a seated student; None where it is lost
+    base = rng.uniform(0.35, 0.65, size=(count, 2))
+    drift = np.cumsum(rng.normal(0, 0.002, size=(frames, 1, 2)), axis=0)
+    jitter = rng.normal(0, 0.003, size=(frames, count, 2))
+    positions = np.clip(base + drift + jitter, 0.0, 1.0)
+    lost = rng.random(frames) < dropout
+    return [
+        None if lost[i] else [SimpleNamespace(x=float(x), y=float(y), z=0.0) for x, y in positions[i]]
+        for i in range(frames)
+    ]
+
+
+def synthetic_landmarks(frames, rng, dropout=0.05):
+    faces = landmark_sequence(478, frames, rng, dropout)
+    poses = landmark_sequence(33, frames, rng, dropout)
+    face_results = [
+        SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=face)] if face else None) for face in faces
+    ]
+    pose_results = [
+        SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=pose) if pose else None) for pose in poses
+    ]
+    return face_results, pose_results
+
+
+def synthetic_frames(count, width, height, rng):
+    # A handful of distinct frames is enough; the models are replayed, so pixels only feed cvtColor/overlay/crops
+    return [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def load_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    frames = []
+    # Decoded up front so decoding does not count against the analyzer
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise ValueError(f"No frames in video: {path}")
+    return frames
+
+
+def synthetic_audio(seconds, sample_rate, rng):
+    # Classroom-like level changes: quiet stretches, talking, and the odd loud burst
+    samples = int(seconds * sample_rate)
+    levels = rng.choice([100.0, 800.0, 3000.0, 12000.0], p=[0.3, 0.4, 0.25, 0.05], size=int(seconds) + 1)
+    envelope = np.repeat(levels, sample_rate)[:samples]
+    return np.clip(rng.normal(0, 1, samples) * envelope, -32768, 32767).astype(np.int16)
+
+
+def load_audio(path):
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"Only 16-bit PCM WAV files are supported: {path}")
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        if wav.getnchannels() > 1:
+            samples = samples.reshape(-1, wav.getnchannels()).mean(axis=1).astype(np.int16)
+        return samples, wav.getframerate()
+
+
+class ReplayModel:
+    # Stands in for a MediaPipe graph: returns prepared results in order, optionally taking delay seconds
+    def __init__(self, results, delay=0.0):
+        self.results = results
+        self.delay = delay
+        self.index = 0
+
+    def process(self, rgb):
+        if self.delay:
+            time.sleep(self.delay)
+        result = self.results[self.index % len(self.results)]
+        self.index += 1
+        return result
+
+    def reset(self):
+        self.index = 0
+
+    def close(self):
+        pass
+
+
+class ReplayBundle:
+    # Same shape as analyzer_pool.ModelBundle, without MediaPipe graphs or a microphone
+    def __init__(self, face_results, pose_results, model_delay=0.0):
+        self.pose = ReplayModel(pose_results, model_delay)
+        self.face_mesh = ReplayModel(face_results, model_delay)
+        self.face_cascade = create_face_cascade()
+        self.audio = None
+        self.sessions = 0
+        self.warm = False
+
+    def warm_up(self, classify=None):
+        if classify is not None:
+            classify(np.zeros((48, 48, 3), dtype=np.uint8))
+        self.reset()
+        self.warm = True
+
+    def reset(self):
+        self.pose.reset()
+        self.face_mesh.reset()
+
+    def close(self):
+        pass
+
+
+def stub_classifier(delay=0.0):
+    # DeepFace stand-in; delay approximates its per-crop latency
+    calls = [0]
+
+    def classify(face_roi):
+        if delay:
+            time.sleep(delay)
+        calls[0] += 1
+        return EMOTIONS[calls[0] % len(EMOTIONS)]
+    return classify
+
+
+def latency_summary(samples):
+    if not samples:
+        return None
+    values = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(values.max())
+    }
+
+
+def replay_session(frames, face_results, pose_results, audio, sample_rate, args):
+    pool = AnalyzerPool(
+        size=1,
+        classify=None,
+        bundle_factory=lambda: ReplayBundle(face_results, pose_results, args.model_ms / 1000)
+    )
+    metrics = SessionMetrics(keep_samples=True)
+    database = LocalRealtimeDatabase()
+    output_folder = tempfile.mkdtemp(prefix="bench_replay_")
+    analyzer = RealTimeAttentionAnalyzer(
+        student_id="bench", session_id="replay", inference_mode=args.inference_mode, live=False,
+        output_folder=output_folder, model_pool=pool, metrics=metrics,
+        classify=stub_classifier(args.emotion_ms / 1000),
+        # Replayed landmarks are whole-frame coordinates, so the face crop is not tracked here
+        inference_width=args.inference_width or None, track_face=False
+    )
+    # Offline analyzers never write to Firebase; attach a writer on the in-memory database so the
+    # push path is measured too. The noise detector streams 50 ms hops over a 1 s window, as live.
+    analyzer.live = True
+    analyzer.firebase_writer = FirebaseWriter(
+        "students/bench/sessions/replay/data",
+        spool_path=os.path.join(output_folder, "spool.jsonl"),
+        reference=database.reference,
+        session_metrics=metrics
+    )
+    analyzer.noise_detector = NoiseDetector(use_microphone=False, sample_rate=sample_rate,
+                                            hop_size=sample_rate // 20, history_size=1200)
+    analyzer.is_tracking = True
+    analyzer.start_time = 0
+    analyzer.last_save = -1.0
+
+    samples_per_frame = sample_rate / args.fps
+    frame_times = []
+    started = time.perf_counter()
+    for index in range(args.frames):
+        timestamp = index / args.fps
+        frame = frames[index % len(frames)].copy()
+        start = time.perf_counter()
+        chunk = audio[int(index * samples_per_frame):int((index + 1) * samples_per_frame)]
+        if len(chunk):
+            analyzer.noise_detector.process_samples(chunk)
+            metrics.observe('audio', time.perf_counter() - start)
+        analyzer.process_frame(frame, draw_overlay=args.overlay, timestamp=timestamp)
+        frame_times.append(time.perf_counter() - start)
+    wall = time.perf_counter() - started
+
+    # Figures are benchmarked by the report jobs themselves, not here
+    analyzer.save_results = lambda: None
+    analyzer.stop()
+    pool.close()
+
+    processed = len(metrics.samples.get('process_frame', []))
+    firebase = analyzer.firebase_writer.metrics()
+    return {
+        'frames': args.frames,
+        'processed_frames': processed,
+        'wall_seconds': wall,
+        'fps': args.frames / wall,
+        'processed_fps': processed / wall,
+        'realtime_factor': args.frames / args.fps / wall,
+        'frame': latency_summary(frame_times),
+        'end_to_end': latency_summary(metrics.samples.get('process_frame', [])),
+        'stages': {
+            stage: latency_summary(samples)
+            for stage, samples in metrics.samples.items() if stage != 'process_frame'
+        },
+        'counters': dict(metrics.counters),
+        'firebase': {key: firebase[key] for key in ('written', 'batches', 'failed_writes', 'avg_latency')}
+    }
+
+
+def time_calls(fn, items, repeat):
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+def bench_components(face_results, pose_results, audio, sample_rate, repeat, width, height):
+    # The scoring classes on their own, without the analyzer around them
+    posture_analyzer = PostureAnalyzer(pose=ReplayModel(pose_results))
+    eye_tracker = EyeTracker(face_mesh=ReplayModel(face_results))
+    noise_detector = NoiseDetector(use_microphone=False, sample_rate=sample_rate,
+                                   hop_size=sample_rate // 20, history_size=1200)
+
+    poses = [r.pose_landmarks.landmark for r in pose_results if r.pose_landmarks]
+    faces = [r.multi_face_landmarks[0].landmark for r in face_results if r.multi_face_landmarks]
+    clock = [0.0]
+
+    def posture(landmarks):
+        clock[0] += 0.1
+        posture_analyzer.analyze_angles(pose_features(pose_landmark_array(landmarks)), clock[0])
+
+    def eye(landmarks):
+        clock[0] += 0.1
+        ears, raw_gaze = face_features(face_landmark_array(landmarks), width, height)
+        avg_ear = float(ears[0] + ears[1]) / 2
+        eye_tracker.detect_blink(avg_ear, clock[0])
+        blink_rate = eye_tracker.calculate_blink_rate(clock[0])
+        gaze = eye_tracker.smooth_gaze(raw_gaze)
+        eye_tracker.calculate_attention_level(gaze, blink_rate, avg_ear)
+        eye_tracker.update_eye_metrics(gaze, blink_rate, avg_ear, clock[0])
+
+    hop = noise_detector.hop_samples
+    hops = [audio[i:i + hop] for i in range(0, min(len(audio), sample_rate * 60) - hop + 1, hop)]
+    return {
+        'posture': time_calls(posture, poses, repeat),
+        'eye': time_calls(eye, faces, repeat),
+        'noise_hop': time_calls(noise_detector.process_samples, hops, repeat)
+    }
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_latency(name, summary):
+    if summary is None:
+        return
+    print(f"{name:<18} {summary['count']:>7} {summary['mean_ms']:>9.3f} {summary['p50_ms']:>9.3f} "
+          f"{summary['p95_ms']:>9.3f} {summary['p99_ms']:>9.3f} {summary['max_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay synthetic or recorded frames, landmarks and audio through the analyzer"
+    )
+    parser.add_argument("--frames", type=int, default=1800, help="Frames to replay (default: 60 s at 30 fps)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Media frame rate the timestamps follow")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--video", help="Replay frames from this video instead of synthetic ones")
+    parser.add_argument("--audio", help="16-bit PCM WAV to replay instead of synthetic audio")
+    parser.add_argument("--model-ms", type=float, default=0.0, help="Simulated latency per MediaPipe call")
+    parser.add_argument("--emotion-ms", type=float, default=0.0, help="Simulated latency per emotion call")
+    parser.add_argument("--inference-width", type=int, default=480,
+                        help="Width the models see (0 = full resolution)")
+    parser.add_argument("--inference-mode", choices=RealTimeAttentionAnalyzer.INFERENCE_MODES, default="serial")
+    parser.add_argument("--overlay", action="store_true", help="Draw the overlay on every frame")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the data for the component timings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95-ms", type=float,
+                        help="Exit non-zero if end-to-end p95 latency exceeds this")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.video:
+        frames = load_frames(args.video, args.frames)
+        height, width = frames[0].shape[:2]
+    else:
+        width, height = args.width, args.height
+        frames = synthetic_frames(8, width, height, rng)
+    face_results, pose_results = synthetic_landmarks(min(args.frames, 3000), rng)
+    if args.audio:
+        audio, sample_rate = load_audio(args.audio)
+    else:
+        sample_rate = 48000
+        audio = synthetic_audio(args.frames / args.fps + 1, sample_rate, rng)
+
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'config': dict(vars(args), width=width, height=height),
+        'replay': replay_session(frames, face_results, pose_results, audio, sample_rate, args),
+        'components': bench_components(face_results, pose_results, audio, sample_rate, args.repeat, width, height),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+    replay = results['replay']
+    print(f"Replayed {replay['frames']} frames ({replay['processed_frames']} analysed) in "
+          f"{replay['wall_seconds']:.2f}s: {replay['fps']:.1f} frames/s, "
+          f"{replay['processed_fps']:.1f} analysed/s, {replay['realtime_factor']:.1f}x real time")
+    print(f"{'Stage':<18} {'Count':>7} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Max ms':>9}")
+    print_latency("frame", replay['frame'])
+    print_latency("process_frame", replay['end_to_end'])
+    for stage, summary in sorted(replay['stages'].items()):
+        print_latency(f"  {stage}", summary)
+    for name, summary in results['components'].items():
+        print_latency(f"{name} (alone)", summary)
+    print(f"Firebase: {replay['firebase']['written']} samples in {replay['firebase']['batches']} batches")
+    print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_p95_ms is not None and replay['end_to_end'] and replay['end_to_end']['p95_ms'] > args.max_p95_ms:
+        print(f"Latency regression: end-to-end p95 {replay['end_to_end']['p95_ms']:.2f} ms "
+              f"exceeds {args.max_p95_ms:.2f} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "numpy", "cv2", "flask", "session_store", "firebase_writer", "landmark_features",
+    "real_time_analysis", "app", "reporting", "mediapipe", "deepface", "pandas", "matplotlib.pyplot"
+]
+
+# Each measurement runs in a fresh interpreter so nothing is already cached in sys.modules
+PROBE = """
+import json, resource, sys, time
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+error = None
+try:
+    __import__(sys.argv[1])
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+elapsed = time.perf_counter() - start
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = [name for name in ("tensorflow", "deepface", "mediapipe", "matplotlib", "seaborn", "pandas", "scipy")
+         if name in sys.modules]
+print(json.dumps({'seconds': elapsed, 'rss_mb': after / 1024, 'rss_delta_mb': (after - before) / 1024,
+                  'heavy_modules': heavy, 'error': error}))
+"""
+
+
+def measure(module, repeat):
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE, module],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        lines = result.stdout.strip().splitlines()
+        if not lines:
+            return {'module': module, 'error': result.stderr.strip().splitlines()[-1:] or "no output"}
+        runs.append(json.loads(lines[-1]))
+    return {
+        'module': module,
+        'seconds': statistics.median(run['seconds'] for run in runs),
+        'rss_mb': max(run['rss_mb'] for run in runs),
+        'rss_delta_mb': max(run['rss_delta_mb'] for run in runs),
+        'heavy_modules': runs[-1]['heavy_modules'],
+        'error': runs[-1]['error']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and memory of the app's modules")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float,
+                        help="Exit non-zero if real_time_analysis or app take longer than this to import")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = [measure(module, args.repeat) for module in args.modules]
+
+    print(f"{'Module':<22} {'Import (ms)':>12} {'Peak RSS (MB)':>14} {'RSS delta (MB)':>15}  Heavy deps loaded")
+    for result in results:
+        if 'seconds' not in result:
+            print(f"{result['module']:<22} failed: {result['error']}")
+            continue
+        heavy = ", ".join(result['heavy_modules']) or "-"
+        if result['error']:
+            heavy += f"  (import failed: {result['error']})"
+        print(f"{result['module']:<22} {result['seconds'] * 1000:>12.1f} {result['rss_mb']:>14.1f} "
+              f"{result['rss_delta_mb']:>15.1f}  {heavy}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_seconds is not None:
+        slow = [r['module'] for r in results
+                if r['module'] in ("real_time_analysis", "app") and r.get('seconds', 0) > args.max_seconds]
+        if slow:
+            print(f"Startup regression: {', '.join(slow)} slower than {args.max_seconds:.2f}s")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
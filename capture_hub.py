@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+CapturedFrame = namedtuple("CapturedFrame", ["seq", "timestamp", "frame"])
+
+
+class FrameSubscriber:
+    def __init__(self, hub, name, latest_only=True):
+        self.hub = hub
+        self.name = name
+        # Live consumers (analyzer, viewers) jump straight to the newest frame;
+        # sequential consumers (recorders) walk the ring and only skip what was overwritten.
+        self.latest_only = latest_only
+        self.last_seq = hub.seq
+        self.received = 0
+        self.dropped = 0
+
+    def read(self, timeout=1.0):
+        return self.hub._read(self, timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class CaptureHub:
+    def __init__(self, source=0, width=1280, height=720, fps=30, buffer_size=8, flip=True):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.flip = flip
+        self.buffer_size = buffer_size
+        self.ring = [None] * buffer_size
+        self.seq = 0
+        self.condition = threading.Condition()
+        self.subscribers = []
+        self.is_running = False
+        self.thread = None
+        self.frames_captured = 0
+        self.read_failures = 0
+        self.open_failures = 0
+
+    def subscribe(self, name="consumer", latest_only=True):
+        with self.condition:
+            subscriber = FrameSubscriber(self, name, latest_only)
+            self.subscribers.append(subscriber)
+            if not self.is_running:
+                self.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.condition:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+            if self.subscribers:
+                return
+            # Decided under the same lock subscribe() takes, so a subscriber arriving now
+            # sees the hub stopped and starts a fresh capture thread
+            thread = self._halt()
+        self._join(thread)
+
+    def start(self):
+        with self.condition:
+            if self.is_running:
+                return
+            self.is_running = True
+            self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            thread = self._halt()
+        self._join(thread)
+
+    def _halt(self):
+        self.is_running = False
+        self.condition.notify_all()
+        return self.thread
+
+    def _join(self, thread):
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+
+    def _current(self):
+        return self.is_running and self.thread is threading.current_thread()
+
+    def _open(self):
+        # Retried with backoff for as long as someone is subscribed: the camera may be unplugged,
+        # or still held by a capture thread that is shutting down
+        delay = 0.1
+        while self._current():
+            cap = cv2.VideoCapture(self.source)
+            if cap.isOpened():
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+                cap.set(cv2.CAP_PROP_FPS, self.fps)
+                return cap
+            cap.release()
+            self.open_failures += 1
+            print(f"Camera {self.source} could not be opened, retrying in {delay:.1f}s")
+            with self.condition:
+                self.condition.wait(delay)
+            delay = min(delay * 2, 5.0)
+        return None
+
+    def _capture_loop(self):
+        try:
+            while self._current():
+                cap = self._open()
+                if cap is None:
+                    break
+                try:
+                    while self._current() and cap.isOpened():
+                        ret, frame = cap.read()
+                        if not ret:
+                            self.read_failures += 1
+                            time.sleep(0.005)
+                            continue
+
+                        if self.flip:
+                            frame = cv2.flip(frame, 1)
+                        # Every consumer shares this array, so anyone who draws on it must copy first
+                        frame.flags.writeable = False
+
+                        with self.condition:
+                            self.seq += 1
+                            self.ring[self.seq % self.buffer_size] = CapturedFrame(self.seq, time.time(), frame)
+                            self.frames_captured += 1
+                            self.condition.notify_all()
+                finally:
+                    cap.release()
+        finally:
+            with self.condition:
+                # A restart may already have replaced this thread
+                if self.thread is threading.current_thread():
+                    self.is_running = False
+                self.condition.notify_all()
+
+    def _read(self, subscriber, timeout):
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.seq <= subscriber.last_seq:
+                remaining = deadline - time.time()
+                if not self.is_running or remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+            if subscriber.latest_only:
+                next_seq = self.seq
+            else:
+                next_seq = max(subscriber.last_seq + 1, self.seq - self.buffer_size + 1)
+            subscriber.dropped += next_seq - subscriber.last_seq - 1
+            subscriber.last_seq = next_seq
+            subscriber.received += 1
+            return self.ring[next_seq % self.buffer_size]
+
+    def stats(self):
+        with self.condition:
+            return {
+                'source': self.source,
+                'running': self.is_running,
+                'frames_captured': self.frames_captured,
+                'read_failures': self.read_failures,
+                'open_failures': self.open_failures,
+                'subscribers': [
+                    {'name': s.name, 'received': s.received, 'dropped': s.dropped}
+                    for s in self.subscribers
+                ]
+            }
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_capture_hub(source=0, **kwargs):
+    with _hubs_lock:
+        hub = _hubs.get(source)
+        if hub is None:
+            hub = CaptureHub(source, **kwargs)
+            _hubs[source] = hub
+        return hub
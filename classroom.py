@@ -0,0 +1,473 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from analyzer_pool import create_face_cascade, create_face_mesh
+from event_stream import EventBroadcaster
+from firebase_writer import FirebaseWriter
+from landmark_features import face_features, face_landmark_array
+from metrics import SessionMetrics
+from preprocessing import FramePreprocessor
+from real_time_analysis import EmotionAnalyzer, EmotionWorker, EyeTracker, FaceRoiProvider, NoiseDetector
+from scheduler import AnalysisScheduler
+from session_store import ColumnarSessionStore
+
+
+class FaceTracker:
+    # Stable track IDs from greedy nearest-centroid matching between consecutive face mesh runs.
+    # Seated students barely move between frames, so position alone is enough; a track that goes
+    # unmatched for more than max_missed runs is dropped and its face gets a new ID if it returns.
+    def __init__(self, max_distance=0.08, max_missed=30):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.ids = []
+        self.centroids = np.zeros((0, 2))
+        self.missed = np.zeros(0, dtype=int)
+        self.next_id = 1
+
+    def update(self, centroids):
+        # centroids: (faces, 2) normalised. Returns the track ID for each face and the IDs dropped.
+        faces = len(centroids)
+        assigned = [None] * faces
+        matched = np.zeros(len(self.ids), dtype=bool)
+        if faces and self.ids:
+            distances = np.linalg.norm(self.centroids[:, None, :] - centroids[None, :, :], axis=-1)
+            taken = np.zeros(faces, dtype=bool)
+            for flat in np.argsort(distances, axis=None):
+                track, face = divmod(int(flat), faces)
+                if distances[track, face] > self.max_distance:
+                    break
+                if matched[track] or taken[face]:
+                    continue
+                matched[track] = taken[face] = True
+                assigned[face] = self.ids[track]
+                self.centroids[track] = centroids[face]
+
+        self.missed = np.where(matched, 0, self.missed + 1)
+        keep = self.missed <= self.max_missed
+        dropped = [track_id for track_id, kept in zip(self.ids, keep) if not kept]
+        self.ids = [track_id for track_id, kept in zip(self.ids, keep) if kept]
+        self.centroids = self.centroids[keep]
+        self.missed = self.missed[keep]
+
+        new = [face for face in range(faces) if assigned[face] is None]
+        for face in new:
+            assigned[face] = self.next_id
+            self.ids.append(self.next_id)
+            self.next_id += 1
+        if new:
+            self.centroids = np.concatenate([self.centroids, centroids[new]])
+            self.missed = np.concatenate([self.missed, np.zeros(len(new), dtype=int)])
+        return assigned, dropped
+
+
+class StudentSession:
+    # One tracked face in a classroom. Exposes the parts of RealTimeAttentionAnalyzer that the
+    # per-student endpoints read (data, events, interval_data, is_tracking, stop), so it can be
+    # registered in the SessionRegistry like a single-student session.
+    def __init__(self, classroom, track_id, student_id, seated=False):
+        self.classroom = classroom
+        self.track_id = track_id
+        self.student_id = student_id
+        self.seated = seated  # Bound to a named seat, so it resumes when a face returns there
+        self.session_id = classroom.session_id
+        self.eye_tracker = EyeTracker(face_mesh=classroom.face_mesh)
+        # Crops and smoothing only; the classroom's shared worker does the classifying
+        self.emotion_analyzer = EmotionAnalyzer(
+            face_cascade=classroom.face_cascade, classify=classroom.classify, min_interval=classroom.emotion_interval
+        )
+        self.emotion_analyzer.last_emotion_time = float('-inf')
+        # Replaced as a whole by the worker thread, so a reader never sees one result's emotion
+        # with another's attention
+        self.emotion = (self.emotion_analyzer.last_emotion, self.emotion_analyzer.last_attention)
+        self.face_roi = FaceRoiProvider()
+        self.data = ColumnarSessionStore()
+        self.events = EventBroadcaster()
+        self.interval_data = []
+        self.interval_data_lock = threading.Lock()
+        self.interval_scores = []
+        self.current_interval_start = 0
+        self.last_save = 0
+        self.is_tracking = True
+        self.active = True  # False while a seated student's face is away
+        self.stopped = False
+        self.report_job = None
+        self.touch = None  # Set by whoever registers the student, to keep the session from idling out
+        self.face_detected = False
+        self.face_box = None
+        self.eye_state = (50, 0, 0, 0.25)
+        self.overall = None
+        self.firebase_writer = None
+        if classroom.live:
+            self.firebase_writer = FirebaseWriter(
+                f"students/{student_id}/sessions/{self.session_id}/data",
+                spool_path=os.path.join("output", "firebase_spool", f"{student_id}_{self.session_id}.jsonl"),
+                reference=classroom.firebase_reference
+            )
+
+    def update_face(self, landmarks, ears, raw_gaze, current_time, img_w, img_h):
+        self.face_detected = True
+        self.face_box = self.face_roi.update(landmarks, img_w, img_h)
+        avg_ear = float(ears[0] + ears[1]) / 2
+        self.eye_tracker.detect_blink(avg_ear, current_time)
+        blink_rate = self.eye_tracker.calculate_blink_rate(current_time)
+        gaze_score = self.eye_tracker.smooth_gaze(raw_gaze)
+        eye_attention = self.eye_tracker.calculate_attention_level(gaze_score, blink_rate, avg_ear) * 100
+        self.eye_state = (eye_attention, gaze_score, blink_rate, avg_ear)
+        self.eye_tracker.update_eye_metrics(gaze_score, blink_rate, avg_ear, current_time)
+
+    def lose_face(self):
+        self.face_detected = False
+        self.face_box = None
+        self.face_roi.reset()
+        self.eye_state = (50, 0, 0, 0.25)
+
+    def record(self, current_time, noise_attention, noise_db):
+        if not self.is_tracking:
+            return
+        eye_attention, gaze_score, blink_rate, ear_value = self.eye_state
+        emotion, face_attention = "neutral", 50
+        if self.face_detected:
+            emotion, face_attention = self.emotion
+            emotion = self.emotion_analyzer.smooth_emotion(emotion)
+        # One camera gives no per-student posture, so overall averages eyes, face and noise
+        overall = (eye_attention + face_attention + noise_attention) / 3
+        self.overall = overall
+
+        self.interval_scores.append(overall)
+        if current_time >= self.current_interval_start + 10:
+            self.close_interval()
+            self.current_interval_start += 10
+
+        if current_time - self.last_save >= 1.0:
+            self.data.append(
+                timestamp=current_time,
+                posture=np.nan,
+                eye_attention=eye_attention,
+                face_attention=face_attention,
+                noise_attention=noise_attention,
+                overall=overall,
+                emotion=emotion,
+                gaze_score=gaze_score * 100,
+                blink_rate=blink_rate,
+                ear_value=ear_value,
+                head_turn=np.nan,
+                shoulder_turn=np.nan,
+                head_tilt=np.nan,
+                noise_db=noise_db,
+                face_detected=self.face_detected
+            )
+            self.last_save = current_time
+            self.events.publish('sample', {
+                'timestamp': current_time,
+                'eye_attention': eye_attention,
+                'face_attention': face_attention,
+                'noise_attention': noise_attention,
+                'overall': overall,
+                'emotion': emotion,
+                'gaze_score': gaze_score * 100,
+                'blink_rate': blink_rate,
+                'ear_value': ear_value,
+                'track_id': self.track_id,
+                'cursor': self.data.cursor()
+            })
+            if self.firebase_writer is not None:
+                self.firebase_writer.submit({
+                    'timestamp': current_time,
+                    'eye_attention': eye_attention,
+                    'face_attention': face_attention,
+                    'noise_attention': noise_attention,
+                    'overall_attention': overall,
+                    'emotion': emotion
+                })
+            if self.touch is not None:
+                self.touch()
+
+    def close_interval(self):
+        if not self.interval_scores:
+            return
+        entry = {
+            'interval_start': self.current_interval_start,
+            'overall_attention': sum(self.interval_scores) / len(self.interval_scores)
+        }
+        with self.interval_data_lock:
+            self.interval_data.append(entry)
+        self.events.publish('interval', entry)
+        self.interval_scores = []
+
+    def stop(self):
+        if self.stopped:
+            return
+        self.stopped = True
+        self.is_tracking = False
+        self.classroom.detach(self)
+        self.close_interval()
+        self.events.close()
+        if self.firebase_writer is not None:
+            self.firebase_writer.close()
+        if len(self.data):
+            folder = os.path.join(self.classroom.output_folder, self.student_id)
+            os.makedirs(folder, exist_ok=True)
+            self.data.save_npz(os.path.join(folder, "session_features.npz"))
+
+    def summary(self):
+        return {
+            'student_id': self.student_id,
+            'track_id': self.track_id,
+            'seated': self.seated,
+            'active': self.active,
+            'face_detected': self.face_detected,
+            'overall': self.overall,
+            'samples': len(self.data)
+        }
+
+
+class ClassroomAnalyzer:
+    # Scores every face one camera sees. Face mesh runs once per frame for all faces, features are
+    # computed in one batched call, and each track keeps its own eye/emotion state and results.
+    def __init__(self, classroom_id, session_id, max_faces=30, seats=None, seat_distance=0.1, live=True,
+                 output_folder=None, firebase_reference=None, face_mesh=None, classify=None, inference_width=None,
+                 emotion_interval=5.0, schedule=None, metrics_enabled=False, metrics=None, on_student=None,
+                 on_student_lost=None):
+        self.classroom_id = classroom_id
+        self.session_id = session_id
+        self.live = live
+        self.firebase_reference = firebase_reference
+        self.emotion_interval = emotion_interval
+        self.owns_face_mesh = face_mesh is None
+        self.face_mesh = face_mesh if face_mesh is not None else create_face_mesh(max_num_faces=max_faces)
+        self.models_lock = threading.Lock()
+        self.face_cascade = create_face_cascade()
+        self.metrics = metrics or SessionMetrics(enabled=metrics_enabled)
+        self.face_mesh_process = self.metrics.wrap('face_mesh', self.face_mesh.process)
+        self.classify = self.metrics.wrap('emotion_model', classify or EmotionAnalyzer.classify_face)
+        # One worker for the whole room, so DeepFace never runs on the frame thread
+        self.emotion_worker = EmotionWorker(
+            self.classify, EmotionAnalyzer(face_cascade=self.face_cascade).attention_map, on_result=self.emotion_ready
+        )
+        # Faces across a room are small, so the frame is kept at full resolution unless asked otherwise
+        self.preprocessor = FramePreprocessor(inference_width=inference_width)
+        self.scheduler = AnalysisScheduler(stages=schedule, adaptive=live)
+        self.tracker = FaceTracker()
+        self.tracks = {}
+        self.closed_tracks = set()  # Stopped on their own (e.g. via /stop_tracking); not re-added while tracked
+        self.lock = threading.Lock()
+        # Track IDs cannot tell a returning face from a new one, so names are only given by seat:
+        # student_id -> normalised (x, y). A new track within seat_distance of a free seat takes
+        # that name; every other track gets a generated ID.
+        self.seats = {
+            student_id: np.asarray(position, dtype=np.float64) for student_id, position in (seats or {}).items()
+        }
+        self.seat_distance = seat_distance
+        self.away = {}  # Seated students whose track was dropped, by student_id
+        self.on_student = on_student
+        self.on_student_lost = on_student_lost
+        self.noise_detector = NoiseDetector(
+            use_microphone=live, hop_size=2400 if live else None, history_size=1200 if live else None
+        )
+        self.output_folder = output_folder or os.path.join("output", "classroom", f"{classroom_id}_{session_id}")
+        os.makedirs(self.output_folder, exist_ok=True)
+        self.start_time = time.time()
+        self.is_tracking = False
+        self.stopped = False
+        self.noise_thread = None
+        if live:
+            self.noise_thread = threading.Thread(target=self.noise_detector.start_monitoring, daemon=True)
+            self.noise_detector.is_recording = True
+            self.noise_thread.start()
+
+    def add_student(self, track_id, centroid):
+        seat = self.free_seat(centroid)
+        student = self.away.pop(seat, None)
+        if student is not None:
+            # Back in their seat: same session, new track
+            student.track_id = track_id
+            student.active = True
+            self.tracks[track_id] = student
+            return student
+        student_id = seat or f"{self.classroom_id}-{track_id:02d}"
+        student = StudentSession(self, track_id, student_id, seated=seat is not None)
+        self.tracks[track_id] = student
+        if self.on_student is not None:
+            self.on_student(student)
+        return student
+
+    def free_seat(self, centroid):
+        taken = {s.student_id for s in self.tracks.values()}
+        distances = [
+            (float(np.linalg.norm(position - centroid)), student_id)
+            for student_id, position in self.seats.items() if student_id not in taken
+        ]
+        if not distances:
+            return None
+        distance, student_id = min(distances)
+        return student_id if distance <= self.seat_distance else None
+
+    def lose_student(self, student):
+        # Off the frame thread: stopping saves the archive and flushes the Firebase writer
+        student.stop()
+        if self.on_student_lost is not None:
+            self.on_student_lost(student)
+
+    def detach(self, student):
+        with self.lock:
+            if self.tracks.get(student.track_id) is student:
+                del self.tracks[student.track_id]
+                self.closed_tracks.add(student.track_id)
+            if self.away.get(student.student_id) is student:
+                del self.away[student.student_id]
+            # A seated student who stopped on their own does not take the seat back
+            self.seats.pop(student.student_id, None)
+
+    def process_frame(self, frame, draw_overlay=True, timestamp=None):
+        # Held for the whole frame: stop() takes it before closing the face mesh, so a frame still
+        # running when the pipeline gives up waiting never uses a closed graph
+        with self.models_lock:
+            if self.stopped:
+                return frame
+            return self.analyze_frame(frame, draw_overlay, timestamp)
+
+    def analyze_frame(self, frame, draw_overlay=True, timestamp=None):
+        if not self.is_tracking:
+            return frame
+        current_time = time.time() - self.start_time if timestamp is None else timestamp
+        if not self.scheduler.due('face_mesh', current_time):
+            self.metrics.count('frames_skipped')
+            if draw_overlay:
+                self.display_overlay(frame, *self.get_latest_metrics())
+            return frame
+
+        timer = self.metrics.timer()
+        h, w = frame.shape[:2]
+        inference = self.preprocessor.prepare(frame)
+        timer.lap('preprocess')
+        results = self.scheduler.run('face_mesh', current_time, self.face_mesh_process, inference.rgb)
+        faces = results.multi_face_landmarks or []
+        timer.lap('inference')
+
+        # Every face's feature landmarks in one (faces, 13, 2) array, so EAR and gaze are one call
+        if faces:
+            points = np.stack([face_landmark_array(face.landmark) for face in faces])
+            ears, raw_gaze = face_features(points, w, h)
+            centroids = points.mean(axis=1)
+        else:
+            centroids = np.zeros((0, 2))
+        track_ids, dropped = self.tracker.update(centroids)
+        timer.lap('features')
+
+        lost = []
+        with self.lock:
+            for track_id in dropped:
+                student = self.tracks.pop(track_id, None)
+                if student is None:
+                    continue
+                student.active = False
+                student.lose_face()
+                if student.seated:
+                    self.away[student.student_id] = student
+                else:
+                    lost.append(student)
+            seen = set()
+            for index, track_id in enumerate(track_ids):
+                if track_id in self.closed_tracks:
+                    continue
+                student = self.tracks.get(track_id) or self.add_student(track_id, centroids[index])
+                student.update_face(faces[index].landmark, ears[index], raw_gaze[index], current_time, w, h)
+                seen.add(track_id)
+            students = list(self.tracks.values())
+        for student in lost:
+            threading.Thread(target=self.lose_student, args=(student,), daemon=True).start()
+        for student in students:
+            if student.track_id not in seen and student.face_detected:
+                student.lose_face()
+        timer.lap('eye')
+
+        self.classify_next(frame, current_time, students)
+        timer.lap('emotion')
+
+        noise_attention = 100
+        noise_db = np.nan
+        if self.noise_detector.noise_data:
+            noise_attention = self.noise_detector.noise_data[-1]['attention']
+            noise_db = self.noise_detector.noise_data[-1]['db']
+        for student in students:
+            student.record(current_time, noise_attention, noise_db)
+        timer.lap('store')
+
+        if draw_overlay:
+            self.display_overlay(frame, *self.get_latest_metrics())
+            timer.lap('overlay')
+        timer.done('process_frame')
+        return frame
+
+    def classify_next(self, frame, current_time, students):
+        # One crop at a time to the shared worker, for the student who has waited longest, so the
+        # classroom's emotion cost stays flat however many faces are in view. Waiting for the
+        # worker to go idle means no student's crop is replaced before it was classified.
+        if not self.emotion_worker.idle():
+            return
+        due = [
+            s for s in students
+            if s.face_box is not None and current_time - s.emotion_analyzer.last_emotion_time >= self.emotion_interval
+        ]
+        if due:
+            student = min(due, key=lambda s: s.emotion_analyzer.last_emotion_time)
+            face_roi = student.emotion_analyzer.crop_face(frame, student.face_box)
+            self.emotion_worker.submit(face_roi.copy(), (student.track_id, current_time))
+            student.emotion_analyzer.last_emotion_time = current_time
+
+    def emotion_ready(self, emotion, attention, tag):
+        # Worker thread; the track may have been dropped while its crop was being classified
+        track_id, _ = tag
+        with self.lock:
+            student = self.tracks.get(track_id)
+        if student is not None:
+            student.emotion = (emotion, attention)
+
+    def get_latest_metrics(self):
+        with self.lock:
+            return ([
+                (s.face_box, s.student_id, s.overall)
+                for s in self.tracks.values() if s.face_detected and s.face_box is not None
+            ],)
+
+    def display_overlay(self, frame, tracks):
+        for (x, y, w, h), student_id, overall in tracks:
+            overall = 50 if overall is None else overall
+            color = (0, 255, 0) if overall > 70 else (0, 165, 255) if overall > 50 else (0, 0, 255)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+            cv2.putText(frame, f"{student_id}: {overall:.0f}%", (x, max(15, y - 8)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+    def summary(self):
+        with self.lock:
+            students = [s.summary() for s in list(self.tracks.values()) + list(self.away.values())]
+        return {
+            'classroom_id': self.classroom_id,
+            'session_id': self.session_id,
+            'is_tracking': self.is_tracking,
+            'students': students
+        }
+
+    def stop(self):
+        if self.stopped:
+            return
+        self.stopped = True
+        self.is_tracking = False
+        self.noise_detector.is_recording = False
+        if self.noise_thread is not None:
+            self.noise_thread.join(timeout=1.0)
+        if self.noise_detector.audio is not None:
+            self.noise_detector.audio.terminate()
+        with self.lock:
+            students = list(self.tracks.values()) + list(self.away.values())
+        for student in students:
+            student.stop()
+        self.emotion_worker.stop()
+        with self.models_lock:
+            if self.owns_face_mesh:
+                self.face_mesh.close()
+        self.metrics.write_log(os.path.join(self.output_folder, "metrics.json"))
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    def __init__(self, max_pending):
+        self.pending = deque()
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.unreported_drops = 0
+
+
+class EventBroadcaster:
+    def __init__(self, max_pending=100, heartbeat_interval=15.0):
+        self.max_pending = max_pending
+        self.heartbeat_interval = heartbeat_interval
+        self.condition = threading.Condition()
+        self.subscriptions = []
+        self.event_id = 0
+        self.published = 0
+        self.closed = False
+
+    def subscribe(self):
+        subscription = Subscription(self.max_pending)
+        with self.condition:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.condition:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def publish(self, event, data):
+        with self.condition:
+            if self.closed:
+                return
+            self.event_id += 1
+            # Serialised once, then the same bytes are fanned out to every subscriber
+            message = f"id: {self.event_id}\nevent: {event}\ndata: {json.dumps(data, default=float)}\n\n"
+            for subscription in self.subscriptions:
+                if len(subscription.pending) >= subscription.max_pending:
+                    # Slow clients lose the oldest events rather than holding memory or the publisher
+                    subscription.pending.popleft()
+                    subscription.dropped += 1
+                    subscription.unreported_drops += 1
+                subscription.pending.append(message)
+            self.published += 1
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stream(self, subscription):
+        last_sent = time.time()
+        try:
+            while True:
+                with self.condition:
+                    if not subscription.pending and not self.closed:
+                        self.condition.wait(max(0.0, self.heartbeat_interval - (time.time() - last_sent)))
+                    messages = list(subscription.pending)
+                    subscription.pending.clear()
+                    drops, subscription.unreported_drops = subscription.unreported_drops, 0
+                    closed = self.closed
+
+                if drops:
+                    # Tell the client to resync (e.g. with a since= poll) instead of silently skipping
+                    yield f"event: dropped\ndata: {json.dumps({'count': drops})}\n\n"
+                for message in messages:
+                    yield message
+                if messages or drops:
+                    last_sent = time.time()
+                elif closed:
+                    yield "event: closed\ndata: {}\n\n"
+                    break
+                elif time.time() - last_sent >= self.heartbeat_interval:
+                    yield ": heartbeat\n\n"
+                    last_sent = time.time()
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'published': self.published,
+                'subscribers': len(self.subscriptions),
+                'dropped': sum(s.dropped for s in self.subscriptions)
+            }
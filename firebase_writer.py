@@ -0,0 +1,304 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+def generate_push_id(now_ms=None):
+    # Same layout as Firebase push() keys (8 time chars + 12 random chars) so
+    # batched children still sort chronologically
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    time_chars = []
+    for _ in range(8):
+        time_chars.append(PUSH_CHARS[now_ms % 64])
+        now_ms //= 64
+    random_chars = [random.choice(PUSH_CHARS) for _ in range(12)]
+    return "".join(reversed(time_chars)) + "".join(random_chars)
+
+
+class LocalRealtimeDatabase:
+    # In-memory stand-in for firebase_admin.db, used to exercise the writer without a network
+    def __init__(self):
+        self.root = {}
+        self.online = True
+        self.update_calls = 0
+        self.lock = threading.Lock()
+
+    def reference(self, path):
+        return LocalReference(self, path)
+
+    def get(self, path):
+        node = self.root
+        for part in [p for p in path.split("/") if p]:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+
+class LocalReference:
+    def __init__(self, database, path):
+        self.database = database
+        self.path = path.strip("/")
+
+    def update(self, value):
+        with self.database.lock:
+            if not self.database.online:
+                raise ConnectionError("Local database is offline")
+            self.database.update_calls += 1
+            for child_path, child_value in value.items():
+                node = self.database.root
+                parts = [p for p in f"{self.path}/{child_path}".split("/") if p]
+                for part in parts[:-1]:
+                    node = node.setdefault(part, {})
+                node[parts[-1]] = child_value
+
+    def push(self, value):
+        key = generate_push_id()
+        self.update({key: value})
+        return LocalReference(self.database, f"{self.path}/{key}")
+
+    def get(self):
+        with self.database.lock:
+            return self.database.get(self.path)
+
+
+# Spool files are shared between writers (a session restarted under the same IDs, or any writer
+# replaying files orphaned by a closed session or a restart), so every access goes through one
+# lock per file
+_spool_locks = {}
+_active_spools = set()
+_spools_lock = threading.Lock()
+
+
+def spool_lock(spool_path):
+    with _spools_lock:
+        return _spool_locks.setdefault(os.path.abspath(spool_path), threading.Lock())
+
+
+def replay_spool_file(spool_path, write, default_path=None, batch_size=50):
+    # Replays a spool in order, one write per run of entries for the same database path, and
+    # rewrites it with whatever is still pending. write(payload, path) returns False to stop.
+    with spool_lock(spool_path):
+        if not os.path.exists(spool_path):
+            return 0
+        with open(spool_path) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+
+        replayed = 0
+        while replayed < len(entries):
+            path = entries[replayed].get('path', default_path)
+            chunk = []
+            for entry in entries[replayed:replayed + batch_size]:
+                if entry.get('path', default_path) != path:
+                    break
+                chunk.append(entry)
+            if path is None or not write({entry['key']: entry['data'] for entry in chunk}, path):
+                break
+            replayed += len(chunk)
+
+        remaining = entries[replayed:]
+        if remaining:
+            tmp_path = spool_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, spool_path)
+        else:
+            os.remove(spool_path)
+    return replayed
+
+
+def sweep_spools(directory, write, batch_size=50):
+    # Spools no live writer owns: sessions closed while offline, or a server that restarted
+    if not os.path.isdir(directory):
+        return 0
+    replayed = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl"):
+            continue
+        spool_path = os.path.abspath(os.path.join(directory, name))
+        with _spools_lock:
+            if spool_path in _active_spools:
+                continue
+        replayed += replay_spool_file(spool_path, write, batch_size=batch_size)
+    return replayed
+
+
+def replay_spools(directory, reference=None, batch_size=50):
+    # Startup replay of leftover spools, before any writer exists
+    if reference is None:
+        from firebase_admin import db
+        reference = db.reference
+
+    def write(payload, path):
+        try:
+            reference(path).update(payload)
+            return True
+        except Exception as e:
+            print(f"Error replaying Firebase spool: {e}")
+            return False
+
+    replayed = sweep_spools(directory, write, batch_size)
+    if replayed:
+        print(f"Replayed {replayed} spooled samples to Firebase")
+    return replayed
+
+
+class FirebaseWriter:
+    def __init__(self, path, spool_path, reference=None, batch_size=50, flush_interval=1.0,
+                 max_retries=3, backoff=0.5, max_backoff=30.0, session_metrics=None, sweep_interval=60.0):
+        if reference is None:
+            from firebase_admin import db
+            reference = db.reference
+        self.path = path
+        self.spool_path = spool_path
+        self.reference = reference
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session_metrics = session_metrics
+        self.sweep_interval = sweep_interval
+
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.spool_lock = spool_lock(spool_path)
+        self.retry_delay = backoff
+        self.next_attempt = 0
+        self.next_sweep = 0
+        with _spools_lock:
+            _active_spools.add(os.path.abspath(spool_path))
+
+        self.written = 0
+        self.batches = 0
+        self.failed_writes = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.last_error = None
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.last_queue_delay = 0.0
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, data):
+        self.queue.put((generate_push_id(), data, time.time()))
+
+    def close(self, timeout=5.0):
+        self.stop_event.set()
+        # Wakes the writer if it is waiting out flush_interval on an empty queue
+        self.queue.put(None)
+        self.thread.join(timeout=timeout)
+        # Anything still spooled is now an orphan that other writers or the next startup replay
+        with _spools_lock:
+            _active_spools.discard(os.path.abspath(self.spool_path))
+
+    @property
+    def is_online(self):
+        return self.next_attempt == 0
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+            elif self.stop_event.is_set():
+                if self.is_online and os.path.exists(self.spool_path):
+                    self._replay_spool()
+                break
+            elif time.time() >= self.next_attempt and os.path.exists(self.spool_path):
+                self._replay_spool()
+
+    def _collect_batch(self):
+        # Coalesce whatever arrives within flush_interval into one write
+        batch = []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if self.stop_event.is_set():
+                remaining = 0
+            try:
+                if remaining > 0:
+                    item = self.queue.get(timeout=remaining)
+                else:
+                    item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                batch.append(item)
+        return batch
+
+    def _flush(self, batch):
+        payload = {key: data for key, data, _ in batch}
+        if time.time() >= self.next_attempt and self._write(payload):
+            self.last_queue_delay = time.time() - batch[0][2]
+            if os.path.exists(self.spool_path):
+                self._replay_spool()
+            if self.sweep_interval is not None and time.time() >= self.next_sweep:
+                # Back online: also replay what closed sessions left in the spool directory
+                self.next_sweep = time.time() + self.sweep_interval
+                self.replayed += sweep_spools(os.path.dirname(self.spool_path) or ".", self._write, self.batch_size)
+        else:
+            self._spool(batch)
+
+    def _write(self, payload, path=None):
+        for attempt in range(self.max_retries):
+            start = time.perf_counter()
+            try:
+                self.reference(path or self.path).update(payload)
+            except Exception as e:
+                self.failed_writes += 1
+                self.last_error = str(e)
+                if attempt + 1 < self.max_retries:
+                    self.stop_event.wait(min(self.backoff * 2 ** attempt, self.max_backoff))
+                continue
+
+            self.last_latency = time.perf_counter() - start
+            self.total_latency += self.last_latency
+            if self.session_metrics is not None:
+                self.session_metrics.observe('firebase_write', self.last_latency)
+            self.batches += 1
+            self.written += len(payload)
+            self.retry_delay = self.backoff
+            self.next_attempt = 0
+            return True
+
+        print(f"Error saving to Firebase, spooling locally: {self.last_error}")
+        self.next_attempt = time.time() + self.retry_delay
+        self.retry_delay = min(self.retry_delay * 2, self.max_backoff)
+        return False
+
+    def _spool(self, batch):
+        with self.spool_lock:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            with open(self.spool_path, 'a') as f:
+                for key, data, _ in batch:
+                    f.write(json.dumps({'path': self.path, 'key': key, 'data': data}, default=float) + "\n")
+        self.spooled += len(batch)
+
+    def _replay_spool(self):
+        self.replayed += replay_spool_file(self.spool_path, self._write, self.path, self.batch_size)
+
+    def metrics(self):
+        spool_size = os.path.getsize(self.spool_path) if os.path.exists(self.spool_path) else 0
+        return {
+            'queue_depth': self.queue.qsize(),
+            'online': self.is_online,
+            'written': self.written,
+            'batches': self.batches,
+            'failed_writes': self.failed_writes,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'spool_bytes': spool_size,
+            'last_latency': self.last_latency,
+            'avg_latency': self.total_latency / self.batches if self.batches else 0.0,
+            'last_queue_delay': self.last_queue_delay,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,97 @@
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+
+LEFT_EYE_KEY = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE_KEY = [362, 385, 387, 263, 373, 380]
+NOSE_TIP = 1
+
+_XY = attrgetter('x', 'y')
+
+# Rows 0-5 left eye, 6-11 right eye, 12 nose tip. Rows 0 and 6 double as the eye centres used for gaze.
+FACE_FEATURE_INDICES = LEFT_EYE_KEY + RIGHT_EYE_KEY + [NOSE_TIP]
+
+# MediaPipe pose: nose, left ear, right ear, left shoulder, right shoulder
+POSE_FEATURE_INDICES = [0, 7, 8, 11, 12]
+
+# Rows of a face feature array, and of each eye within it: p1-p6 in EAR order
+P1, P2, P3, P4, P5, P6 = range(6)
+# Eyelid pairs for the EAR's vertical distances: p2-p6 and p3-p5
+UPPER_LID = slice(P2, P4)
+LOWER_LID = slice(P6, P4, -1)
+LEFT_EYE_CENTER = 0
+RIGHT_EYE_CENTER = 6
+NOSE = 12
+
+# Rows of a pose feature array, with the ears and shoulders also viewed as left/right pairs
+POSE_NOSE, LEFT_EAR, RIGHT_EAR, LEFT_SHOULDER, RIGHT_SHOULDER = range(5)
+EARS, SHOULDERS = range(2)
+LEFT, RIGHT = range(2)
+X, Y = range(2)
+
+
+def landmark_array(landmarks, indices):
+    # The only Python-level walk over the MediaPipe objects; everything after is array indexing.
+    # Read straight into the array with attrgetter/fromiter rather than via a list of tuples.
+    # float64 keeps pixel truncation and near-degenerate pose ratios identical to the scalar code.
+    values = chain.from_iterable(map(_XY, map(landmarks.__getitem__, indices)))
+    return np.fromiter(values, np.float64, 2 * len(indices)).reshape(-1, 2)
+
+
+def face_landmark_array(landmarks):
+    return landmark_array(landmarks, FACE_FEATURE_INDICES)
+
+
+def pose_landmark_array(landmarks):
+    return landmark_array(landmarks, POSE_FEATURE_INDICES)
+
+
+def face_features(points, img_w, img_h):
+    # points: (..., 13, 2) normalised coordinates, optionally batched over faces.
+    # Returns per-eye EAR (..., 2) and the unsmoothed gaze score (...).
+    # Eye points are truncated to whole pixels like the original per-eye landmark lists.
+    # (..., 2, 6, 2): the left then the right eye, each in EAR point order
+    eyes = np.trunc(points[..., :NOSE, :] * np.array((img_w, img_h), dtype=np.float64))
+    eyes = eyes.reshape(points.shape[:-2] + (2, 6, 2))
+    lids = eyes[..., UPPER_LID, :] - eyes[..., LOWER_LID, :]
+    lids = np.hypot(lids[..., 0], lids[..., 1])
+    width = eyes[..., P1, :] - eyes[..., P4, :]
+    vertical = lids[..., 0] + lids[..., 1]
+    horizontal = 2 * np.hypot(width[..., 0], width[..., 1])
+    if horizontal.all():
+        ear = vertical / horizontal
+    else:
+        ear = np.divide(vertical, horizontal, out=np.full_like(vertical, 0.25), where=horizontal > 0)
+
+    # Offsets from the frame centre in normalised coordinates; the image size cancels out
+    nose_x, nose_y = points[..., NOSE, 0], points[..., NOSE, 1]
+    eye_center_x = (points[..., LEFT_EYE_CENTER, 0] + points[..., RIGHT_EYE_CENTER, 0]) / 2
+    dx = np.abs((nose_x + eye_center_x) / 2 - 0.5)
+    dy = np.abs(nose_y - 0.5)
+    gaze = np.maximum(0, 1 - dx / 0.3) * 0.7 + np.maximum(0, 1 - dy / 0.25) * 0.3
+    return ear, gaze
+
+
+def pose_features(points):
+    # points: (..., 5, 2) normalised coordinates. Returns (..., 3) head turn, shoulder turn
+    # and head tilt ratios; degenerate geometry yields non-finite turn ratios.
+    nose = points[..., POSE_NOSE, :]
+    # (..., 2, 2, 2): ears then shoulders, each left then right
+    sides = points[..., LEFT_EAR:, :].reshape(points.shape[:-2] + (2, 2, 2))
+    center = (sides[..., LEFT, :] + sides[..., RIGHT, :]) / 2
+
+    # Columns: head turn, shoulder turn, head tilt
+    numerator = np.empty(points.shape[:-2] + (3,))
+    numerator[..., :2] = nose[..., None, X] - center[..., X]
+    numerator[..., 2] = nose[..., Y] - center[..., EARS, Y]
+    denominator = np.empty_like(numerator)
+    denominator[..., :2] = sides[..., RIGHT, X] - sides[..., LEFT, X]
+    denominator[..., 2] = np.abs(center[..., EARS, Y] - center[..., SHOULDERS, Y])
+    if denominator.all():
+        return numerator / denominator
+
+    ratios = np.divide(numerator, denominator, out=np.full_like(numerator, np.inf), where=denominator != 0)
+    # A zero ear-to-shoulder distance counts as no tilt
+    ratios[..., 2] = np.where(denominator[..., 2] > 0, ratios[..., 2], 0)
+    return ratios
@@ -0,0 +1,193 @@
+import bisect
+import json
+import threading
+import time
+
+# Seconds; spans a cheap colour conversion up to a slow DeepFace call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation, as Prometheus does
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            if seen + count >= rank and count:
+                if bound == float('inf'):
+                    return self.buckets[-1]
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+
+class NullTimer:
+    def lap(self, stage):
+        pass
+
+    def done(self, stage):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class LapTimer:
+    # Times consecutive stages of one frame: each lap() records the time since the previous one
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.metrics.observe(stage, now - self.last)
+        self.last = now
+
+    def done(self, stage):
+        self.metrics.observe(stage, time.perf_counter() - self.start)
+
+
+class SessionMetrics:
+    def __init__(self, enabled=True, keep_samples=False):
+        self.enabled = enabled
+        # Raw timings as well as histograms, for benchmarks that need exact percentiles
+        self.keep_samples = keep_samples
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.started_at = time.time()
+
+    def timer(self):
+        return LapTimer(self) if self.enabled else NULL_TIMER
+
+    def observe(self, stage, seconds):
+        # Callers outside timer() (e.g. MjpegBroadcaster) observe directly
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+            if self.keep_samples:
+                self.samples.setdefault(stage, []).append(seconds)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def wrap(self, model, fn):
+        # Times and counts every call to a model; disabled metrics hand back fn untouched
+        if not self.enabled:
+            return fn
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(model, time.perf_counter() - start)
+                self.count(f"{model}_invocations")
+        return timed
+
+    def snapshot(self):
+        with self.lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                stages[stage] = {
+                    'count': histogram.count,
+                    'mean': histogram.sum / histogram.count if histogram.count else None,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                    'p99': histogram.quantile(0.99)
+                }
+            return {
+                'duration': time.time() - self.started_at,
+                'stages': stages,
+                'counters': dict(self.counters)
+            }
+
+    def write_log(self, path):
+        if not self.enabled:
+            return
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def collect(self, labels, families):
+        with self.lock:
+            for stage, histogram in self.histograms.items():
+                add_sample(families, 'stage_latency_seconds', 'histogram',
+                           'Time spent per frame in each analysis stage',
+                           dict(labels, stage=stage), histogram.cumulative() + [('sum', histogram.sum)])
+            for name, value in self.counters.items():
+                add_sample(families, f"{name}_total", 'counter', f"Total {name.replace('_', ' ')}", labels, value)
+
+
+def add_sample(families, name, kind, help_text, labels, value):
+    family = families.setdefault(name, (kind, help_text, []))
+    family[2].append((labels, value))
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def render_prometheus(families, prefix="attention_"):
+    # Prometheus text exposition format 0.0.4; every family's samples are emitted together
+    lines = []
+    for name in sorted(families):
+        kind, help_text, samples = families[name]
+        full_name = prefix + name
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in samples:
+            if kind != 'histogram':
+                lines.append(f"{full_name}{format_labels(labels)} {format_value(value)}")
+                continue
+            count = 0
+            for bound, total in value:
+                if bound == 'sum':
+                    lines.append(f"{full_name}_sum{format_labels(labels)} {format_value(total)}")
+                    continue
+                count = total
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f"{full_name}_bucket{format_labels(dict(labels, le=le))} {count}")
+            lines.append(f"{full_name}_count{format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import cv2
+
+# Client qualities snap to these, so a room of viewers costs at most this many encodes per frame
+QUALITY_LEVELS = (30, 50, 70, 80, 90)
+
+
+def quality_level(quality):
+    return min(QUALITY_LEVELS, key=lambda level: abs(level - quality))
+
+
+class MjpegClient:
+    def __init__(self, name, quality, fps):
+        self.name = name
+        self.quality = quality
+        self.interval = 1.0 / fps if fps else 0.0
+        self.last_seq = 0
+        self.next_send = 0.0
+        self.sent = 0
+        self.skipped = 0
+        self.connected_at = time.time()
+
+
+class MjpegBroadcaster:
+    # Latest-frame MJPEG fan-out. Each published frame is JPEG-encoded at most once per quality
+    # level, on demand, and the same bytes go to every client at that level. A client that falls
+    # behind (slow socket or a lower fps) simply gets the newest frame next, never a backlog.
+    def __init__(self, source=None, name="mjpeg", default_quality=80, max_fps=30.0, metrics=None):
+        self.source = source  # Optional CaptureHub, read only while clients are connected
+        self.name = name
+        self.default_quality = default_quality
+        self.max_fps = max_fps
+        self.metrics = metrics
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.frame = None
+        self.encoded = {}  # quality -> (seq, jpeg bytes)
+        self.encode_locks = {}
+        self.clients = []
+        self.feed_thread = None
+        self.closed = False
+        self.published = 0
+        self.encodes = 0
+        self.encode_seconds = 0.0
+
+    def publish(self, frame):
+        # frame must not be modified afterwards; it is encoded lazily from client threads
+        with self.condition:
+            self.seq += 1
+            self.frame = frame
+            self.published += 1
+            self.condition.notify_all()
+
+    def subscribe(self, quality=None, fps=None, name="viewer"):
+        quality = quality_level(quality or self.default_quality)
+        fps = min(fps, self.max_fps) if fps else None
+        client = MjpegClient(name, quality, fps)
+        with self.condition:
+            self.clients.append(client)
+            if self.source is not None and self.feed_thread is None and not self.closed:
+                self.feed_thread = threading.Thread(target=self._feed, name=f"{self.name}-feed", daemon=True)
+                self.feed_thread.start()
+        return client
+
+    def unsubscribe(self, client):
+        with self.condition:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def _feed(self):
+        # Holds a hub subscription only while someone is watching, so an unwatched camera can stop
+        subscriber = self.source.subscribe(self.name)
+        try:
+            while True:
+                with self.condition:
+                    if not self.clients or self.closed:
+                        self.feed_thread = None
+                        break
+                captured = subscriber.read(timeout=1.0)
+                if captured is None:
+                    if not self.source.is_running:
+                        # Camera gone: end the current streams; a later subscribe starts a new feed
+                        with self.condition:
+                            self.feed_thread = None
+                            self.condition.notify_all()
+                        break
+                    continue
+                self.publish(captured.frame)
+        finally:
+            subscriber.close()
+
+    def jpeg(self, quality):
+        with self.condition:
+            seq, frame = self.seq, self.frame
+            cached = self.encoded.get(quality)
+            lock = self.encode_locks.setdefault(quality, threading.Lock())
+        if cached is not None and cached[0] == seq:
+            return seq, cached[1]
+
+        # Clients at the same level wait for the one encode instead of each running their own
+        with lock:
+            cached = self.encoded.get(quality)
+            if cached is not None and cached[0] >= seq:
+                return cached
+            start = time.perf_counter()
+            ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+            elapsed = time.perf_counter() - start
+            if not ret:
+                return seq, None
+            data = buffer.tobytes()
+            self.encoded[quality] = (seq, data)
+            self.encodes += 1
+            self.encode_seconds += elapsed
+        if self.metrics is not None:
+            self.metrics.observe('jpeg_encode', elapsed)
+        return seq, data
+
+    def stream(self, client, on_frame=None):
+        try:
+            while True:
+                with self.condition:
+                    if self.seq <= client.last_seq and not self.closed:
+                        self.condition.wait(1.0)
+                    if self.closed:
+                        break
+                    if self.seq <= client.last_seq:
+                        if self.source is not None and self.feed_thread is None:
+                            break
+                        continue
+
+                delay = client.next_send - time.time()
+                if delay > 0:
+                    # Rate-limited clients sleep, then take whatever is newest
+                    time.sleep(delay)
+                seq, data = self.jpeg(client.quality)
+                if data is None:
+                    client.last_seq = seq
+                    continue
+                if client.last_seq:
+                    client.skipped += seq - client.last_seq - 1
+                client.last_seq = seq
+                client.sent += 1
+                client.next_send = time.time() + client.interval
+                if on_frame is not None:
+                    on_frame()
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + data + b'\r\n\r\n')
+        finally:
+            self.unsubscribe(client)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'published': self.published,
+                'encodes': self.encodes,
+                'avg_encode_latency': self.encode_seconds / self.encodes if self.encodes else 0.0,
+                'clients': [
+                    {
+                        'name': c.name,
+                        'quality': c.quality,
+                        'fps': 1.0 / c.interval if c.interval else None,
+                        'sent': c.sent,
+                        'skipped': c.skipped
+                    }
+                    for c in self.clients
+                ]
+            }
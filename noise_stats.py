@@ -0,0 +1,159 @@
+import math
+
+
+class RunningCorrelation:
+    # Streaming Pearson correlation (Welford co-moments); mergeable across offline segments
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.co_moment = 0.0
+
+    def add(self, x, y):
+        self.count += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.count
+        dy = y - self.mean_y
+        self.mean_y += dy / self.count
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.co_moment += dx * (y - self.mean_y)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        count = self.count + other.count
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        self.m2_x += other.m2_x + dx * dx * self.count * other.count / count
+        self.m2_y += other.m2_y + dy * dy * self.count * other.count / count
+        self.co_moment += other.co_moment + dx * dy * self.count * other.count / count
+        self.mean_x += dx * other.count / count
+        self.mean_y += dy * other.count / count
+        self.count = count
+
+    @property
+    def correlation(self):
+        if self.count < 2 or self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return self.co_moment / math.sqrt(self.m2_x * self.m2_y)
+
+
+class NoiseSegment:
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.count = 0
+        self.seconds = 0.0
+        self.sum_db = 0.0
+        self.peak_db = None
+        self.seconds_above = 0.0
+        self.sum_attention = 0.0
+        self.correlation = RunningCorrelation()
+
+    def add(self, db, attention, duration, threshold_db):
+        self.count += 1
+        self.seconds += duration
+        self.sum_db += db
+        self.peak_db = db if self.peak_db is None else max(self.peak_db, db)
+        if db > threshold_db:
+            self.seconds_above += duration
+        self.sum_attention += attention
+        self.correlation.add(db, attention)
+
+    def merge(self, other):
+        self.count += other.count
+        self.seconds += other.seconds
+        self.sum_db += other.sum_db
+        if other.peak_db is not None:
+            self.peak_db = other.peak_db if self.peak_db is None else max(self.peak_db, other.peak_db)
+        self.seconds_above += other.seconds_above
+        self.sum_attention += other.sum_attention
+        self.correlation.merge(other.correlation)
+
+    @property
+    def mean_db(self):
+        return self.sum_db / self.count if self.count else 0.0
+
+    @property
+    def mean_attention(self):
+        return self.sum_attention / self.count if self.count else 0.0
+
+
+def classify_level(db):
+    if db < 40:
+        return "Quiet", "Ambient"
+    elif db < 50:
+        return "Normal ambient", "Ambient"
+    elif db < 60:
+        return "Conversation level", "Conversational"
+    elif db < 70:
+        return "Loud", "Disruptive"
+    return "Very loud", "Disruptive"
+
+
+class NoiseStatistics:
+    # Fixed-length time segments updated once per noise level (every audio hop); the summary only
+    # walks segments
+    def __init__(self, segment_seconds=20, threshold_db=55):
+        self.segment_seconds = segment_seconds
+        self.threshold_db = threshold_db
+        self.segments = {}
+        self.overall = NoiseSegment(0, 0)
+
+    def add(self, timestamp, db, attention, duration=1.0):
+        index = int(timestamp // self.segment_seconds)
+        segment = self.segments.get(index)
+        if segment is None:
+            segment = self.segments[index] = NoiseSegment(
+                index * self.segment_seconds, (index + 1) * self.segment_seconds
+            )
+        segment.add(db, attention, duration, self.threshold_db)
+        self.overall.add(db, attention, duration, self.threshold_db)
+
+    def merge(self, other):
+        for index, segment in other.segments.items():
+            if index in self.segments:
+                self.segments[index].merge(segment)
+            else:
+                self.segments[index] = segment
+        self.overall.merge(other.overall)
+
+    def __len__(self):
+        return self.overall.count
+
+    def summary(self):
+        segments = []
+        for index in sorted(self.segments):
+            segment = self.segments[index]
+            source, kind = classify_level(segment.mean_db)
+            segments.append({
+                'start': segment.start,
+                'end': segment.end,
+                'samples': segment.count,
+                'seconds': segment.seconds,
+                'mean_db': segment.mean_db,
+                'peak_db': segment.peak_db,
+                'seconds_above': segment.seconds_above,
+                'mean_attention': segment.mean_attention,
+                'correlation': segment.correlation.correlation,
+                'source': source,
+                'type': kind
+            })
+        return {
+            'segment_seconds': self.segment_seconds,
+            'threshold_db': self.threshold_db,
+            'samples': self.overall.count,
+            'seconds': self.overall.seconds,
+            'mean_db': self.overall.mean_db,
+            'peak_db': self.overall.peak_db,
+            'seconds_above': self.overall.seconds_above,
+            'mean_attention': self.overall.mean_attention,
+            'correlation': self.overall.correlation.correlation,
+            'segments': segments
+        }
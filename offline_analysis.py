@@ -0,0 +1,162 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from real_time_analysis import NoiseDetector, RealTimeAttentionAnalyzer
+
+
+def probe_video(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frame_count
+
+
+def plan_segments(frame_count, fps, segment_seconds):
+    # Segments start on 10 second boundaries so every worker produces whole attention intervals
+    segment_seconds = max(10, int(math.ceil(segment_seconds / 10.0)) * 10)
+    # Each segment starts on the first frame at or after its boundary; a fixed frame count per
+    # segment drifts off the grid when fps is not an integer (29.97 fps gives starts like 59.993 s)
+    starts = []
+    k = 0
+    while True:
+        start = max(0, math.ceil(k * segment_seconds * fps - 1e-6))
+        if start >= frame_count:
+            break
+        if not starts or start > starts[-1]:
+            starts.append(start)
+        k += 1
+    return [(start, end) for start, end in zip(starts, starts[1:] + [frame_count])]
+
+
+def analyze_audio(path):
+    # Match the live detector's scoring, one level per second of audio
+    return NoiseDetector(use_microphone=False).stream_wav(path)
+
+
+def analyze_video_segment(path, start_frame, end_frame, fps, output_folder, noise_data):
+    analyzer = RealTimeAttentionAnalyzer(live=False, output_folder=output_folder)
+    analyzer.is_tracking = True
+    analyzer.start_time = 0
+
+    segment_start = start_frame / fps
+    analyzer.current_interval_start = math.floor(segment_start / 10.0) * 10
+    analyzer.last_save = segment_start - 1.0
+    # noise_data reaches a second back into the previous segment, which already counted those levels
+    analyzer.noise_cursor = segment_start - 1e-9
+
+    noise_index = 0
+    frames_read = 0
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    # The parent merges and saves the results; each segment only frees its Pose and FaceMesh graphs
+    try:
+        for frame_index in range(start_frame, end_frame):
+            timestamp = frame_index / fps
+            # Frames where no analysis stage is due are only grabbed, never decoded into BGR
+            if not cap.grab():
+                break
+            frames_read += 1
+            if not analyzer.scheduler.any_due(timestamp):
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+
+            while noise_index < len(noise_data) and noise_data[noise_index]['timestamp'] <= timestamp:
+                analyzer.noise_detector.noise_data.append(noise_data[noise_index])
+                noise_index += 1
+
+            analyzer.process_frame(frame, draw_overlay=False, timestamp=timestamp)
+    finally:
+        cap.release()
+        analyzer.close()
+
+    if analyzer.interval_scores:
+        analyzer.interval_data.append({
+            'interval_start': analyzer.current_interval_start,
+            'overall_attention': sum(analyzer.interval_scores) / len(analyzer.interval_scores)
+        })
+
+    return {
+        'start_frame': start_frame,
+        'frames_read': frames_read,
+        'data': analyzer.data,
+        'noise_stats': analyzer.noise_stats,
+        'interval_data': analyzer.interval_data,
+        'ear_threshold': analyzer.eye_tracker.ear_threshold
+    }
+
+
+def analyze_recording(video_path, audio_path=None, segment_seconds=60, workers=None, output_folder=None):
+    started = time.perf_counter()
+    fps, frame_count = probe_video(video_path)
+    noise_data = analyze_audio(audio_path) if audio_path else []
+
+    analyzer = RealTimeAttentionAnalyzer(live=False, output_folder=output_folder)
+    analyzer.start_time = 0
+
+    # Only collects and saves the merged results; its own models are never run
+    analyzer.close()
+
+    segments = plan_segments(frame_count, fps, segment_seconds)
+    print(f"Analysing {video_path}: {frame_count} frames at {fps:.1f} fps in {len(segments)} segments")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for start_frame, end_frame in segments:
+            segment_noise = [
+                d for d in noise_data
+                if start_frame / fps - 1.0 <= d['timestamp'] < end_frame / fps
+            ]
+            futures.append(pool.submit(
+                analyze_video_segment, video_path, start_frame, end_frame,
+                fps, analyzer.output_folder, segment_noise
+            ))
+        results = [future.result() for future in futures]
+
+    frames_read = 0
+    for result in sorted(results, key=lambda r: r['start_frame']):
+        frames_read += result['frames_read']
+        analyzer.data.extend(result['data'])
+        analyzer.noise_stats.merge(result['noise_stats'])
+        analyzer.interval_data.extend(result['interval_data'])
+        analyzer.eye_tracker.ear_threshold = result['ear_threshold']
+    analyzer.noise_detector.noise_data = noise_data
+
+    analyzer.save_results()
+
+    elapsed = time.perf_counter() - started
+    media_seconds = frame_count / fps if fps else 0
+    print(f"Processed {frames_read} frames in {elapsed:.1f}s "
+          f"({frames_read / elapsed:.1f} frames/s, {media_seconds / elapsed:.1f}x real time)")
+    return analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score recorded lesson videos offline")
+    parser.add_argument("videos", nargs="+", help="Recorded video files")
+    parser.add_argument("--audio", nargs="*", default=[],
+                        help="16-bit PCM WAV tracks, matched to the videos by position")
+    parser.add_argument("--segment-seconds", type=float, default=60,
+                        help="Length of the segments processed in parallel")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    for index, video_path in enumerate(args.videos):
+        audio_path = args.audio[index] if index < len(args.audio) else None
+        if audio_path is None:
+            candidate = os.path.splitext(video_path)[0] + ".wav"
+            audio_path = candidate if os.path.exists(candidate) else None
+        analyze_recording(video_path, audio_path, args.segment_seconds, args.workers)
+
+
+if __name__ == "__main__":
+    main()
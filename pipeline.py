@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+
+from mjpeg import MjpegBroadcaster
+
+
+class LatestQueue(queue.Queue):
+    def __init__(self, maxsize=1):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def put_latest(self, item):
+        # Latest-frame-wins: evict the oldest entries instead of blocking the producer
+        with self.mutex:
+            while self.maxsize > 0 and self._qsize() >= self.maxsize:
+                self._get()
+                self.dropped += 1
+            self._put(item)
+            self.not_empty.notify()
+
+
+class FramePipeline:
+    def __init__(self, hub, analyzer, jpeg_quality=80, inference_queue_size=1, render_queue_size=2):
+        self.hub = hub
+        self.analyzer = analyzer
+        self.inference_queue = LatestQueue(inference_queue_size)
+        self.render_queue = LatestQueue(render_queue_size)
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.subscriber = None
+        self.counters = {
+            'capture': {'processed': 0, 'errors': 0, 'last_latency': 0.0},
+            'inference': {'processed': 0, 'errors': 0, 'last_latency': 0.0},
+            'render': {'processed': 0, 'errors': 0, 'last_latency': 0.0}
+        }
+
+        # Annotated frames are JPEG-encoded by the broadcaster, once per quality level viewers ask for
+        self.broadcaster = MjpegBroadcaster(name="pipeline", default_quality=jpeg_quality, metrics=analyzer.metrics)
+
+    def start(self):
+        self.subscriber = self.hub.subscribe("pipeline")
+        for name, target in (
+            ('capture', self._capture_loop),
+            ('inference', self._inference_loop),
+            ('render', self._render_loop)
+        ):
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+            if thread.is_alive():
+                # Usually a slow process_frame; the analyzer's stop() waits for it before releasing models
+                print(f"Pipeline thread {thread.name} still running after stop")
+        if self.subscriber is not None:
+            self.subscriber.close()
+        self.broadcaster.close()
+
+    @property
+    def is_running(self):
+        return not self.stop_event.is_set()
+
+    def _capture_loop(self):
+        while not self.stop_event.is_set():
+            captured = self.subscriber.read(timeout=0.5)
+            if captured is None:
+                continue
+            start = time.perf_counter()
+            # The render stage keeps the stream at camera rate; inference takes what it can keep up with
+            self.render_queue.put_latest(captured)
+            if self.analyzer.is_tracking:
+                self.inference_queue.put_latest(captured)
+            self._record('capture', start)
+
+    def _inference_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                captured = self.inference_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            try:
+                self.analyzer.process_frame(captured.frame.copy(), draw_overlay=False)
+            except Exception as e:
+                self.counters['inference']['errors'] += 1
+                print(f"Error analysing frame: {e}")
+            self._record('inference', start)
+
+    def _render_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                captured = self.render_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            timer = self.analyzer.metrics.timer()
+            frame = captured.frame.copy()
+            if self.analyzer.is_tracking:
+                self.analyzer.display_overlay(frame, *self.analyzer.get_latest_metrics())
+                timer.lap('overlay')
+            self.broadcaster.publish(frame)
+            self._record('render', start)
+
+    def _record(self, stage, start):
+        counters = self.counters[stage]
+        counters['processed'] += 1
+        counters['last_latency'] = time.perf_counter() - start
+
+    def stats(self):
+        return {
+            'capture': dict(self.counters['capture'], dropped=self.subscriber.dropped if self.subscriber else 0),
+            'inference': dict(
+                self.counters['inference'],
+                queue_depth=self.inference_queue.qsize(),
+                dropped=self.inference_queue.dropped
+            ),
+            'render': dict(
+                self.counters['render'],
+                queue_depth=self.render_queue.qsize(),
+                dropped=self.render_queue.dropped
+            )
+        }
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import cv2
+
+
+class RoiLandmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class RoiLandmarks:
+    # Face mesh landmarks found in a crop, read back in full-frame normalised coordinates.
+    # Mapped on access, so callers that read a dozen points never pay for all 478.
+    def __init__(self, landmarks, region, img_w, img_h):
+        x0, y0, w, h = region
+        self.landmarks = landmarks
+        self.offset_x = x0 / img_w
+        self.offset_y = y0 / img_h
+        self.scale_x = w / img_w
+        self.scale_y = h / img_h
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def __getitem__(self, index):
+        point = self.landmarks[index]
+        return RoiLandmark(self.offset_x + point.x * self.scale_x, self.offset_y + point.y * self.scale_y,
+                           point.z * self.scale_x)
+
+    def __iter__(self):
+        for index in range(len(self.landmarks)):
+            yield self[index]
+
+
+class InferenceFrame:
+    def __init__(self, rgb, face_rgb, face_region, pixels):
+        self.rgb = rgb  # Whole frame at inference resolution, for pose and face search
+        self.face_rgb = face_rgb  # Tracked face crop, or None when there is no face to track
+        self.face_region = face_region  # (x, y, w, h) of the crop in the full frame
+        self.pixels = pixels
+
+
+class FramePreprocessor:
+    # Pose and face search run on a downscaled frame; once a face is tracked, face mesh runs on a
+    # square crop around it, resized to roughly the mesh model's own input size
+    def __init__(self, inference_width=480, roi_size=192, roi_padding=0.35):
+        self.inference_width = inference_width
+        self.roi_size = roi_size
+        self.roi_padding = roi_padding
+
+    def inference_size(self, img_w, img_h):
+        if not self.inference_width or img_w <= self.inference_width:
+            return img_w, img_h
+        return self.inference_width, max(1, int(round(img_h * self.inference_width / img_w)))
+
+    def face_region(self, face_box, img_w, img_h):
+        x, y, w, h = face_box
+        side = int(max(w, h) * (1 + 2 * self.roi_padding))
+        side = min(side, img_w, img_h)
+        cx, cy = x + w // 2, y + h // 2
+        x0 = min(max(0, cx - side // 2), img_w - side)
+        y0 = min(max(0, cy - side // 2), img_h - side)
+        return x0, y0, side, side
+
+    def prepare(self, frame, face_box=None, whole_frame=True):
+        img_h, img_w = frame.shape[:2]
+        rgb = None
+        pixels = 0
+        if whole_frame or face_box is None:
+            size = self.inference_size(img_w, img_h)
+            # Resize before the colour conversion so only the small frame is converted. Linear, not
+            # area, interpolation: the models resample again anyway and area is ~10x slower here.
+            small = frame if size == (img_w, img_h) else cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            pixels += size[0] * size[1]
+
+        face_rgb = region = None
+        if face_box is not None:
+            region = self.face_region(face_box, img_w, img_h)
+            x0, y0, w, h = region
+            crop = frame[y0:y0 + h, x0:x0 + w]
+            if self.roi_size and w > self.roi_size:
+                crop = cv2.resize(crop, (self.roi_size, self.roi_size), interpolation=cv2.INTER_LINEAR)
+            face_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+            pixels += face_rgb.shape[0] * face_rgb.shape[1]
+        return InferenceFrame(rgb, face_rgb, region, pixels)
+
+    def map_face_results(self, results, region, img_w, img_h):
+        if region is None or not results.multi_face_landmarks:
+            return results
+        return SimpleNamespace(multi_face_landmarks=[
+            SimpleNamespace(landmark=RoiLandmarks(face.landmark, region, img_w, img_h))
+            for face in results.multi_face_landmarks
+        ])
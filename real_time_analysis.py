@@ -1,36 +1,34 @@
 import cv2
-import mediapipe as mp
 import numpy as np
-import matplotlib.pyplot as plt
-import pyaudio
 import threading
 import queue
 import time
+from concurrent.futures import ThreadPoolExecutor
 import os
-import pandas as pd
+import wave
 from collections import deque
-from scipy.spatial.distance import euclidean
-import seaborn as sns
-from matplotlib.ticker import MaxNLocator
 from datetime import datetime
-from deepface import DeepFace
-from firebase_admin import db
+from firebase_writer import FirebaseWriter
+from session_store import ColumnarSessionStore
+from event_stream import EventBroadcaster
+from pipeline import LatestQueue
+from landmark_features import face_features, face_landmark_array, pose_features, pose_landmark_array
+from capture_hub import get_capture_hub
+from analyzer_pool import ModelBundle, create_face_cascade, create_face_mesh, create_pose
+from rescoring import noise_attention_scores
+from noise_stats import NoiseStatistics
+from metrics import SessionMetrics
+from scheduler import AnalysisScheduler
+from preprocessing import FramePreprocessor
 
 class PostureAnalyzer:
-    def __init__(self):
+    def __init__(self, pose=None):
+        import mediapipe as mp
+
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            model_complexity=1
-        )
-        
-        self.LEFT_SHOULDER = self.mp_pose.PoseLandmark.LEFT_SHOULDER
-        self.RIGHT_SHOULDER = self.mp_pose.PoseLandmark.RIGHT_SHOULDER
-        self.NOSE = self.mp_pose.PoseLandmark.NOSE
-        self.LEFT_EAR = self.mp_pose.PoseLandmark.LEFT_EAR
-        self.RIGHT_EAR = self.mp_pose.PoseLandmark.RIGHT_EAR
+        # Pooled sessions pass in a prewarmed graph
+        self.pose = pose if pose is not None else create_pose()
         
         self.engaged_start_time = None
         self.distracted_start_time = None
@@ -44,29 +42,6 @@ class PostureAnalyzer:
         self.HEAD_TILT_THRESHOLD = 0.05
         self.MIN_ENGAGEMENT_TIME = 2
     
-    def calculate_angles(self, landmarks, image_shape):
-        image_height, image_width = image_shape
-        
-        nose = landmarks[self.NOSE.value]
-        left_ear = landmarks[self.LEFT_EAR.value]
-        right_ear = landmarks[self.RIGHT_EAR.value]
-        left_shoulder = landmarks[self.LEFT_SHOULDER.value]
-        right_shoulder = landmarks[self.RIGHT_SHOULDER.value]
-        
-        head_center_x = nose.x
-        ear_center_x = (left_ear.x + right_ear.x) / 2
-        head_turn_ratio = (head_center_x - ear_center_x) / (right_ear.x - left_ear.x)
-        
-        shoulder_center_x = (left_shoulder.x + right_shoulder.x) / 2
-        shoulder_turn_ratio = (nose.x - shoulder_center_x) / (right_shoulder.x - left_shoulder.x)
-        
-        ear_center_y = (left_ear.y + right_ear.y) / 2
-        shoulder_center_y = (left_shoulder.y + right_shoulder.y) / 2
-        
-        head_tilt_ratio = (nose.y - ear_center_y) / abs(ear_center_y - shoulder_center_y) if abs(ear_center_y - shoulder_center_y) > 0 else 0
-        
-        return head_turn_ratio, shoulder_turn_ratio, head_tilt_ratio
-    
     def determine_engagement(self, head_turn, shoulder_turn, head_tilt):
         if (abs(head_turn) > self.HEAD_TURN_THRESHOLD or 
             abs(shoulder_turn) > self.SHOULDER_TURN_THRESHOLD or
@@ -75,8 +50,8 @@ class PostureAnalyzer:
         else:
             return "Engaged"
     
-    def update_engagement_time(self, status):
-        current_time = time.time()
+    def update_engagement_time(self, status, current_time=None):
+        current_time = time.time() if current_time is None else current_time
         
         if status != self.current_status:
             if status == "Engaged":
@@ -90,12 +65,21 @@ class PostureAnalyzer:
                 
             self.current_status = status
     
-    def analyze_posture(self, landmarks):
+    def analyze_posture(self, landmarks, current_time=None):
+        try:
+            angles = pose_features(pose_landmark_array(landmarks))
+        except Exception:
+            return {"angle": None, "status": "unknown", "score": 50, "feedback": "Cannot detect posture"}
+        return self.analyze_angles(angles, current_time)
+
+    def analyze_angles(self, angles, current_time=None):
         try:
-            image_shape = (1, 1)
-            head_turn, shoulder_turn, head_tilt = self.calculate_angles(landmarks, image_shape)
+            # Degenerate landmarks (e.g. ears on top of each other) give inf/nan ratios
+            if not np.all(np.isfinite(angles)):
+                return {"angle": None, "status": "unknown", "score": 50, "feedback": "Cannot detect posture"}
+            head_turn, shoulder_turn, head_tilt = (float(a) for a in angles)
             engagement_status = self.determine_engagement(head_turn, shoulder_turn, head_tilt)
-            self.update_engagement_time(engagement_status)
+            self.update_engagement_time(engagement_status, current_time)
             
             if engagement_status == "Engaged":
                 posture_status = "good"
@@ -134,19 +118,39 @@ class PostureAnalyzer:
     def get_latest_angle(self):
         return getattr(self, "last_angle", None)
         
-class EyeTracker:
-    def __init__(self, min_blink_frames=3, max_blink_frames=20, fps=30):
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=1, refine_landmarks=True,
-            min_detection_confidence=0.6, min_tracking_confidence=0.6
-        )
+class BlinkRateWindow:
+    # Blink timestamps inside the rate window only; timestamps must arrive in order
+    def __init__(self, window=60, min_window=10, warmup=5):
+        self.window = window
+        self.min_window = min_window
+        self.warmup = warmup
+        self.timestamps = deque()
+
+    def __len__(self):
+        return len(self.timestamps)
 
-        self.LEFT_EYE_KEY = [33, 160, 158, 133, 153, 144]
-        self.RIGHT_EYE_KEY = [362, 385, 387, 263, 373, 380]
-        self.NOSE_TIP = 1
-        self.LEFT_EYE_CENTER = 33
-        self.RIGHT_EYE_CENTER = 362
+    def add(self, timestamp):
+        self.timestamps.append(timestamp)
+
+    def reset(self):
+        self.timestamps.clear()
+
+    def rate(self, current_time):
+        if current_time < self.warmup:
+            return 0
+        # Until a full window has passed every blink counts; after that the window slides and
+        # anything older than it is evicted once, so each call is amortised O(1)
+        window = min(self.window, max(self.min_window, current_time))
+        cutoff = current_time - window
+        while self.timestamps and self.timestamps[0] < cutoff:
+            self.timestamps.popleft()
+        if not self.timestamps:
+            return 0
+        return (len(self.timestamps) / window) * 60
+
+class EyeTracker:
+    def __init__(self, min_blink_frames=3, max_blink_frames=20, fps=30, face_mesh=None):
+        self.face_mesh = face_mesh if face_mesh is not None else create_face_mesh()
 
         self.blink_counter = 0
         self.ear_threshold = 0.2
@@ -154,7 +158,7 @@ class EyeTracker:
         self.max_blink_frames = max_blink_frames
         self.consecutive_closed_frames = 0
         self.last_blink_time = 0
-        self.blink_timestamps = []
+        self.blink_window = BlinkRateWindow()
 
         self.ear_history = deque(maxlen=3)
         self.gaze_history = deque(maxlen=5)
@@ -167,23 +171,6 @@ class EyeTracker:
         self.gaze_history = deque(maxlen=30)
         self.blink_rate_history = deque(maxlen=30)
         self.ear_history = deque(maxlen=30)
-        self.gaze_data = []
-        self.blink_data = []
-
-    def extract_landmarks(self, landmarks, indices, img_w, img_h):
-        return [
-            [int(landmarks[i].x * img_w), int(landmarks[i].y * img_h)]
-            for i in indices
-        ]
-
-    def calculate_ear(self, eye_points):
-        if len(eye_points) < 6:
-            return 0.25
-        p = np.array(eye_points, dtype=np.float32)
-        v1 = np.linalg.norm(p[1] - p[5])
-        v2 = np.linalg.norm(p[2] - p[4])
-        h = np.linalg.norm(p[0] - p[3])
-        return (v1 + v2) / (2.0 * h) if h > 0 else 0.25
 
     def calculate_modified_ear(self, eye_points_list):
         if not eye_points_list:
@@ -214,37 +201,17 @@ class EyeTracker:
                 if current_time - self.last_blink_time > 0.2:
                     self.blink_counter += 1
                     self.last_blink_time = current_time
-                    self.blink_timestamps.append(current_time)
+                    self.blink_window.add(current_time)
             self.consecutive_closed_frames = 0
 
         return smoothed_ear
 
     def calculate_blink_rate(self, current_time):
-        if len(self.blink_timestamps) == 0 or current_time < 5:
-            return 0
-        window = min(60, max(10, current_time))
-        cutoff = current_time - window
-        recent = [t for t in self.blink_timestamps if t >= cutoff]
-        return (len(recent) / window) * 60
-
-    def calculate_gaze_score(self, landmarks, img_w, img_h):
-        try:
-            nose = landmarks[self.NOSE_TIP]
-            left = landmarks[self.LEFT_EYE_CENTER]
-            right = landmarks[self.RIGHT_EYE_CENTER]
-
-            nose_x = nose.x * img_w
-            eye_center_x = (left.x + right.x) / 2 * img_w
-            dx = abs((nose_x + eye_center_x) / 2 - img_w / 2)
-            dy = abs(nose.y * img_h - img_h / 2)
+        return self.blink_window.rate(current_time)
 
-            max_dx, max_dy = img_w * 0.3, img_h * 0.25
-            gaze_score = max(0, 1 - (dx / max_dx)) * 0.7 + max(0, 1 - (dy / max_dy)) * 0.3
-
-            self.gaze_history.append(gaze_score)
-            return max(0.0, min(1.0, np.mean(self.gaze_history)))
-        except Exception:
-            return 0.5
+    def smooth_gaze(self, raw_gaze):
+        self.gaze_history.append(float(raw_gaze))
+        return max(0.0, min(1.0, sum(self.gaze_history) / len(self.gaze_history)))
 
     def calculate_attention_level(self, gaze_score, blink_rate, ear_value):
         gaze_sigmoid = 1 / (1 + np.exp(-8 * (gaze_score - 0.5)))
@@ -283,47 +250,197 @@ class EyeTracker:
         return max(0.0, min(1.0, attention))
     
     def update_eye_metrics(self, gaze_score, blink_rate, ear_value, timestamp):
-        self.gaze_data.append({
-            'timestamp': timestamp,
-            'gaze_score': gaze_score * 100,
-            'blink_rate': blink_rate,
-            'ear_value': ear_value
-        })
+        # Bounded recent history only; the session's per-second rows are the eye record for reports
         self.gaze_history.append(gaze_score)
         self.blink_rate_history.append(blink_rate)
         self.ear_history.append(ear_value)
 
+class FaceRoiProvider:
+    # Face oval from the MediaPipe face mesh topology
+    FACE_OVAL = [10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288, 397, 365, 379, 378,
+                 400, 377, 152, 148, 176, 149, 150, 136, 172, 58, 132, 93, 234, 127, 162, 21,
+                 54, 103, 67, 109]
+
+    def __init__(self, padding=0.15, smoothing=0.5):
+        self.padding = padding
+        self.smoothing = smoothing
+        self.box = None
+
+    def reset(self):
+        self.box = None
+
+    def update(self, landmarks, img_w, img_h):
+        xs = [landmarks[i].x for i in self.FACE_OVAL]
+        ys = [landmarks[i].y for i in self.FACE_OVAL]
+        x0, x1 = min(xs) * img_w, max(xs) * img_w
+        y0, y1 = min(ys) * img_h, max(ys) * img_h
+        pad_x, pad_y = (x1 - x0) * self.padding, (y1 - y0) * self.padding
+        box = np.array([x0 - pad_x, y0 - pad_y, x1 + pad_x, y1 + pad_y], dtype=np.float32)
+
+        # Exponential smoothing keeps the crop from jittering between frames
+        if self.box is not None:
+            box = self.smoothing * self.box + (1 - self.smoothing) * box
+        self.box = box
+        return self.face_box(img_w, img_h)
+
+    def face_box(self, img_w, img_h):
+        if self.box is None:
+            return None
+        x0, y0, x1, y1 = self.box
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(img_w, int(x1)), min(img_h, int(y1))
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            return None
+        return x0, y0, x1 - x0, y1 - y0
+
+
+class EmotionWorker:
+    def __init__(self, classify, attention_map, on_result=None):
+        self.classify = classify
+        self.attention_map = attention_map
+        # Called from the worker thread with each result, for callers that share one worker
+        self.on_result = on_result
+        self.busy = False
+        # Size-1 queue: a newer face crop replaces one the worker has not picked up yet
+        self.requests = LatestQueue(1)
+        self.result_lock = threading.Lock()
+        self.latest = None
+        self.latest_submitted_at = None
+        self.latest_completed_at = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_latency = 0.0
+        self.model_ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, face_roi, timestamp):
+        self.submitted += 1
+        self.requests.put_latest((face_roi, timestamp, time.time()))
+
+    def result(self):
+        with self.result_lock:
+            return self.latest
+
+    def idle(self):
+        return not self.busy and self.requests.empty()
+
+    def _run(self):
+        # Load the model once up front so no session frame pays for it
+        try:
+            self.classify(np.zeros((48, 48, 3), dtype=np.uint8))
+        except Exception as e:
+            print(f"Emotion model warm-up failed: {e}")
+        self.model_ready.set()
+
+        while not self.stop_event.is_set():
+            try:
+                request = self.requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if request is None:
+                break
+            face_roi, timestamp, submitted_at = request
+            self.busy = True
+            start = time.perf_counter()
+            try:
+                emotion = self.classify(face_roi)
+            except Exception:
+                self.failed += 1
+                self.busy = False
+                continue
+            self.last_latency = time.perf_counter() - start
+            attention = self.attention_map.get(emotion, 65)
+            with self.result_lock:
+                self.latest = (emotion, attention, timestamp)
+                self.latest_submitted_at = submitted_at
+                self.latest_completed_at = time.time()
+            self.completed += 1
+            if self.on_result is not None:
+                self.on_result(emotion, attention, timestamp)
+            self.busy = False
+
+    def stop(self):
+        self.stop_event.set()
+        # Wakes the worker from its request poll; a crop not yet picked up is dropped
+        self.requests.put_latest(None)
+        self.thread.join(timeout=2.0)
+
+    def metrics(self):
+        now = time.time()
+        with self.result_lock:
+            submitted_at = self.latest_submitted_at
+            completed_at = self.latest_completed_at
+        return {
+            'model_ready': self.model_ready.is_set(),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'dropped': self.requests.dropped,
+            'last_latency': self.last_latency,
+            # How old the frame behind the current result is, and how long ago it arrived
+            'staleness': now - submitted_at if submitted_at else None,
+            'result_age': now - completed_at if completed_at else None
+        }
+
+
 class EmotionAnalyzer:
-    def __init__(self):
+    def __init__(self, async_inference=False, face_cascade=None, classify=None, min_interval=1.0, max_roi=224,
+                 haar_width=480):
         self.attention_map = {
             "happy": 85, "surprise": 80, "neutral": 90,
             "fear": 50, "sad": 45, "angry": 50, "disgust": 50
         }
         self.emotion_buffer = deque(maxlen=7)
-        casc_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        self.face_cascade = cv2.CascadeClassifier(casc_path)
+        self.face_cascade = face_cascade if face_cascade is not None else create_face_cascade()
         self.last_emotion = "neutral"
         self.last_attention = 90
         self.last_emotion_time = 0
-
-    def detect_emotion(self, frame, current_time):
-        if current_time - self.last_emotion_time < 1.0:
+        self.min_interval = min_interval  # 0 when a scheduler already decides when to classify
+        self.max_roi = max_roi  # DeepFace classifies a 48x48 face; larger crops are shrunk first
+        self.haar_width = haar_width
+        self.classify = classify or self.classify_face
+        self.worker = EmotionWorker(self.classify, self.attention_map) if async_inference else None
+
+    @staticmethod
+    def classify_face(face_roi):
+        # TensorFlow is loaded on first classification (the worker's warm-up in live mode)
+        from deepface import DeepFace
+
+        analysis = DeepFace.analyze(face_roi, actions=["emotion"], enforce_detection=False)
+        if isinstance(analysis, list):
+            analysis = analysis[0]
+        return analysis["dominant_emotion"]
+
+    def latest(self):
+        if self.worker is not None:
+            result = self.worker.result()
+            if result is not None:
+                self.last_emotion, self.last_attention, _ = result
+        return self.last_emotion, self.last_attention
+
+    def detect_emotion(self, frame, current_time, face_box=None):
+        self.latest()
+        if current_time - self.last_emotion_time < self.min_interval:
             return self.last_emotion, self.last_attention
         
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        if face_box is None:
+            face_box = self.detect_face_haar(frame)
+            if face_box is None:
+                return self.last_emotion, self.last_attention
         
-        if len(faces) == 0:
+        face_roi = self.crop_face(frame, face_box)
+
+        if self.worker is not None:
+            # Never wait on DeepFace here; the result is picked up on a later frame
+            self.worker.submit(face_roi.copy(), current_time)
+            self.last_emotion_time = current_time
             return self.last_emotion, self.last_attention
         
-        x, y, w, h = faces[0]
-        face_roi = frame[y:y+h, x:x+w]
-        
         try:
-            analysis = DeepFace.analyze(face_roi, actions=["emotion"], enforce_detection=False)
-            if isinstance(analysis, list):
-                analysis = analysis[0]
-            emotion = analysis["dominant_emotion"]
+            emotion = self.classify(face_roi)
             attention = self.attention_map.get(emotion, 65)
             self.last_emotion = emotion
             self.last_attention = attention
@@ -332,6 +449,33 @@ class EmotionAnalyzer:
         except Exception:
             return self.last_emotion, self.last_attention
 
+    def crop_face(self, frame, face_box):
+        x, y, w, h = face_box
+        face_roi = frame[y:y+h, x:x+w]
+        if self.max_roi and max(w, h) > self.max_roi:
+            scale = self.max_roi / max(w, h)
+            face_roi = cv2.resize(face_roi, (max(1, int(w * scale)), max(1, int(h * scale))),
+                                  interpolation=cv2.INTER_AREA)
+        return face_roi
+
+    def detect_face_haar(self, frame):
+        # Fallback for callers that have no face mesh landmarks to derive the box from.
+        # Searched at haar_width and scaled back to full-frame pixels.
+        scale = 1.0
+        if self.haar_width and frame.shape[1] > self.haar_width:
+            scale = frame.shape[1] / self.haar_width
+            frame = cv2.resize(frame, (self.haar_width, int(round(frame.shape[0] / scale))),
+                               interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        if len(faces) == 0:
+            return None
+        return tuple(int(v * scale) for v in faces[0])
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.stop()
+
     def smooth_emotion(self, emotion):
         self.emotion_buffer.append(emotion)
         if len(self.emotion_buffer) < 3:
@@ -339,43 +483,157 @@ class EmotionAnalyzer:
         return max(set(self.emotion_buffer), key=self.emotion_buffer.count)
 
 class NoiseDetector:
-    def __init__(self, chunk_size=48000, sample_rate=48000):
+    def __init__(self, chunk_size=48000, sample_rate=48000, use_microphone=True, audio=None, hop_size=None,
+                 history_size=None):
         self.chunk_size = chunk_size
         self.sample_rate = sample_rate
+        # With a hop size the level is recomputed every hop over a sliding chunk_size window;
+        # without one each chunk yields a single level, as before
+        self.hop_size = hop_size
         self.audio_queue = queue.Queue()
         self.is_recording = False
-        self.noise_data = []
+        self.noise_data = deque(maxlen=history_size)
 
         self.reference_rms = 32767.0
         self.reference_spl = 94.0
         self.min_db = 35
 
-        self.audio = pyaudio.PyAudio()
+        self.audio = None
+        if use_microphone:
+            import pyaudio
+
+            self.audio = audio if audio is not None else pyaudio.PyAudio()
+            self.sample_format = pyaudio.paInt16
+            self.continue_flag = pyaudio.paContinue
+        self.reset_stream(sample_rate)
+
+    @property
+    def level_seconds(self):
+        # Audio time each noise_data entry stands for: one hop, or one chunk without hops
+        return (self.hop_size or self.chunk_size) / self.sample_rate
+
+    def reset_stream(self, sample_rate):
+        # Window and hop are fixed in seconds, so WAV files at other rates behave the same
+        self.stream_rate = sample_rate
+        window_seconds = self.chunk_size / self.sample_rate
+        hop_seconds = (self.hop_size or self.chunk_size) / self.sample_rate
+        self.hop_samples = max(1, int(round(hop_seconds * sample_rate)))
+        self.window_hops = max(1, int(round(window_seconds / hop_seconds)))
+        # Sum of squares per hop for the hops still inside the window (a small ring)
+        self.hop_energies = np.zeros(0)
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.samples_streamed = 0
 
     def start_monitoring(self):
         self.is_recording = True
-        stream = self.audio.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self.sample_rate,
-            input=True,
-            frames_per_buffer=self.chunk_size
-        )
-        while self.is_recording:
-            try:
-                audio_data = stream.read(self.chunk_size, exception_on_overflow=False)
-                db_level = self.get_noise_level(audio_data)
-                attention = self.get_attention_level(db_level)
-                self.noise_data.append({
-                    'timestamp': time.time(),
-                    'db': db_level,
-                    'attention': attention
-                })
-            except Exception:
-                break
+        if self.hop_size:
+            # PyAudio calls back once per hop from its own thread; this thread only waits
+            stream = self.audio.open(
+                format=self.sample_format,
+                channels=1,
+                rate=self.sample_rate,
+                input=True,
+                frames_per_buffer=self.hop_size,
+                stream_callback=self.audio_callback
+            )
+            stream.start_stream()
+            while self.is_recording and stream.is_active():
+                time.sleep(0.1)
+        else:
+            stream = self.audio.open(
+                format=self.sample_format,
+                channels=1,
+                rate=self.sample_rate,
+                input=True,
+                frames_per_buffer=self.chunk_size
+            )
+            while self.is_recording:
+                try:
+                    audio_data = stream.read(self.chunk_size, exception_on_overflow=False)
+                    self.process_chunk(audio_data, time.time())
+                except Exception:
+                    break
         stream.stop_stream()
         stream.close()
 
+    def audio_callback(self, in_data, frame_count, time_info, status):
+        self.process_samples(np.frombuffer(in_data, dtype=np.int16), time.time())
+        return None, self.continue_flag
+
+    def process_samples(self, samples, timestamp=None):
+        # Streaming path: level for every complete hop in samples, each over the sliding window.
+        # timestamp is when the last sample arrived; without one, stream time is used.
+        if len(self.pending):
+            samples = np.concatenate([self.pending, samples])
+        hops = len(samples) // self.hop_samples
+        used = hops * self.hop_samples
+        self.pending = samples[used:].copy()
+        self.samples_streamed += used
+        if hops == 0:
+            return []
+
+        blocks = samples[:used].astype(np.float64).reshape(hops, self.hop_samples)
+        energies = np.concatenate([self.hop_energies, np.einsum('ij,ij->i', blocks, blocks)])
+        self.hop_energies = energies[-(self.window_hops - 1):] if self.window_hops > 1 else energies[:0]
+
+        # Window sums ending at each new hop, from one cumulative sum over ring + new hops
+        cumulative = np.concatenate([[0.0], np.cumsum(energies)])
+        ends = np.arange(len(energies) - hops, len(energies)) + 1
+        starts = np.maximum(0, ends - self.window_hops)
+        rms = np.sqrt((cumulative[ends] - cumulative[starts]) / ((ends - starts) * self.hop_samples))
+        levels = np.where(rms < 1, self.min_db, np.maximum(
+            self.min_db, self.reference_spl + 20 * np.log10(np.maximum(rms, 1) / self.reference_rms)
+        ))
+        attention = noise_attention_scores(levels)
+
+        if timestamp is None:
+            timestamp = self.samples_streamed / self.stream_rate
+        else:
+            timestamp -= len(self.pending) / self.stream_rate
+        times = timestamp - (hops - 1 - np.arange(hops)) * (self.hop_samples / self.stream_rate)
+
+        entries = [
+            {'timestamp': t, 'db': db, 'attention': int(a)}
+            for t, db, a in zip(times.tolist(), levels.tolist(), attention.tolist())
+        ]
+        self.noise_data.extend(entries)
+        return entries
+
+    def stream_wav(self, path):
+        # Feed a 16-bit PCM WAV through the same path as the microphone, for headless runs
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"Only 16-bit PCM WAV files are supported: {path}")
+            channels = wav.getnchannels()
+            sample_rate = wav.getframerate()
+            self.reset_stream(sample_rate)
+            block_frames = self.hop_samples if self.hop_size else int(round(self.chunk_size / self.sample_rate * sample_rate))
+            samples_read = 0
+            while True:
+                raw = wav.readframes(block_frames)
+                if not raw:
+                    break
+                samples = np.frombuffer(raw, dtype=np.int16)
+                if channels > 1:
+                    samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+                samples_read += len(samples)
+                if self.hop_size:
+                    self.process_samples(samples)
+                else:
+                    self.process_chunk(samples.tobytes(), samples_read / sample_rate)
+        return list(self.noise_data)
+
+    def process_chunk(self, audio_data, timestamp):
+        db_level = self.get_noise_level(audio_data)
+        attention = self.get_attention_level(db_level)
+        entry = {
+            'timestamp': timestamp,
+            'db': db_level,
+            'attention': attention
+        }
+        self.noise_data.append(entry)
+        return entry
+
     def get_noise_level(self, audio_data):
         try:
             audio_array = np.frombuffer(audio_data, dtype=np.int16)
@@ -396,43 +654,101 @@ class NoiseDetector:
         else: return 5
 
 class RealTimeAttentionAnalyzer:
-    def __init__(self, student_id=None, session_id=None):
-        self.posture_analyzer = PostureAnalyzer()
-        self.eye_tracker = EyeTracker()
-        self.emotion_analyzer = EmotionAnalyzer()
-        self.noise_detector = NoiseDetector()
-        self.data = {
-            'timestamp': [], 'posture': [], 'eye_attention': [],
-            'face_attention': [], 'noise_attention': [], 'overall': [],
-            'emotion': [], 'gaze_score': [], 'blink_rate': [], 'ear_value': []
-        }
+    INFERENCE_MODES = ("serial", "parallel")
+
+    def __init__(self, student_id=None, session_id=None, inference_mode="serial", live=True, output_folder=None,
+                 firebase_reference=None, model_pool=None, report_jobs=None, metrics_enabled=False, metrics=None,
+                 classify=None, schedule=None, inference_width=480, track_face=True):
+        if inference_mode not in self.INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode: {inference_mode}")
+        self.inference_mode = inference_mode
+        # Models come prewarmed from the pool when there is one and go back to it in stop()
+        self.model_pool = model_pool
+        self.models = model_pool.acquire() if model_pool is not None else ModelBundle(use_microphone=live)
+        self.models_lock = threading.Lock()
+        # Per-stage timings and model call counts; when disabled every hook is a no-op
+        self.metrics = metrics or SessionMetrics(enabled=metrics_enabled)
+        self.pose_process = self.metrics.wrap('pose', self.models.pose.process)
+        self.face_mesh_process = self.metrics.wrap('face_mesh', self.models.face_mesh.process)
+        # Pose runs on the pool while face mesh runs on the calling thread
+        self.inference_pool = ThreadPoolExecutor(max_workers=1) if inference_mode == "parallel" else None
+        self.posture_analyzer = PostureAnalyzer(pose=self.models.pose)
+        self.eye_tracker = EyeTracker(face_mesh=self.models.face_mesh)
+        self.emotion_analyzer = EmotionAnalyzer(
+            async_inference=live, face_cascade=self.models.face_cascade,
+            classify=self.metrics.wrap('emotion_model', classify or EmotionAnalyzer.classify_face),
+            min_interval=0, haar_width=inference_width
+        )
+        self.face_roi = FaceRoiProvider()
+        # Models see a downscaled frame, and face mesh a crop around the face it last found
+        self.preprocessor = FramePreprocessor(inference_width=inference_width)
+        self.track_face = track_face
+        # Per-stage rates and latency budgets; live sessions back off under load, offline runs keep
+        # fixed rates so results do not depend on how busy the machine was
+        self.scheduler = AnalysisScheduler(stages=schedule, adaptive=live)
+        self.pose_results = None
+        self.face_results = None
+        self.posture_state = (50, None, "", np.nan, np.nan, np.nan)
+        self.eye_state = (50, 0, 0, 0.25)
+        self.face_detected = False
+        # Offline analysis drives audio and timestamps itself and never writes to Firebase
+        self.live = live
+        # Live audio is scored every 50 ms over a sliding 1 s window; only the last minute is kept
+        self.noise_detector = NoiseDetector(
+            use_microphone=live, audio=self.models.audio,
+            hop_size=2400 if live else None, history_size=1200 if live else None
+        )
+        self.data = ColumnarSessionStore()  # One row per second, stored column-wise
+        self.events = EventBroadcaster()  # Pushes new samples and intervals to dashboard streams
+        self.noise_stats = NoiseStatistics()  # Per-segment noise accumulators for the report
+        self.noise_cursor = float('-inf')  # Timestamp of the last noise level fed to noise_stats
+        self.report_jobs = report_jobs  # Renders the report on a process pool when set
+        self.report_job = None
         self.interval_data = []  # Store 10-second interval overall attention
         self.interval_data_lock = threading.Lock()  # Lock for thread-safe access
         self.current_interval_start = 0
         self.interval_scores = []  # Temporary list for current interval scores
         self.start_time = time.time()
         self.last_save = 0
-        self.last_process = 0
         self.is_tracking = False
+        self.stopped = False
+        self.closed = False
         self.student_id = student_id
         self.session_id = session_id
-        self.output_folder = self.create_output_folder()
+        self.output_folder = output_folder or self.create_output_folder()
         os.makedirs(self.output_folder, exist_ok=True)
-        self.noise_thread = threading.Thread(target=self.noise_detector.start_monitoring, daemon=True)
-        self.noise_detector.is_recording = True
-        self.firebase_queue = queue.Queue()
-        self.firebase_thread = threading.Thread(target=self.process_firebase_queue, daemon=True)
-        self.noise_thread.start()
-        self.firebase_thread.start()
+        self.noise_thread = None
+        self.firebase_writer = None
+        if live:
+            self.noise_thread = threading.Thread(target=self.noise_detector.start_monitoring, daemon=True)
+            self.noise_detector.is_recording = True
+            self.noise_thread.start()
+            if student_id and session_id:
+                # Samples are batched into multi-path updates and spooled to disk while offline
+                self.firebase_writer = FirebaseWriter(
+                    f"students/{student_id}/sessions/{session_id}/data",
+                    spool_path=os.path.join("output", "firebase_spool", f"{student_id}_{session_id}.jsonl"),
+                    reference=firebase_reference,
+                    session_metrics=self.metrics if self.metrics.enabled else None
+                )
 
     def create_output_folder(self):
         base = "output/attention_analysis"
         os.makedirs(base, exist_ok=True)
         existing = [f for f in os.listdir(base) if f.startswith("stu_")]
         next_num = max([int(f.split("_")[1]) for f in existing]) + 1 if existing else 1
-        return os.path.join(base, f"stu_{next_num:02d}")
+        # Sessions start concurrently; makedirs without exist_ok claims a number for one session only
+        while True:
+            folder = os.path.join(base, f"stu_{next_num:02d}")
+            try:
+                os.makedirs(folder)
+                return folder
+            except FileExistsError:
+                next_num += 1
 
     def save_to_firebase(self, timestamp, posture, eye_attention, face_attention, noise_attention, overall, emotion):
+        if not self.live:
+            return
         if not self.student_id or not self.session_id:
             print("Error: student_id or session_id not provided")
             return
@@ -446,85 +762,102 @@ class RealTimeAttentionAnalyzer:
             'overall_attention': overall,
             'emotion': emotion
         }
-        self.firebase_queue.put(data)
+        self.firebase_writer.submit(data)
 
-    def process_firebase_queue(self):
-        while True:
-            try:
-                data = self.firebase_queue.get(timeout=1.0)
-                if data is None:
-                    break
-                ref = db.reference(f"students/{self.student_id}/sessions/{self.session_id}/data")
-                print(f"Pushing data: {data}")
-                ref.push(data)
-                print("Data saved successfully to Firebase.")
-                self.firebase_queue.task_done()
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"Error saving to Firebase: {e}")
+    def process_frame(self, frame, draw_overlay=True, timestamp=None):
+        # Held for the whole frame: close() takes it before handing the models back to the pool,
+        # so a frame still running when the pipeline gives up waiting never shares a bundle
+        with self.models_lock:
+            if self.closed:
+                return frame
+            return self.analyze_frame(frame, draw_overlay, timestamp)
 
-    def process_frame(self, frame):
+    def analyze_frame(self, frame, draw_overlay=True, timestamp=None):
         if not self.is_tracking:
             return frame
             
-        current_time = time.time() - self.start_time
-        if current_time - self.last_process < 0.1:
-            self.display_overlay(frame, *self.get_latest_metrics())
+        # Offline analysis passes media timestamps; live capture uses the wall clock
+        current_time = time.time() - self.start_time if timestamp is None else timestamp
+        # Each model runs at its own scheduled rate; frames where neither is due only get the overlay
+        run_pose = self.scheduler.due('pose', current_time)
+        run_face = self.scheduler.due('face_mesh', current_time)
+        if not (run_pose or run_face):
+            self.metrics.count('frames_skipped')
+            if draw_overlay:
+                self.display_overlay(frame, *self.get_latest_metrics())
             return frame
         
-        self.last_process = current_time
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pose_results = self.posture_analyzer.pose.process(rgb)
-        posture_score = 50
-        posture_angle = None
-        posture_feedback = ""
-        if pose_results.pose_landmarks:
-            landmarks = pose_results.pose_landmarks.landmark
-            result = self.posture_analyzer.analyze_posture(landmarks)
-            posture_score = result["score"]
-            posture_angle = result["angle"]
-            posture_feedback = result["feedback"]
-            
-        face_results = self.eye_tracker.face_mesh.process(rgb)
-        eye_attention = 50
-        face_attention = 50
-        emotion = "neutral"
-        gaze_score = 0
-        blink_rate = 0
-        ear_value = 0.25
-        
-        if face_results.multi_face_landmarks:
-            landmarks = face_results.multi_face_landmarks[0].landmark
-            h, w = frame.shape[:2]
-            
-            emotion, face_attention = self.emotion_analyzer.detect_emotion(frame, current_time)
-            emotion = self.emotion_analyzer.smooth_emotion(emotion)
-            
-            left_eye = self.eye_tracker.extract_landmarks(landmarks, self.eye_tracker.LEFT_EYE_KEY, w, h)
-            right_eye = self.eye_tracker.extract_landmarks(landmarks, self.eye_tracker.RIGHT_EYE_KEY, w, h)
-            
-            if left_eye and right_eye:
-                left_ear = self.eye_tracker.calculate_ear(left_eye)
-                right_ear = self.eye_tracker.calculate_ear(right_eye)
-                avg_ear = (left_ear + right_ear) / 2
+        timer = self.metrics.timer()
+        h, w = frame.shape[:2]
+        face_box = self.face_roi.face_box(w, h) if run_face and self.track_face else None
+        inference = self.preprocessor.prepare(frame, face_box, whole_frame=run_pose)
+        self.metrics.count('inference_pixels', inference.pixels)
+        timer.lap('preprocess')
+        pose_results, face_results = self.run_inference(frame, inference, current_time, run_pose, run_face)
+        timer.lap('inference')
+        # Stages that were not due this frame keep their previous outputs
+        if run_pose:
+            self.posture_state = (50, None, "", np.nan, np.nan, np.nan)
+            if pose_results.pose_landmarks:
+                landmarks = pose_results.pose_landmarks.landmark
+                angles = pose_features(pose_landmark_array(landmarks))
+                head_turn, shoulder_turn, head_tilt = angles
+                result = self.posture_analyzer.analyze_angles(angles, current_time)
+                self.posture_state = (result["score"], result["angle"], result["feedback"],
+                                      head_turn, shoulder_turn, head_tilt)
+            timer.lap('posture')
+        posture_score, posture_angle, posture_feedback, head_turn, shoulder_turn, head_tilt = self.posture_state
+        
+        if run_face:
+            self.face_detected = bool(face_results.multi_face_landmarks)
+            self.eye_state = (50, 0, 0, 0.25)
+            if not self.face_detected:
+                self.face_roi.reset()
+            else:
+                landmarks = face_results.multi_face_landmarks[0].landmark
+                self.face_roi.update(landmarks, w, h)
+                
+                # Both EARs and the raw gaze come from one array of the landmarks we need
+                eye_ears, raw_gaze = face_features(face_landmark_array(landmarks), w, h)
+                avg_ear = float(eye_ears[0] + eye_ears[1]) / 2
                 smoothed_ear = self.eye_tracker.detect_blink(avg_ear, current_time)
                 blink_rate = self.eye_tracker.calculate_blink_rate(current_time)
-                gaze_score = self.eye_tracker.calculate_gaze_score(landmarks, w, h)
+                gaze_score = self.eye_tracker.smooth_gaze(raw_gaze)
                 eye_attention = self.eye_tracker.calculate_attention_level(gaze_score, blink_rate, avg_ear) * 100
-                ear_value = avg_ear
+                self.eye_state = (eye_attention, gaze_score, blink_rate, avg_ear)
                 
                 self.eye_tracker.update_eye_metrics(
                     gaze_score, blink_rate, avg_ear, current_time
                 )
+            timer.lap('eye')
+        eye_attention, gaze_score, blink_rate, ear_value = self.eye_state
+        
+        face_attention = 50
+        emotion = "neutral"
+        if self.face_detected:
+            emotion, face_attention = self.emotion_analyzer.latest()
+            if self.scheduler.due('emotion', current_time):
+                start = time.perf_counter()
+                emotion, face_attention = self.emotion_analyzer.detect_emotion(
+                    frame, current_time, self.face_roi.face_box(w, h)
+                )
+                # With a worker, the budget governs its classification time, not the hand-off
+                worker = self.emotion_analyzer.worker
+                latency = worker.last_latency if worker is not None else time.perf_counter() - start
+                self.scheduler.record('emotion', current_time, latency)
+            emotion = self.emotion_analyzer.smooth_emotion(emotion)
+            timer.lap('emotion')
         
         noise_attention = 100
+        noise_db = np.nan
         if self.noise_detector.noise_data:
             noise_attention = self.noise_detector.noise_data[-1]['attention']
+            noise_db = self.noise_detector.noise_data[-1]['db']
         
         weights = [0.25, 0.25, 0.25, 0.25]
         scores = [posture_score, eye_attention, face_attention, noise_attention]
         overall = sum(w * s for w, s in zip(weights, scores))
+        self.update_noise_stats(current_time, overall)
         
         # Accumulate scores for 10-second interval
         self.interval_scores.append(overall)
@@ -536,22 +869,48 @@ class RealTimeAttentionAnalyzer:
                         'interval_start': self.current_interval_start,
                         'overall_attention': avg_overall
                     })
+                self.events.publish('interval', {
+                    'interval_start': self.current_interval_start,
+                    'overall_attention': avg_overall
+                })
                 print(f"10-second interval ({self.current_interval_start:.1f}s): Overall Attention = {avg_overall:.1f}%")
             self.interval_scores = []
             self.current_interval_start += 10
+        timer.lap('scoring')
         
         if current_time - self.last_save >= 1.0:
-            self.data['timestamp'].append(current_time)
-            self.data['posture'].append(posture_score)
-            self.data['eye_attention'].append(eye_attention)
-            self.data['face_attention'].append(face_attention)
-            self.data['noise_attention'].append(noise_attention)
-            self.data['overall'].append(overall)
-            self.data['emotion'].append(emotion)
-            self.data['gaze_score'].append(gaze_score * 100)
-            self.data['blink_rate'].append(blink_rate)
-            self.data['ear_value'].append(ear_value)
+            self.data.append(
+                timestamp=current_time,
+                posture=posture_score,
+                eye_attention=eye_attention,
+                face_attention=face_attention,
+                noise_attention=noise_attention,
+                overall=overall,
+                emotion=emotion,
+                gaze_score=gaze_score * 100,
+                blink_rate=blink_rate,
+                ear_value=ear_value,
+                head_turn=head_turn,
+                shoulder_turn=shoulder_turn,
+                head_tilt=head_tilt,
+                noise_db=noise_db,
+                face_detected=self.face_detected
+            )
             self.last_save = current_time
+            self.events.publish('sample', {
+                'timestamp': current_time,
+                'posture': posture_score,
+                'eye_attention': eye_attention,
+                'face_attention': face_attention,
+                'noise_attention': noise_attention,
+                'overall': overall,
+                'emotion': emotion,
+                'gaze_score': gaze_score * 100,
+                'blink_rate': blink_rate,
+                'ear_value': ear_value,
+                'cursor': self.data.cursor()
+            })
+            timer.lap('store')
             
             self.save_to_firebase(
                 timestamp=current_time,
@@ -562,19 +921,50 @@ class RealTimeAttentionAnalyzer:
                 overall=overall,
                 emotion=emotion
             )
+            timer.lap('firebase')
         
-        self.display_overlay(frame, posture_score, eye_attention, 
-                            face_attention, noise_attention, overall, emotion)
+        if draw_overlay:
+            self.display_overlay(frame, posture_score, eye_attention, 
+                                face_attention, noise_attention, overall, emotion)
+            timer.lap('overlay')
+        timer.done('process_frame')
         return frame
 
+    def run_inference(self, frame, inference, now, run_pose=True, run_face=True):
+        # A model that is not due returns its previous result
+        if self.inference_pool is None or not (run_pose and run_face):
+            if run_pose:
+                self.pose_results = self.scheduler.run('pose', now, self.pose_process, inference.rgb)
+            if run_face:
+                self.face_results = self.scheduler.run('face_mesh', now, self.find_face, frame, inference)
+            return self.pose_results, self.face_results
+
+        # The two MediaPipe graphs are independent, so latency approaches max(pose, face)
+        pose_future = self.inference_pool.submit(self.scheduler.run, 'pose', now, self.pose_process, inference.rgb)
+        self.face_results = self.scheduler.run('face_mesh', now, self.find_face, frame, inference)
+        self.pose_results = pose_future.result()
+        return self.pose_results, self.face_results
+
+    def find_face(self, frame, inference):
+        if inference.face_rgb is None:
+            return self.face_mesh_process(inference.rgb)
+        h, w = frame.shape[:2]
+        results = self.face_mesh_process(inference.face_rgb)
+        if results.multi_face_landmarks:
+            return self.preprocessor.map_face_results(results, inference.face_region, w, h)
+        # The face left the crop: search the whole frame before calling it lost
+        self.metrics.count('face_roi_misses')
+        rgb = inference.rgb if inference.rgb is not None else self.preprocessor.prepare(frame).rgb
+        return self.face_mesh_process(rgb)
+
     def get_latest_metrics(self):
         return (
-            self.data['posture'][-1] if self.data['posture'] else 50,
-            self.data['eye_attention'][-1] if self.data['eye_attention'] else 50,
-            self.data['face_attention'][-1] if self.data['face_attention'] else 50,
-            self.data['noise_attention'][-1] if self.data['noise_attention'] else 100,
-            self.data['overall'][-1] if self.data['overall'] else 50,
-            self.data['emotion'][-1] if self.data['emotion'] else "neutral"
+            self.data.last('posture', 50),
+            self.data.last('eye_attention', 50),
+            self.data.last('face_attention', 50),
+            self.data.last('noise_attention', 100),
+            self.data.last('overall', 50),
+            self.data.last('emotion', "neutral")
         )
 
     def display_overlay(self, frame, posture, eye, face, noise, overall, emotion):
@@ -611,516 +1001,74 @@ class RealTimeAttentionAnalyzer:
         cv2.putText(frame, status_text, (frame.shape[1] - 300, 30), 
                     cv2.FONT_HERSHEY_SIMPLEX, 0.8, status_color, 2)
 
-    def create_feature_scatter(self, folder, df, feature, title, xlabel):
-        plt.figure()
-        sns.regplot(
-            x=df[feature], 
-            y=df['overall'], 
-            scatter_kws={'alpha': 0.6, 's': 40, 'color': 'steelblue'},
-            line_kws={'color': 'red', 'linewidth': 2}
-        )
-        plt.xlabel(f'{xlabel} (%)')
-        plt.ylabel('Overall Attention (%)')
-        plt.title(title)
-        plt.grid(True, alpha=0.3)
-        plt.xlim(0, 100)
-        plt.ylim(0, 100)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, f"{feature}_vs_attention.png"))
-        plt.close()
-        
-        correlation = df[[feature, 'overall']].corr().iloc[0,1]
-        
-        summary = f"""
-{title.upper()}
-"""
-        with open(os.path.join(folder, "summary.txt"), 'w') as f:
-            f.write(summary)
-
-    def create_noise_graphs(self, folder, session_date, session_duration):
-        if not self.noise_detector.noise_data:
+    def report_snapshot(self):
+        # Everything the report needs, as plain data, so reporting.py never touches the analyzer
+        return {
+            'output_folder': self.output_folder,
+            'data': self.data,
+            'ear_threshold': self.eye_tracker.ear_threshold,
+            'noise_summary': self.noise_stats.summary(),
+            'session_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    def update_noise_stats(self, current_time, attention):
+        # Every level the detector produced since the last frame, not just the one a 1 Hz sample
+        # happens to catch, so short loud events count towards peak and time above threshold.
+        # list() copies the deque in one step while the audio thread may be appending to it.
+        levels = list(self.noise_detector.noise_data)
+        first = len(levels)
+        while first > 0 and levels[first - 1]['timestamp'] > self.noise_cursor:
+            first -= 1
+        if first == len(levels):
             return
-            
-        times = [d['timestamp'] - self.start_time for d in self.noise_detector.noise_data]
-        noise_levels = [d['db'] for d in self.noise_detector.noise_data]
-        attention_levels = [d['attention'] for d in self.noise_detector.noise_data]
-        
-        plt.figure()
-        plt.plot(times, noise_levels, 'r-', linewidth=1.5)
-        plt.axhline(y=55, color='g', linestyle='--', linewidth=1.2, label='Ideal Limit (55dB)')
-        plt.fill_between(times, 0, noise_levels, color='red', alpha=0.1)
-        plt.xlabel('Time (seconds)')
-        plt.ylabel('Noise Level (dB)')
-        plt.title('Background Noise Analysis')
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "noise_over_time.png"))
-        plt.close()
-        
-        plt.figure()
-        sns.regplot(x=noise_levels, y=attention_levels, 
-                    scatter_kws={'alpha':0.5, 's':30}, 
-                    line_kws={'color':'red', 'linewidth':1.5})
-        plt.xlabel('Noise Level (dB)')
-        plt.ylabel('Attention Score (%)')
-        plt.title('Noise vs Attention')
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "noise_vs_attention.png"))
-        plt.close()
-        
-        plt.figure()
-        sns.histplot(noise_levels, bins=20, kde=True, color='crimson')
-        plt.axvline(x=55, color='g', linestyle='--', linewidth=1.2, label='Ideal Limit (55dB)')
-        plt.xlabel('Noise Level (dB)')
-        plt.ylabel('Frequency')
-        plt.title('Noise Distribution')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "noise_distribution.png"))
-        plt.close()
-        
-        avg_attention = np.mean(attention_levels)
-        
-        summary = f"""
-BACKGROUND NOISE ANALYSIS SUMMARY
-======================================
-Session Date       : {session_date}
-Session Duration   : {session_duration:.1f} seconds
-Overall Attention  : {avg_attention:.1f}%
-
-1. Noise Source Classification
--------------------------------
-Time Range     | Detected Source     | Type
--------------- | ------------------- | ---------------
-00:00-00:20    | Normal ambient      | Ambient
-00:21-00:40    | Background talking  | Conversational
-00:41-End      | Normal ambient      | Ambient
-
-2. Segmented Analysis
------------------------
-Time Range     | Avg. Noise (dB) | Attention (%) | Notes
--------------- | --------------- | --------------|-------------------------------
-00:00-00:20    | 35              | {avg_attention-10:.1f}%          | Normal ambient noise
-00:21-00:40    | 58              | {avg_attention-20:.1f}%          | Background talking
-00:41-End      | 35              | {avg_attention:.1f}%          | Attention improved
-
-3. Attention vs. Noise Correlation
------------------------------------
-Correlation Coefficient (r): -0.61
-(Higher noise is moderately associated with lower attention.)
-
-4. Environment Context
-------------------------
-Labeled Environment : Home
-Device Used         : Laptop (built-in mic)
-Mic Sensitivity     : Normal
-
-5. Noise Rating Summary
--------------------------
-Overall Noise Level : 🟡 Moderate Noise
-Average dB          : {np.mean(noise_levels):.1f} dB
-Peak dB             : {max(noise_levels):.1f} dB
-High Noise Duration : {sum(1 for d in noise_levels if d > 55)} seconds
-
-6. Observations & Recommendations
-----------------------------------
-- Background talking notably reduced attention levels.
-- Recommend switching to a quieter space or using a noise-canceling microphone.
-- Future sessions could benefit from real-time noise alerts.
-"""
-        with open(os.path.join(folder, "noise_analysis_summary.txt"), 'w', encoding='utf-8') as f:
-            f.write(summary)
+        duration = self.noise_detector.level_seconds
+        for entry in levels[first:]:
+            # Live levels carry wall-clock times; offline runs set start_time to 0
+            timestamp = entry['timestamp'] - self.start_time
+            # Levels from before tracking started, or from a pause, are not part of the session
+            if timestamp < current_time - 1.0:
+                continue
+            self.noise_stats.add(timestamp, float(entry['db']), attention, duration)
+        self.noise_cursor = levels[-1]['timestamp']
 
     def save_results(self):
-        if not self.data['timestamp']:
+        if len(self.data) == 0:
             return
-        
-        df = pd.DataFrame(self.data)
-        session_duration = df['timestamp'].max()
-        session_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        body_folder = os.path.join(self.output_folder, "body_posture")
-        eye_folder = os.path.join(self.output_folder, "eye_tracking")
-        face_folder = os.path.join(self.output_folder, "facial_expression")
-        noise_folder = os.path.join(self.output_folder, "background_noise")
-        os.makedirs(body_folder, exist_ok=True)
-        os.makedirs(eye_folder, exist_ok=True)
-        os.makedirs(face_folder, exist_ok=True)
-        os.makedirs(noise_folder, exist_ok=True)
-        
-        eye_detail_folder = os.path.join(eye_folder, "detailed_analysis")
-        os.makedirs(eye_detail_folder, exist_ok=True)
-        
-        self.save_eye_details(eye_detail_folder, df, session_date, session_duration)
-        
-        report = f"""
-REAL-TIME ATTENTION ANALYSIS SUMMARY
-======================================
-Session Date       : {session_date}
-Session Duration   : {session_duration:.1f} seconds
-Overall Attention  : {df['overall'].mean():.1f}%
-
-1. Component Scores
--------------------------------
-- Posture: {df['posture'].mean():.1f}%
-- Eye Attention: {df['eye_attention'].mean():.1f}%
-- Facial Expression: {df['face_attention'].mean():.1f}%
-- Background Noise: {df['noise_attention'].mean():.1f}%
-
-2. Emotion Distribution
--------------------------------
-"""
-        emotion_percentages = df['emotion'].value_counts(normalize=True) * 100
-        for emotion, percentage in emotion_percentages.items():
-            report += f"- {emotion.capitalize()}: {percentage:.1f}%\n"
-            
-        report += "\n3. Observations & Recommendations\n----------------------------------\n"
-        report += self.generate_recommendations(df)
-        
-        with open(os.path.join(self.output_folder, "summary.txt"), 'w') as f:
-            f.write(report)
-        
-        sns.set_style("whitegrid")
-        plt.rcParams.update({
-            'font.size': 10,
-            'axes.titlesize': 12,
-            'axes.labelsize': 10,
-            'xtick.labelsize': 9,
-            'ytick.labelsize': 9,
-            'legend.fontsize': 9,
-            'figure.dpi': 300,
-            'savefig.dpi': 300,
-            'figure.figsize': (10, 6)
-        })
-        
-        plt.figure()
-        plt.plot(df['timestamp'], df['overall'], 'b-', linewidth=2, label='Overall Attention')
-        plt.fill_between(df['timestamp'], 0, df['overall'], color='blue', alpha=0.1)
-        plt.xlabel('Time (seconds)')
-        plt.ylabel('Attention Score (%)')
-        plt.title('Attention Timeline')
-        plt.grid(True, alpha=0.3)
-        plt.ylim(0, 100)
-        plt.xlim(0, df['timestamp'].max() * 1.05)
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.output_folder, "attention_timeline.png"))
-        plt.close()
-        
-        self.create_feature_graphs(body_folder, df, 'posture', 'Body Posture Analysis', 'Posture Score', session_date, session_duration)
-        self.create_feature_graphs(eye_folder, df, 'eye_attention', 'Eye Tracking Analysis', 'Eye Attention Score', session_date, session_duration)
-        
-        self.create_feature_graphs(
-            face_folder, 
-            df, 
-            'face_attention', 
-            'Facial Expression Analysis', 
-            'Face Attention Score',
-            session_date,
-            session_duration,
-            generate_timeline=False
-        )
-        self.create_emotion_distribution(face_folder, df)
-        
-        self.create_noise_graphs(noise_folder, session_date, session_duration)
-        
-        print(f"Results saved to: {self.output_folder}")
-
-    def generate_recommendations(self, df):
-        recommendations = []
-        
-        if df['posture'].mean() < 60:
-            recommendations.append("- Your posture score indicates frequent distractions. Try to maintain a straight posture facing the screen.")
-        
-        if df['eye_attention'].mean() < 60:
-            recommendations.append("- Your eye attention score suggests frequent distractions. Minimize environmental distractions and focus on the task.")
-        
-        if df['face_attention'].mean() < 60:
-            recommendations.append("- Your facial expression analysis indicates potential disengagement. Try to maintain a neutral or positive facial expression.")
-        
-        if df['noise_attention'].mean() < 70:
-            recommendations.append("- Background noise is affecting your attention. Consider using noise-canceling headphones or moving to a quieter environment.")
-        
-        if not recommendations:
-            return "- All metrics are within optimal ranges. Keep up the good focus!"
-        
-        return "\n".join(recommendations)
-
-    def create_feature_graphs(self, folder, df, feature, title, xlabel, session_date, session_duration, generate_timeline=True):
-        if generate_timeline:
-            plt.figure()
-            plt.plot(df['timestamp'], df[feature], 'g-', linewidth=1.5)
-            plt.xlabel('Time (seconds)')
-            plt.ylabel(f'{xlabel} (%)')
-            plt.title(f'{title} - Score Over Time')
-            plt.grid(True, alpha=0.3)
-            plt.ylim(0, 100)
-            plt.xlim(0, df['timestamp'].max() * 1.05)
-            plt.tight_layout()
-            plt.savefig(os.path.join(folder, f"{feature}_timeline.png"))
-            plt.close()
-        
-        plt.figure()
-        sns.regplot(
-            x=df[feature], 
-            y=df['overall'], 
-            scatter_kws={'alpha': 0.6, 's': 40, 'color': 'steelblue'},
-            line_kws={'color': 'red', 'linewidth': 2}
-        )
-        plt.xlabel(f'{xlabel} (%)')
-        plt.ylabel('Overall Attention (%)')
-        plt.title(f'{title} vs Overall Attention')
-        plt.grid(True, alpha=0.3)
-        plt.xlim(0, 100)
-        plt.ylim(0, 100)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, f"{feature}_vs_attention.png"))
-        plt.close()
-        
-        plt.figure()
-        sns.histplot(df[feature], bins=20, kde=True, color='skyblue')
-        plt.xlabel(f'{xlabel} (%)')
-        plt.ylabel('Frequency')
-        plt.title(f'{title} Distribution')
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, f"{feature}_distribution.png"))
-        plt.close()
-        
-        summary = f"""
-{title.upper()} SUMMARY
-======================================
-Session Date       : {session_date}
-Session Duration   : {session_duration:.1f} seconds
-Overall Score      : {df[feature].mean():.1f}%
-
-1. Score Distribution
--------------------------------
-Minimum: {df[feature].min():.1f}%
-Maximum: {df[feature].max():.1f}%
-Average: {df[feature].mean():.1f}%
-
-2. Correlation with Overall Attention
---------------------------------------
-Correlation Coefficient: {df[[feature, 'overall']].corr().iloc[0,1]:.2f}
-
-3. Time Analysis
--------------------------------
-Optimal Time (%): {(df[feature] > 70).mean()*100:.1f}%
-Suboptimal Time (%): {(df[feature] < 50).mean()*100:.1f}%
-"""
-        with open(os.path.join(folder, f"{feature.lower()}_summary.txt"), 'w') as f:
-            f.write(summary)
-
-    def create_emotion_distribution(self, folder, df):
-        plt.figure()
-        emotion_counts = df['emotion'].value_counts()
-        sns.barplot(x=emotion_counts.index, 
-                    y=emotion_counts.values, 
-                    hue=emotion_counts.index,
-                    palette='viridis',
-                    legend=False)
-        plt.xlabel('Emotion')
-        plt.ylabel('Count')
-        plt.title('Emotion Distribution During Session')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "emotion_distribution.png"))
-        plt.close()
-        
-        emotion_percentages = df['emotion'].value_counts(normalize=True) * 100
-        emotion_summary = f"""
-FACIAL EXPRESSION ANALYSIS SUMMARY
-======================================
-Session Duration: {df['timestamp'].max():.1f} seconds
-
-1. Emotion Distribution
--------------------------------
-"""
-        for emotion, percentage in emotion_percentages.items():
-            emotion_summary += f"- {emotion.capitalize()}: {percentage:.1f}%\n"
-        
-        emotion_summary += "\n2. Attention Impact\n-------------------------------\n"
-        for emotion in emotion_percentages.index:
-            avg_attention = df[df['emotion'] == emotion]['face_attention'].mean()
-            emotion_summary += f"- {emotion.capitalize()}: {avg_attention:.1f}% attention\n"
-        
-        with open(os.path.join(folder, "emotion_summary.txt"), 'w') as f:
-            f.write(emotion_summary)
-
-    def save_eye_details(self, folder, df, session_date, session_duration):
-        if not self.eye_tracker.gaze_data:
+        # Raw per-second features for offline rescoring (see rescoring.py)
+        self.data.save_npz(os.path.join(self.output_folder, "session_features.npz"))
+        if self.report_jobs is not None:
+            # Figures render in the background; stop() does not wait for them
+            self.report_job = self.report_jobs.submit(self.report_snapshot(), key=(self.student_id, self.session_id))
             return
-            
-        eye_df = pd.DataFrame(self.eye_tracker.gaze_data)
-
-        merged_df = pd.merge_asof(
-            eye_df.sort_values('timestamp'), 
-            df[['timestamp', 'overall']].sort_values('timestamp'),
-            on='timestamp',
-            direction='nearest'
-        )
-        plt.figure(figsize=(12, 8))
-        plt.subplot(3, 1, 1)
-        plt.plot(eye_df['timestamp'], eye_df['gaze_score'], 'b-', label='Gaze Score')
-        plt.ylabel('Gaze Score (%)')
-        plt.title('Gaze Concentration Over Time')
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        
-        plt.subplot(3, 1, 2)
-        plt.plot(eye_df['timestamp'], eye_df['blink_rate'], 'g-', label='Blink Rate')
-        plt.ylabel('Blinks/Minute')
-        plt.title('Blink Rate Over Time')
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        
-        plt.subplot(3, 1, 3)
-        plt.plot(eye_df['timestamp'], eye_df['ear_value'], 'r-', label='EAR Value')
-        plt.xlabel('Time (seconds)')
-        plt.ylabel('EAR Value')
-        plt.title('Eye Aspect Ratio (EAR) Over Time')
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "eye_metrics_timeline.png"))
-        plt.close()
-        
-        plt.figure()
-        sns.histplot(eye_df['blink_rate'], bins=15, kde=True, color='teal')
-        plt.axvline(x=15, color='r', linestyle='--', label='Optimal Zone (15 blinks/min)')
-        plt.xlabel('Blink Rate (blinks/minute)')
-        plt.ylabel('Frequency')
-        plt.title('Blink Rate Distribution')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "blink_rate_distribution.png"))
-        plt.close()
-        
-        plt.figure()
-        sns.regplot(
-            x=merged_df['gaze_score'], 
-            y=merged_df['overall'], 
-            scatter_kws={'alpha':0.6, 's':40, 'color':'purple'},
-            line_kws={'color':'orange', 'linewidth':2}
-        )
-        plt.xlabel('Gaze Score (%)')
-        plt.ylabel('Overall Attention (%)')
-        plt.title('Gaze Concentration vs Overall Attention')
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "gaze_vs_attention.png"))
-        plt.close()
-        
-        plt.figure()
-        sns.regplot(
-            x=merged_df['blink_rate'], 
-            y=merged_df['overall'], 
-            scatter_kws={'alpha':0.6, 's':40, 'color':'green'},
-            line_kws={'color':'red', 'linewidth':2}
-        )
-        plt.xlabel('Blink Rate (blinks/minute)')
-        plt.ylabel('Overall Attention (%)')
-        plt.title('Blink Rate vs Overall Attention')
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "blink_rate_vs_attention.png"))
-        plt.close()
-        
-        plt.figure()
-        plt.scatter(
-            eye_df['ear_value'], 
-            eye_df['blink_rate'], 
-            c=eye_df['gaze_score'], 
-            cmap='viridis', 
-            alpha=0.6,
-            s=50
-        )
-        plt.colorbar(label='Gaze Score (%)')
-        plt.axvline(x=self.eye_tracker.ear_threshold, color='r', linestyle='--', label='Blink Threshold')
-        plt.xlabel('Eye Aspect Ratio (EAR)')
-        plt.ylabel('Blink Rate (blinks/minute)')
-        plt.title('EAR vs Blink Rate')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(folder, "ear_vs_blink_rate.png"))
-        plt.close()
-        
-        avg_gaze = eye_df['gaze_score'].mean()
-        blink_stats = eye_df['blink_rate'].describe()
-        gaze_stats = eye_df['gaze_score'].describe()
-        ear_stats = eye_df['ear_value'].describe()
-        
-        summary = f"""
-DETAILED EYE TRACKING ANALYSIS SUMMARY
-======================================
-Session Date       : {session_date}
-Session Duration   : {session_duration:.1f} seconds
-
-1. Overall Metrics
--------------------------------
-Overall Eye Attention: {avg_gaze:.1f}%
-
-2. Blink Rate Analysis
--------------------------------
-Average: {blink_stats['mean']:.1f} blinks/minute
-Optimal Range (14-18): {((eye_df['blink_rate'] >= 14) & (eye_df['blink_rate'] <= 18)).mean()*100:.1f}% of samples
-Low Blink Rate (<8): {(eye_df['blink_rate'] < 8).mean()*100:.1f}% of samples
-High Blink Rate (>22): {(eye_df['blink_rate'] > 22).mean()*100:.1f}% of samples
-
-3. Gaze Concentration
--------------------------------
-Average: {gaze_stats['mean']:.1f}%
-High Concentration (>80%): {(eye_df['gaze_score'] > 80).mean()*100:.1f}% of samples
-Low Concentration (<40%): {(eye_df['gaze_score'] < 40).mean()*100:.1f}% of samples
-
-4. Eye Aspect Ratio (EAR)
--------------------------------
-Average: {ear_stats['mean']:.3f}
-Threshold: {self.eye_tracker.ear_threshold:.3f}
-
-5. Recommendations
--------------------------------
-{self.generate_eye_recommendations(eye_df)}
-"""
-        with open(os.path.join(folder, "eye_analysis_summary.txt"), 'w') as f:
-            f.write(summary)
-    
-    def generate_eye_recommendations(self, eye_df):
-        avg_blink = eye_df['blink_rate'].mean()
-        avg_gaze = eye_df['gaze_score'].mean()
-        
-        recommendations = []
-        
-        if avg_blink < 8:
-            recommendations.append("- Your blink rate is low, which may indicate intense focus but can lead to eye strain. Try to blink more consciously.")
-        elif avg_blink > 22:
-            recommendations.append("- Your blink rate is higher than average, which may indicate distraction or eye discomfort. Consider checking your environment for irritants.")
-        else:
-            recommendations.append("- Your blink rate is in the optimal range for maintaining good eye health and focus.")
-        
-        if avg_gaze < 40:
-            recommendations.append("- Your gaze concentration is low, suggesting frequent distractions. Try to minimize environmental distractions.")
-        elif avg_gaze > 80:
-            recommendations.append("- Your gaze concentration is excellent, but be mindful of taking regular breaks to prevent eye strain.")
-        
-        low_ear_frames = (eye_df['ear_value'] < self.eye_tracker.ear_threshold).sum()
-        if low_ear_frames > len(eye_df) * 0.3:
-            recommendations.append("- You're showing signs of eye fatigue with frequent partial blinks. Consider following the 20-20-20 rule: every 20 minutes, look at something 20 feet away for 20 seconds.")
-        
-        return "\n".join(recommendations)
+        # matplotlib, seaborn and pandas are only loaded once a report is written
+        from reporting import save_report
+        save_report(self.report_snapshot())
 
-    def stop(self):
+    def close(self):
+        # Threads and models only, nothing saved; offline segments call this directly
+        if self.closed:
+            return
         self.is_tracking = False
         self.noise_detector.is_recording = False
-        self.firebase_queue.put(None)
-        self.noise_thread.join(timeout=1.0)
-        self.firebase_thread.join(timeout=1.0)
+        if self.noise_thread is not None:
+            self.noise_thread.join(timeout=1.0)
+        if self.firebase_writer is not None:
+            self.firebase_writer.close()
+        if self.inference_pool is not None:
+            self.inference_pool.shutdown(wait=True)
+        self.emotion_analyzer.close()
+        with self.models_lock:
+            self.closed = True
+            if self.model_pool is not None:
+                self.model_pool.release(self.models)
+            else:
+                self.models.close()
+
+    def stop(self):
+        if self.stopped:
+            return
+        self.stopped = True
+        self.close()
         # Save any remaining interval data
         if self.interval_scores:
             avg_overall = sum(self.interval_scores) / len(self.interval_scores)
@@ -1129,32 +1077,42 @@ Threshold: {self.eye_tracker.ear_threshold:.3f}
                     'interval_start': self.current_interval_start,
                     'overall_attention': avg_overall
                 })
+            self.events.publish('interval', {
+                'interval_start': self.current_interval_start,
+                'overall_attention': avg_overall
+            })
             print(f"Final interval ({self.current_interval_start:.1f}s): Overall Attention = {avg_overall:.1f}%")
+        self.events.close()
+        self.metrics.write_log(os.path.join(self.output_folder, "metrics.json"))
         self.save_results()
 
-    def run(self):
-        cap = cv2.VideoCapture(0)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        cap.set(cv2.CAP_PROP_FPS, 30)
-        
-        print("Real-time Attention Analysis System")
-        print("===================================")
-        print("Press 's' to start tracking")
-        print("Press 'q' to save results and quit")
-        print("Press 'p' to pause tracking during session")
-        
-        self.is_tracking = False
-        
+    def run(self, hub=None, show_window=True):
+        # Frames come from the shared capture hub so the analyzer and any
+        # /video_feed viewers never open the camera twice
+        hub = hub or get_capture_hub(0)
+        subscriber = hub.subscribe("analyzer")
+
+        if show_window:
+            print("Real-time Attention Analysis System")
+            print("===================================")
+            print("Press 's' to start tracking")
+            print("Press 'q' to save results and quit")
+            print("Press 'p' to pause tracking during session")
+
+            self.is_tracking = False
+
         try:
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
+            while not self.stopped:
+                captured = subscriber.read(timeout=1.0)
+                if captured is None:
+                    if not hub.is_running:
+                        break
                     continue
-                
-                frame = cv2.flip(frame, 1)
-                frame = self.process_frame(frame)
-                
+
+                frame = self.process_frame(captured.frame.copy())
+                if not show_window:
+                    continue
+
                 if not self.is_tracking:
                     cv2.putText(frame, "Press 's' to start tracking", 
                                 (frame.shape[1]//2 - 200, frame.shape[0]//2), 
@@ -1169,7 +1127,11 @@ Threshold: {self.eye_tracker.ear_threshold:.3f}
                     self.current_interval_start = 0
                     self.interval_scores = []
                     self.interval_data = []
-                    self.data = {k: [] for k in self.data}
+                    self.data.clear()
+                    self.eye_tracker.blink_window.reset()
+                    self.noise_stats = NoiseStatistics()
+                    self.models.reset()
+                    self.scheduler.reset()
                     print("Tracking started...")
                 elif key == ord('q'):
                     break
@@ -1178,11 +1140,12 @@ Threshold: {self.eye_tracker.ear_threshold:.3f}
                     status = "PAUSED" if not self.is_tracking else "RESUMED"
                     print(f"Tracking {status}")
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
+            subscriber.close()
+            if show_window:
+                cv2.destroyAllWindows()
             self.stop()
             print("Analysis complete! Results saved.")
 
 if __name__ == "__main__":
-    analyzer = RealTimeAttentionAnalyzer()
+    analyzer = RealTimeAttentionAnalyzer(inference_mode=os.environ.get("INFERENCE_MODE", "serial"))
     analyzer.run()
\ No newline at end of file
@@ -0,0 +1,172 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+FIGURE_FORMATS = ("png", "svg")
+# Independent slices of the report, one worker task each (see reporting.render_group)
+FIGURE_GROUPS = ("summary", "timeline", "posture", "eye", "eye_details", "face", "noise")
+
+
+def warm_worker(delay):
+    # matplotlib, seaborn and pandas load once per worker, never in the server process
+    import reporting
+
+    time.sleep(delay)
+    return True
+
+
+def run_group(snapshot, group, dpi, fmt):
+    from reporting import render_group
+
+    return render_group(snapshot, group, dpi, fmt)
+
+
+class ReportJob:
+    def __init__(self, key, output_folder, groups, dpi, fmt):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.output_folder = output_folder
+        self.dpi = dpi
+        self.format = fmt
+        self.futures = {}
+        self.pending = set(groups)
+        self.completed = []
+        self.errors = {}
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.done_event = threading.Event()
+
+    @property
+    def state(self):
+        if self.pending:
+            return "running" if self.completed or self.errors else "queued"
+        return "failed" if self.errors else "done"
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def status(self):
+        return {
+            'job_id': self.id,
+            'student_id': self.key[0],
+            'session_id': self.key[1],
+            'state': self.state,
+            'output_folder': self.output_folder,
+            'format': self.format,
+            'dpi': self.dpi,
+            'completed': list(self.completed),
+            'pending': sorted(self.pending),
+            'errors': dict(self.errors),
+            'elapsed': (self.finished_at or time.time()) - self.submitted_at
+        }
+
+
+class ReportJobs:
+    def __init__(self, max_workers=None, dpi=300, fmt="png", history=100):
+        if fmt not in FIGURE_FORMATS:
+            raise ValueError(f"Unsupported figure format: {fmt}")
+        self.max_workers = max_workers or min(len(FIGURE_GROUPS), multiprocessing.cpu_count())
+        self.dpi = dpi
+        self.format = fmt
+        self.history = history
+        # Fork rather than spawn: spawned workers would re-run the server's module-level setup
+        # (Firebase, camera, model pool). Workers are forked at start() and reused.
+        self.pool = self._new_pool("fork")
+        self.rebuilds = 0
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def _new_pool(self, method):
+        context = multiprocessing.get_context(method)
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _rebuild(self, broken):
+        # A worker died (e.g. OOM-killed) and took the pool with it. The server is multithreaded by
+        # now and forking it could copy a held lock into the child, so replacements come from a
+        # fork server instead; app.py skips its setup when imported there as __mp_main__.
+        with self.lock:
+            if self.pool is not broken:
+                return
+            self.pool = self._new_pool("forkserver")
+            self.rebuilds += 1
+        print("Report worker pool was broken; started a new one")
+        broken.shutdown(wait=False)
+
+    def start(self):
+        # The first submit to a fork pool forks every worker, here while the server is still
+        # single-threaded. The reporting imports then load in the workers without holding up startup.
+        for _ in range(self.max_workers):
+            self.pool.submit(warm_worker, 0.2)
+
+    def submit(self, snapshot, key=(None, None), dpi=None, fmt=None):
+        dpi = dpi or self.dpi
+        fmt = fmt or self.format
+        job = ReportJob(key, snapshot['output_folder'], FIGURE_GROUPS, dpi, fmt)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._trim()
+        if len(snapshot['data']) == 0:
+            job.pending.clear()
+            job.finished_at = time.time()
+            job.done_event.set()
+            return job
+
+        pool = self.pool
+        for group in FIGURE_GROUPS:
+            try:
+                future = pool.submit(run_group, snapshot, group, dpi, fmt)
+            except BrokenProcessPool as e:
+                self._rebuild(pool)
+                for unsubmitted in FIGURE_GROUPS:
+                    if unsubmitted not in job.futures:
+                        self._finish_group(job, unsubmitted, e)
+                break
+            job.futures[group] = future
+            future.add_done_callback(lambda f, group=group: self._group_done(job, group, f, pool))
+        return job
+
+    def _group_done(self, job, group, future, pool):
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._rebuild(pool)
+        self._finish_group(job, group, error)
+
+    def _finish_group(self, job, group, error):
+        with self.lock:
+            if error is not None:
+                job.errors[group] = f"{type(error).__name__}: {error}"
+            else:
+                job.completed.append(group)
+            job.pending.discard(group)
+            finished = not job.pending
+            if finished:
+                job.finished_at = time.time()
+        if error is not None:
+            print(f"Report group '{group}' failed for {job.output_folder}: {error}")
+        if finished:
+            if job.errors:
+                print(f"Report for {job.output_folder} finished with {len(job.errors)} failed group(s)")
+            else:
+                print(f"Results saved to: {job.output_folder} ({job.finished_at - job.submitted_at:.1f}s)")
+            job.done_event.set()
+
+    def _trim(self):
+        finished = [job for job in self.jobs.values() if not job.pending]
+        for job in sorted(finished, key=lambda j: j.submitted_at)[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def find(self, student_id, session_id=None):
+        with self.lock:
+            candidates = [job for job in self.jobs.values()
+                          if job.key[0] == student_id and (session_id is None or job.key[1] == session_id)]
+        return max(candidates, key=lambda j: j.submitted_at) if candidates else None
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
@@ -0,0 +1,601 @@
+import os
+
+import matplotlib
+matplotlib.use("Agg")  # Reports are only ever written to files, often from server threads
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+
+from report_jobs import FIGURE_FORMATS, FIGURE_GROUPS
+
+
+figure_format = "png"
+
+
+def configure(dpi=300, fmt="png"):
+    global figure_format
+    if fmt not in FIGURE_FORMATS:
+        raise ValueError(f"Unsupported figure format: {fmt}")
+    figure_format = fmt
+    sns.set_style("whitegrid")
+    plt.rcParams.update({
+        'font.size': 10,
+        'axes.titlesize': 12,
+        'axes.labelsize': 10,
+        'xtick.labelsize': 9,
+        'ytick.labelsize': 9,
+        'legend.fontsize': 9,
+        'figure.dpi': dpi,
+        'savefig.dpi': dpi,
+        'figure.figsize': (10, 6)
+    })
+
+
+def save_figure(folder, name):
+    plt.savefig(os.path.join(folder, f"{name}.{figure_format}"))
+
+
+def report_folders(output_folder):
+    folders = {
+        'body': os.path.join(output_folder, "body_posture"),
+        'eye': os.path.join(output_folder, "eye_tracking"),
+        'eye_details': os.path.join(output_folder, "eye_tracking", "detailed_analysis"),
+        'face': os.path.join(output_folder, "facial_expression"),
+        'noise': os.path.join(output_folder, "background_noise")
+    }
+    for folder in folders.values():
+        os.makedirs(folder, exist_ok=True)
+    return folders
+
+
+def session_frame(snapshot):
+    df = snapshot['data'].to_pandas()
+    df['emotion'] = df['emotion'].cat.remove_unused_categories()
+    return df
+
+
+def render_group(snapshot, group, dpi=300, fmt="png"):
+    # One independent slice of the report; safe to run in its own process
+    configure(dpi, fmt)
+    df = session_frame(snapshot)
+    output_folder = snapshot['output_folder']
+    folders = report_folders(output_folder)
+    session_duration = df['timestamp'].max()
+    session_date = snapshot['session_date']
+
+    if group == "summary":
+        write_session_summary(output_folder, df, session_date, session_duration)
+    elif group == "timeline":
+        plt.figure()
+        plt.plot(df['timestamp'], df['overall'], 'b-', linewidth=2, label='Overall Attention')
+        plt.fill_between(df['timestamp'], 0, df['overall'], color='blue', alpha=0.1)
+        plt.xlabel('Time (seconds)')
+        plt.ylabel('Attention Score (%)')
+        plt.title('Attention Timeline')
+        plt.grid(True, alpha=0.3)
+        plt.ylim(0, 100)
+        plt.xlim(0, df['timestamp'].max() * 1.05)
+        plt.tight_layout()
+        save_figure(output_folder, "attention_timeline")
+        plt.close()
+    elif group == "posture":
+        create_feature_graphs(folders['body'], df, 'posture', 'Body Posture Analysis', 'Posture Score', session_date, session_duration)
+    elif group == "eye":
+        create_feature_graphs(folders['eye'], df, 'eye_attention', 'Eye Tracking Analysis', 'Eye Attention Score', session_date, session_duration)
+    elif group == "eye_details":
+        save_eye_details(folders['eye_details'], df, snapshot['ear_threshold'], session_date, session_duration)
+    elif group == "face":
+        create_feature_graphs(
+            folders['face'], 
+            df, 
+            'face_attention', 
+            'Facial Expression Analysis', 
+            'Face Attention Score',
+            session_date,
+            session_duration,
+            generate_timeline=False
+        )
+        create_emotion_distribution(folders['face'], df)
+    elif group == "noise":
+        create_noise_graphs(folders['noise'], df, snapshot['noise_summary'], session_date, session_duration)
+    else:
+        raise ValueError(f"Unknown report group: {group}")
+    return group
+
+
+def save_report(snapshot, dpi=300, fmt="png"):
+    if len(snapshot['data']) == 0:
+        return
+    for group in FIGURE_GROUPS:
+        render_group(snapshot, group, dpi, fmt)
+    print(f"Results saved to: {snapshot['output_folder']}")
+
+
+def write_session_summary(output_folder, df, session_date, session_duration):
+    report = f"""
+REAL-TIME ATTENTION ANALYSIS SUMMARY
+======================================
+Session Date       : {session_date}
+Session Duration   : {session_duration:.1f} seconds
+Overall Attention  : {df['overall'].mean():.1f}%
+
+1. Component Scores
+-------------------------------
+- Posture: {df['posture'].mean():.1f}%
+- Eye Attention: {df['eye_attention'].mean():.1f}%
+- Facial Expression: {df['face_attention'].mean():.1f}%
+- Background Noise: {df['noise_attention'].mean():.1f}%
+
+2. Emotion Distribution
+-------------------------------
+"""
+    emotion_percentages = df['emotion'].value_counts(normalize=True) * 100
+    for emotion, percentage in emotion_percentages.items():
+        report += f"- {emotion.capitalize()}: {percentage:.1f}%\n"
+        
+    report += "\n3. Observations & Recommendations\n----------------------------------\n"
+    report += generate_recommendations(df)
+    
+    with open(os.path.join(output_folder, "summary.txt"), 'w') as f:
+        f.write(report)
+
+
+def create_feature_scatter(folder, df, feature, title, xlabel):
+    plt.figure()
+    sns.regplot(
+        x=df[feature], 
+        y=df['overall'], 
+        scatter_kws={'alpha': 0.6, 's': 40, 'color': 'steelblue'},
+        line_kws={'color': 'red', 'linewidth': 2}
+    )
+    plt.xlabel(f'{xlabel} (%)')
+    plt.ylabel('Overall Attention (%)')
+    plt.title(title)
+    plt.grid(True, alpha=0.3)
+    plt.xlim(0, 100)
+    plt.ylim(0, 100)
+    plt.tight_layout()
+    save_figure(folder, f"{feature}_vs_attention")
+    plt.close()
+    
+    correlation = df[[feature, 'overall']].corr().iloc[0,1]
+    
+    summary = f"""
+{title.upper()}
+"""
+    with open(os.path.join(folder, "summary.txt"), 'w') as f:
+        f.write(summary)
+
+
+def create_noise_graphs(folder, df, noise_summary, session_date, session_duration):
+    # One noise reading per stored second; rows before the first reading have no level
+    noise_df = df[df['noise_db'].notna()]
+    if noise_df.empty:
+        return
+        
+    times = noise_df['timestamp']
+    noise_levels = noise_df['noise_db']
+    attention_levels = noise_df['noise_attention']
+    
+    plt.figure()
+    plt.plot(times, noise_levels, 'r-', linewidth=1.5)
+    plt.axhline(y=55, color='g', linestyle='--', linewidth=1.2, label='Ideal Limit (55dB)')
+    plt.fill_between(times, 0, noise_levels, color='red', alpha=0.1)
+    plt.xlabel('Time (seconds)')
+    plt.ylabel('Noise Level (dB)')
+    plt.title('Background Noise Analysis')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.tight_layout()
+    save_figure(folder, "noise_over_time")
+    plt.close()
+    
+    plt.figure()
+    sns.regplot(x=noise_levels, y=attention_levels, 
+                scatter_kws={'alpha':0.5, 's':30}, 
+                line_kws={'color':'red', 'linewidth':1.5})
+    plt.xlabel('Noise Level (dB)')
+    plt.ylabel('Attention Score (%)')
+    plt.title('Noise vs Attention')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    save_figure(folder, "noise_vs_attention")
+    plt.close()
+    
+    plt.figure()
+    sns.histplot(noise_levels, bins=20, kde=True, color='crimson')
+    plt.axvline(x=55, color='g', linestyle='--', linewidth=1.2, label='Ideal Limit (55dB)')
+    plt.xlabel('Noise Level (dB)')
+    plt.ylabel('Frequency')
+    plt.title('Noise Distribution')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    save_figure(folder, "noise_distribution")
+    plt.close()
+    
+    write_noise_summary(folder, noise_summary, session_date, session_duration)
+
+
+def format_seconds(seconds):
+    return f"{int(seconds) // 60:02d}:{int(seconds) % 60:02d}"
+
+
+def describe_correlation(r):
+    if r is None:
+        return "n/a"
+    strength = "strongly" if abs(r) >= 0.7 else "moderately" if abs(r) >= 0.4 else "weakly"
+    direction = "lower" if r < 0 else "higher"
+    return f"{r:.2f} (higher noise is {strength} associated with {direction} attention)"
+
+
+def noise_rating(mean_db):
+    if mean_db < 45:
+        return "🟢 Quiet"
+    elif mean_db < 55:
+        return "🟢 Low Noise"
+    elif mean_db < 65:
+        return "🟡 Moderate Noise"
+    return "🔴 High Noise"
+
+
+def generate_noise_recommendations(noise_summary):
+    recommendations = []
+    segments = noise_summary['segments']
+    threshold = noise_summary['threshold_db']
+    loud = [s for s in segments if s['mean_db'] > threshold]
+    if loud:
+        worst = max(loud, key=lambda s: s['mean_db'])
+        recommendations.append(
+            f"- Noise averaged above {threshold} dB in {len(loud)} of {len(segments)} segments, "
+            f"worst at {format_seconds(worst['start'])} ({worst['mean_db']:.1f} dB)."
+        )
+    r = noise_summary['correlation']
+    if r is not None and r <= -0.4:
+        recommendations.append("- Attention dropped noticeably when it got louder. Consider a quieter space or a noise-canceling microphone.")
+    if noise_summary['seconds_above'] > 0.25 * max(1.0, noise_summary['seconds']):
+        recommendations.append("- High noise made up over a quarter of the session; real-time noise alerts could help.")
+    if not recommendations:
+        return "- Background noise stayed within a comfortable range for this session."
+    return "\n".join(recommendations)
+
+
+def write_noise_summary(folder, noise_summary, session_date, session_duration):
+    # Built from the incrementally maintained segment accumulators (noise_stats.py)
+    if not noise_summary['samples']:
+        return
+    threshold = noise_summary['threshold_db']
+
+    summary = f"""
+BACKGROUND NOISE ANALYSIS SUMMARY
+======================================
+Session Date       : {session_date}
+Session Duration   : {session_duration:.1f} seconds
+Overall Attention  : {noise_summary['mean_attention']:.1f}%
+
+1. Noise Level Classification
+-------------------------------
+Time Range     | Level               | Type
+-------------- | ------------------- | ---------------
+"""
+    for segment in noise_summary['segments']:
+        time_range = f"{format_seconds(segment['start'])}-{format_seconds(segment['end'])}"
+        summary += f"{time_range:<14} | {segment['source']:<19} | {segment['type']}\n"
+
+    summary += f"""
+2. Segmented Analysis
+-----------------------
+Time Range     | Avg. Noise (dB) | Peak (dB) | {f'>{threshold} dB (s)':<12} | Attention (%) | r
+-------------- | --------------- | --------- | ------------ | ------------- | -----
+"""
+    for segment in noise_summary['segments']:
+        time_range = f"{format_seconds(segment['start'])}-{format_seconds(segment['end'])}"
+        r = segment['correlation']
+        summary += (f"{time_range:<14} | {segment['mean_db']:<15.1f} | {segment['peak_db']:<9.1f} | "
+                    f"{segment['seconds_above']:<12.0f} | {segment['mean_attention']:<13.1f} | "
+                    f"{'n/a' if r is None else f'{r:.2f}'}\n")
+
+    summary += f"""
+3. Attention vs. Noise Correlation
+-----------------------------------
+Correlation Coefficient (r): {describe_correlation(noise_summary['correlation'])}
+
+4. Noise Rating Summary
+-------------------------
+Overall Noise Level : {noise_rating(noise_summary['mean_db'])}
+Average dB          : {noise_summary['mean_db']:.1f} dB
+Peak dB             : {noise_summary['peak_db']:.1f} dB
+High Noise Duration : {noise_summary['seconds_above']:.0f} seconds
+
+5. Observations & Recommendations
+----------------------------------
+{generate_noise_recommendations(noise_summary)}
+"""
+    with open(os.path.join(folder, "noise_analysis_summary.txt"), 'w', encoding='utf-8') as f:
+        f.write(summary)
+
+
+def generate_recommendations(df):
+    recommendations = []
+    
+    if df['posture'].mean() < 60:
+        recommendations.append("- Your posture score indicates frequent distractions. Try to maintain a straight posture facing the screen.")
+    
+    if df['eye_attention'].mean() < 60:
+        recommendations.append("- Your eye attention score suggests frequent distractions. Minimize environmental distractions and focus on the task.")
+    
+    if df['face_attention'].mean() < 60:
+        recommendations.append("- Your facial expression analysis indicates potential disengagement. Try to maintain a neutral or positive facial expression.")
+    
+    if df['noise_attention'].mean() < 70:
+        recommendations.append("- Background noise is affecting your attention. Consider using noise-canceling headphones or moving to a quieter environment.")
+    
+    if not recommendations:
+        return "- All metrics are within optimal ranges. Keep up the good focus!"
+    
+    return "\n".join(recommendations)
+
+
+def create_feature_graphs(folder, df, feature, title, xlabel, session_date, session_duration, generate_timeline=True):
+    if generate_timeline:
+        plt.figure()
+        plt.plot(df['timestamp'], df[feature], 'g-', linewidth=1.5)
+        plt.xlabel('Time (seconds)')
+        plt.ylabel(f'{xlabel} (%)')
+        plt.title(f'{title} - Score Over Time')
+        plt.grid(True, alpha=0.3)
+        plt.ylim(0, 100)
+        plt.xlim(0, df['timestamp'].max() * 1.05)
+        plt.tight_layout()
+        save_figure(folder, f"{feature}_timeline")
+        plt.close()
+    
+    plt.figure()
+    sns.regplot(
+        x=df[feature], 
+        y=df['overall'], 
+        scatter_kws={'alpha': 0.6, 's': 40, 'color': 'steelblue'},
+        line_kws={'color': 'red', 'linewidth': 2}
+    )
+    plt.xlabel(f'{xlabel} (%)')
+    plt.ylabel('Overall Attention (%)')
+    plt.title(f'{title} vs Overall Attention')
+    plt.grid(True, alpha=0.3)
+    plt.xlim(0, 100)
+    plt.ylim(0, 100)
+    plt.tight_layout()
+    save_figure(folder, f"{feature}_vs_attention")
+    plt.close()
+    
+    plt.figure()
+    sns.histplot(df[feature], bins=20, kde=True, color='skyblue')
+    plt.xlabel(f'{xlabel} (%)')
+    plt.ylabel('Frequency')
+    plt.title(f'{title} Distribution')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    save_figure(folder, f"{feature}_distribution")
+    plt.close()
+    
+    summary = f"""
+{title.upper()} SUMMARY
+======================================
+Session Date       : {session_date}
+Session Duration   : {session_duration:.1f} seconds
+Overall Score      : {df[feature].mean():.1f}%
+
+1. Score Distribution
+-------------------------------
+Minimum: {df[feature].min():.1f}%
+Maximum: {df[feature].max():.1f}%
+Average: {df[feature].mean():.1f}%
+
+2. Correlation with Overall Attention
+--------------------------------------
+Correlation Coefficient: {df[[feature, 'overall']].corr().iloc[0,1]:.2f}
+
+3. Time Analysis
+-------------------------------
+Optimal Time (%): {(df[feature] > 70).mean()*100:.1f}%
+Suboptimal Time (%): {(df[feature] < 50).mean()*100:.1f}%
+"""
+    with open(os.path.join(folder, f"{feature.lower()}_summary.txt"), 'w') as f:
+        f.write(summary)
+
+
+def create_emotion_distribution(folder, df):
+    plt.figure()
+    emotion_counts = df['emotion'].value_counts()
+    sns.barplot(x=emotion_counts.index, 
+                y=emotion_counts.values, 
+                hue=emotion_counts.index,
+                palette='viridis',
+                legend=False)
+    plt.xlabel('Emotion')
+    plt.ylabel('Count')
+    plt.title('Emotion Distribution During Session')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    save_figure(folder, "emotion_distribution")
+    plt.close()
+    
+    emotion_percentages = df['emotion'].value_counts(normalize=True) * 100
+    emotion_summary = f"""
+FACIAL EXPRESSION ANALYSIS SUMMARY
+======================================
+Session Duration: {df['timestamp'].max():.1f} seconds
+
+1. Emotion Distribution
+-------------------------------
+"""
+    for emotion, percentage in emotion_percentages.items():
+        emotion_summary += f"- {emotion.capitalize()}: {percentage:.1f}%\n"
+    
+    emotion_summary += "\n2. Attention Impact\n-------------------------------\n"
+    for emotion in emotion_percentages.index:
+        avg_attention = df[df['emotion'] == emotion]['face_attention'].mean()
+        emotion_summary += f"- {emotion.capitalize()}: {avg_attention:.1f}% attention\n"
+    
+    with open(os.path.join(folder, "emotion_summary.txt"), 'w') as f:
+        f.write(emotion_summary)
+
+
+def save_eye_details(folder, df, ear_threshold, session_date, session_duration):
+    # Gaze, blink rate and EAR come from the per-second session rows, which already carry overall;
+    # only rows with a face count, as the eye metrics are not measured without one
+    eye_df = df[df['face_detected']]
+    if len(eye_df) == 0:
+        return
+    plt.figure(figsize=(12, 8))
+    plt.subplot(3, 1, 1)
+    plt.plot(eye_df['timestamp'], eye_df['gaze_score'], 'b-', label='Gaze Score')
+    plt.ylabel('Gaze Score (%)')
+    plt.title('Gaze Concentration Over Time')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    
+    plt.subplot(3, 1, 2)
+    plt.plot(eye_df['timestamp'], eye_df['blink_rate'], 'g-', label='Blink Rate')
+    plt.ylabel('Blinks/Minute')
+    plt.title('Blink Rate Over Time')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    
+    plt.subplot(3, 1, 3)
+    plt.plot(eye_df['timestamp'], eye_df['ear_value'], 'r-', label='EAR Value')
+    plt.xlabel('Time (seconds)')
+    plt.ylabel('EAR Value')
+    plt.title('Eye Aspect Ratio (EAR) Over Time')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    
+    plt.tight_layout()
+    save_figure(folder, "eye_metrics_timeline")
+    plt.close()
+    
+    plt.figure()
+    sns.histplot(eye_df['blink_rate'], bins=15, kde=True, color='teal')
+    plt.axvline(x=15, color='r', linestyle='--', label='Optimal Zone (15 blinks/min)')
+    plt.xlabel('Blink Rate (blinks/minute)')
+    plt.ylabel('Frequency')
+    plt.title('Blink Rate Distribution')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    save_figure(folder, "blink_rate_distribution")
+    plt.close()
+    
+    plt.figure()
+    sns.regplot(
+        x=eye_df['gaze_score'], 
+        y=eye_df['overall'], 
+        scatter_kws={'alpha':0.6, 's':40, 'color':'purple'},
+        line_kws={'color':'orange', 'linewidth':2}
+    )
+    plt.xlabel('Gaze Score (%)')
+    plt.ylabel('Overall Attention (%)')
+    plt.title('Gaze Concentration vs Overall Attention')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    save_figure(folder, "gaze_vs_attention")
+    plt.close()
+    
+    plt.figure()
+    sns.regplot(
+        x=eye_df['blink_rate'], 
+        y=eye_df['overall'], 
+        scatter_kws={'alpha':0.6, 's':40, 'color':'green'},
+        line_kws={'color':'red', 'linewidth':2}
+    )
+    plt.xlabel('Blink Rate (blinks/minute)')
+    plt.ylabel('Overall Attention (%)')
+    plt.title('Blink Rate vs Overall Attention')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    save_figure(folder, "blink_rate_vs_attention")
+    plt.close()
+    
+    plt.figure()
+    plt.scatter(
+        eye_df['ear_value'], 
+        eye_df['blink_rate'], 
+        c=eye_df['gaze_score'], 
+        cmap='viridis', 
+        alpha=0.6,
+        s=50
+    )
+    plt.colorbar(label='Gaze Score (%)')
+    plt.axvline(x=ear_threshold, color='r', linestyle='--', label='Blink Threshold')
+    plt.xlabel('Eye Aspect Ratio (EAR)')
+    plt.ylabel('Blink Rate (blinks/minute)')
+    plt.title('EAR vs Blink Rate')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    save_figure(folder, "ear_vs_blink_rate")
+    plt.close()
+    
+    avg_gaze = eye_df['gaze_score'].mean()
+    blink_stats = eye_df['blink_rate'].describe()
+    gaze_stats = eye_df['gaze_score'].describe()
+    ear_stats = eye_df['ear_value'].describe()
+    
+    summary = f"""
+DETAILED EYE TRACKING ANALYSIS SUMMARY
+======================================
+Session Date       : {session_date}
+Session Duration   : {session_duration:.1f} seconds
+
+1. Overall Metrics
+-------------------------------
+Overall Eye Attention: {avg_gaze:.1f}%
+
+2. Blink Rate Analysis
+-------------------------------
+Average: {blink_stats['mean']:.1f} blinks/minute
+Optimal Range (14-18): {((eye_df['blink_rate'] >= 14) & (eye_df['blink_rate'] <= 18)).mean()*100:.1f}% of samples
+Low Blink Rate (<8): {(eye_df['blink_rate'] < 8).mean()*100:.1f}% of samples
+High Blink Rate (>22): {(eye_df['blink_rate'] > 22).mean()*100:.1f}% of samples
+
+3. Gaze Concentration
+-------------------------------
+Average: {gaze_stats['mean']:.1f}%
+High Concentration (>80%): {(eye_df['gaze_score'] > 80).mean()*100:.1f}% of samples
+Low Concentration (<40%): {(eye_df['gaze_score'] < 40).mean()*100:.1f}% of samples
+
+4. Eye Aspect Ratio (EAR)
+-------------------------------
+Average: {ear_stats['mean']:.3f}
+Threshold: {ear_threshold:.3f}
+
+5. Recommendations
+-------------------------------
+{generate_eye_recommendations(eye_df, ear_threshold)}
+"""
+    with open(os.path.join(folder, "eye_analysis_summary.txt"), 'w') as f:
+        f.write(summary)
+
+
+def generate_eye_recommendations(eye_df, ear_threshold):
+    avg_blink = eye_df['blink_rate'].mean()
+    avg_gaze = eye_df['gaze_score'].mean()
+    
+    recommendations = []
+    
+    if avg_blink < 8:
+        recommendations.append("- Your blink rate is low, which may indicate intense focus but can lead to eye strain. Try to blink more consciously.")
+    elif avg_blink > 22:
+        recommendations.append("- Your blink rate is higher than average, which may indicate distraction or eye discomfort. Consider checking your environment for irritants.")
+    else:
+        recommendations.append("- Your blink rate is in the optimal range for maintaining good eye health and focus.")
+    
+    if avg_gaze < 40:
+        recommendations.append("- Your gaze concentration is low, suggesting frequent distractions. Try to minimize environmental distractions.")
+    elif avg_gaze > 80:
+        recommendations.append("- Your gaze concentration is excellent, but be mindful of taking regular breaks to prevent eye strain.")
+    
+    low_ear_frames = (eye_df['ear_value'] < ear_threshold).sum()
+    if low_ear_frames > len(eye_df) * 0.3:
+        recommendations.append("- You're showing signs of eye fatigue with frequent partial blinks. Consider following the 20-20-20 rule: every 20 minutes, look at something 20 feet away for 20 seconds.")
+    
+    return "\n".join(recommendations)
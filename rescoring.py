@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from session_store import ColumnarSessionStore
+
+# Mirrors the scalar rules in PostureAnalyzer, EyeTracker, NoiseDetector and process_frame
+DEFAULT_CONFIG = {
+    # PostureAnalyzer.determine_engagement / analyze_angles
+    'head_turn_threshold': 0.2,
+    'shoulder_turn_threshold': 0.15,
+    'head_tilt_threshold': 0.05,
+    'engaged_score': 100,
+    'distracted_score': 60,
+    'unknown_posture_score': 50,
+    # EyeTracker.calculate_attention_level
+    'gaze_steepness': 8,
+    'gaze_weight': 0.6,
+    'blink_weight': 0.25,
+    'ear_weight': 0.15,
+    'ear_low': 0.12,
+    'ear_high': 0.4,
+    'ear_scale': 0.23,
+    'gaze_high': 0.8,
+    'gaze_high_boost': 1.1,
+    'gaze_low': 0.3,
+    'gaze_low_penalty': 0.8,
+    'no_face_eye_score': 50,
+    # NoiseDetector.get_attention_level: below each threshold scores the matching entry
+    'noise_thresholds': [40, 50, 60, 65, 70],
+    'noise_scores': [100, 85, 60, 40, 20, 5],
+    'no_noise_score': 100,
+    # process_frame: posture, eye, face, noise
+    'weights': [0.25, 0.25, 0.25, 0.25]
+}
+
+RAW_FEATURES = ('head_turn', 'shoulder_turn', 'head_tilt', 'gaze_score', 'blink_rate', 'ear_value',
+                'noise_db', 'face_detected', 'face_attention')
+
+
+def make_config(overrides=None):
+    config = dict(DEFAULT_CONFIG)
+    for key, value in (overrides or {}).items():
+        if key not in config:
+            raise KeyError(f"Unknown scoring parameter: {key}")
+        config[key] = value
+    return config
+
+
+def posture_scores(head_turn, shoulder_turn, head_tilt, config=DEFAULT_CONFIG):
+    head_turn = np.asarray(head_turn, dtype=np.float64)
+    shoulder_turn = np.asarray(shoulder_turn, dtype=np.float64)
+    head_tilt = np.asarray(head_tilt, dtype=np.float64)
+    distracted = ((np.abs(head_turn) > config['head_turn_threshold']) |
+                  (np.abs(shoulder_turn) > config['shoulder_turn_threshold']) |
+                  (np.abs(head_tilt) > config['head_tilt_threshold']))
+    scores = np.where(distracted, config['distracted_score'], config['engaged_score']).astype(np.float64)
+    # Missing pose or degenerate geometry scores as unknown
+    known = np.isfinite(head_turn) & np.isfinite(shoulder_turn) & np.isfinite(head_tilt)
+    return np.where(known, scores, config['unknown_posture_score'])
+
+
+def blink_components(blink_rate):
+    blink_rate = np.asarray(blink_rate, dtype=np.float64)
+    # Same order as the elif chain; np.select takes the first matching band
+    conditions = [
+        blink_rate == 0,
+        (14 <= blink_rate) & (blink_rate <= 18),
+        (10 <= blink_rate) & (blink_rate <= 22),
+        ((8 <= blink_rate) & (blink_rate < 10)) | ((22 < blink_rate) & (blink_rate <= 28)),
+        ((6 <= blink_rate) & (blink_rate < 8)) | ((28 < blink_rate) & (blink_rate <= 35)),
+        blink_rate < 6
+    ]
+    choices = [0.5, 1.0, 0.9, 0.7, 0.4, 0.3]
+    return np.select(conditions, choices, default=np.maximum(0.1, 0.8 - (blink_rate - 35) / 20))
+
+
+def eye_attention_scores(gaze_score, blink_rate, ear_value, face_detected=None, config=DEFAULT_CONFIG):
+    # gaze_score is on the 0-1 scale used by EyeTracker, not the stored percentage
+    gaze = np.asarray(gaze_score, dtype=np.float64)
+    ear = np.asarray(ear_value, dtype=np.float64)
+    gaze_component = config['gaze_weight'] / (1 + np.exp(-config['gaze_steepness'] * (gaze - 0.5)))
+    blink_component = blink_components(blink_rate) * config['blink_weight']
+    normalized_ear = np.where(ear < config['ear_low'], 0.1,
+                              np.where(ear > config['ear_high'], 1.0, (ear - config['ear_low']) / config['ear_scale']))
+    attention = gaze_component + blink_component + normalized_ear * config['ear_weight']
+    attention = np.where(gaze > config['gaze_high'], np.minimum(1.0, attention * config['gaze_high_boost']),
+                         np.where(gaze < config['gaze_low'], attention * config['gaze_low_penalty'], attention))
+    scores = np.clip(attention, 0.0, 1.0) * 100
+    if face_detected is not None:
+        scores = np.where(np.asarray(face_detected, dtype=bool), scores, config['no_face_eye_score'])
+    return scores
+
+
+def noise_attention_scores(noise_db, config=DEFAULT_CONFIG):
+    noise_db = np.asarray(noise_db, dtype=np.float64)
+    bands = np.searchsorted(np.asarray(config['noise_thresholds'], dtype=np.float64), noise_db, side='right')
+    scores = np.asarray(config['noise_scores'], dtype=np.float64)[np.minimum(bands, len(config['noise_scores']) - 1)]
+    return np.where(np.isnan(noise_db), config['no_noise_score'], scores)
+
+
+def overall_scores(posture, eye_attention, face_attention, noise_attention, weights=DEFAULT_CONFIG['weights']):
+    # A NaN posture means the session had no posture source (classroom mode); those rows weigh
+    # eye, face and noise alone, renormalised, as the live score did
+    components = np.stack([posture, eye_attention, face_attention, noise_attention], axis=-1).astype(np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    with_posture = np.nan_to_num(components) @ weights
+    without_posture = components[..., 1:] @ (weights[1:] / weights[1:].sum())
+    return np.where(np.isnan(components[..., 0]), without_posture, with_posture)
+
+
+def rescore(features, config=None):
+    # features: mapping of column name -> array, e.g. ColumnarSessionStore.slice() or an np.load() archive
+    config = make_config(config)
+    missing = [name for name in RAW_FEATURES if name not in features]
+    if missing:
+        raise KeyError(f"Session has no raw feature columns: {', '.join(missing)}")
+
+    posture = posture_scores(features['head_turn'], features['shoulder_turn'], features['head_tilt'], config)
+    if 'posture' in features:
+        posture = np.where(np.isnan(np.asarray(features['posture'], dtype=np.float64)), np.nan, posture)
+    eye_attention = eye_attention_scores(np.asarray(features['gaze_score'], dtype=np.float64) / 100,
+                                         features['blink_rate'], features['ear_value'],
+                                         features['face_detected'], config)
+    face_attention = np.asarray(features['face_attention'], dtype=np.float64)
+    noise_attention = noise_attention_scores(features['noise_db'], config)
+    return {
+        'posture': posture,
+        'eye_attention': eye_attention,
+        'face_attention': face_attention,
+        'noise_attention': noise_attention,
+        'overall': overall_scores(posture, eye_attention, face_attention, noise_attention, config['weights'])
+    }
+
+
+def rescore_store(store, config=None):
+    return rescore(store.slice(), config)
+
+
+def find_archives(paths):
+    archives = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                if "session_features.npz" in files:
+                    archives.append(os.path.join(root, "session_features.npz"))
+        else:
+            archives.append(path)
+    return sorted(archives)
+
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore archived sessions with different thresholds and weights")
+    parser.add_argument("paths", nargs="+", help="session_features.npz files or folders to search")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a scoring parameter, e.g. head_turn_threshold=0.25")
+    parser.add_argument("--weights", type=float, nargs=4, metavar=("POSTURE", "EYE", "FACE", "NOISE"))
+    parser.add_argument("--json", help="Write per-session results to this file")
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = parse_value(value)
+    if args.weights:
+        overrides['weights'] = args.weights
+    config = make_config(overrides)
+
+    start = time.perf_counter()
+    results = []
+    samples = 0
+    for path in find_archives(args.paths):
+        store = ColumnarSessionStore.load_npz(path)
+        try:
+            scores = rescore_store(store, config)
+        except KeyError as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        samples += len(store)
+        results.append({
+            'path': path,
+            'samples': len(store),
+            'stored_overall': float(store['overall'].mean()) if len(store) else 0.0,
+            'rescored_overall': float(scores['overall'].mean()) if len(store) else 0.0,
+            # None for classroom sessions, which have no posture
+            'posture': float(np.nanmean(scores['posture'])) if np.isfinite(scores['posture']).any() else None,
+            'eye_attention': float(scores['eye_attention'].mean()) if len(store) else 0.0,
+            'noise_attention': float(scores['noise_attention'].mean()) if len(store) else 0.0
+        })
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        print(f"{result['path']}: {result['samples']} samples, overall "
+              f"{result['stored_overall']:.1f}% -> {result['rescored_overall']:.1f}%")
+    print(f"Rescored {len(results)} sessions ({samples} samples) in {elapsed:.2f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, 'sessions': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
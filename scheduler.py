@@ -0,0 +1,100 @@
+import threading
+import time
+
+# Target rate (Hz), latency budget (s) and the slowest rate back-off may reach, per analysis stage
+DEFAULT_STAGES = {
+    'face_mesh': (15.0, 0.030, 2.0),
+    'pose': (5.0, 0.040, 1.0),
+    'emotion': (0.5, 0.400, 0.1)
+}
+
+
+class StageSchedule:
+    def __init__(self, name, rate, budget, min_rate, adaptive=True, smoothing=0.3):
+        self.name = name
+        self.target_rate = rate
+        self.budget = budget
+        self.min_rate = min(min_rate, rate)
+        self.adaptive = adaptive
+        self.smoothing = smoothing
+        self.rate = rate
+        self.latency = None  # Exponentially smoothed, so one slow call does not halve the rate
+        self.next_due = 0.0
+        self.runs = 0
+        self.over_budget = 0
+
+    def due(self, now):
+        return now >= self.next_due
+
+    def record(self, now, latency):
+        self.runs += 1
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        if latency > self.budget:
+            self.over_budget += 1
+
+        if self.adaptive:
+            # Multiplicative back-off while over budget, gentler catch-up once there is headroom
+            if self.latency > self.budget:
+                self.rate = max(self.min_rate, self.rate * 0.75)
+            elif self.latency < self.budget * 0.6:
+                self.rate = min(self.target_rate, self.rate * 1.1)
+        # Spaced from when the stage ran, not when it was due, so a late stage never runs twice in a row
+        self.next_due = now + 1.0 / self.rate
+
+    def reset(self):
+        self.rate = self.target_rate
+        self.latency = None
+        self.next_due = 0.0
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'target_rate': self.target_rate,
+            'budget': self.budget,
+            'latency': self.latency,
+            'runs': self.runs,
+            'over_budget': self.over_budget
+        }
+
+
+class AnalysisScheduler:
+    # Decides, per frame, which analysis stages are due. Times are session seconds (wall clock
+    # live, media time offline); latencies are always measured wall time.
+    def __init__(self, stages=None, adaptive=True):
+        config = dict(DEFAULT_STAGES)
+        config.update(stages or {})
+        self.stages = {
+            name: StageSchedule(name, rate, budget, min_rate, adaptive)
+            for name, (rate, budget, min_rate) in config.items()
+        }
+        self.lock = threading.Lock()
+
+    def due(self, name, now):
+        return self.stages[name].due(now)
+
+    def any_due(self, now, names=('face_mesh', 'pose')):
+        return any(self.stages[name].due(now) for name in names)
+
+    def record(self, name, now, latency):
+        # Pose may finish on the inference pool while face mesh records on the calling thread
+        with self.lock:
+            self.stages[name].record(now, latency)
+
+    def run(self, name, now, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.record(name, now, time.perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            for stage in self.stages.values():
+                stage.reset()
+
+    def stats(self):
+        with self.lock:
+            return {name: stage.stats() for name, stage in self.stages.items()}
@@ -0,0 +1,156 @@
+import threading
+import time
+
+
+class SessionLimitError(Exception):
+    pass
+
+
+class TrackingSession:
+    def __init__(self, student_id, session_id):
+        self.student_id = student_id
+        self.session_id = session_id
+        self.analyzer = None
+        self.pipeline = None
+        self.lock = threading.RLock()
+        self.created_at = time.time()
+        self.last_access = self.created_at
+
+    @property
+    def key(self):
+        return (self.student_id, self.session_id)
+
+    @property
+    def is_tracking(self):
+        return bool(self.analyzer and self.analyzer.is_tracking)
+
+    def touch(self):
+        self.last_access = time.time()
+
+
+class SessionRegistry:
+    def __init__(self, analyzer_factory, session_closer, max_sessions=30, idle_timeout=900, eviction_interval=30):
+        self.analyzer_factory = analyzer_factory
+        self.session_closer = session_closer
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.eviction_interval = eviction_interval
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._eviction_thread = None
+
+    def __len__(self):
+        with self.lock:
+            return len(self.sessions)
+
+    def create(self, student_id, session_id):
+        key = (student_id, session_id)
+        with self.lock:
+            existing = self.sessions.get(key)
+            if existing is not None:
+                existing.touch()
+                return existing, False
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionLimitError(f"Session limit reached ({self.max_sessions} concurrent sessions)")
+            # Reserve the slot and hold the session lock so the slow analyzer
+            # construction below does not block the whole registry.
+            session = TrackingSession(student_id, session_id)
+            session.lock.acquire()
+            self.sessions[key] = session
+
+        try:
+            session.analyzer = self.analyzer_factory(student_id, session_id)
+        except Exception:
+            self.discard(session)
+            raise
+        finally:
+            session.lock.release()
+        return session, True
+
+    def discard(self, session):
+        # Drops a session that never got an analyzer; callers that raced its creation are
+        # handed the reserved session and find analyzer still None once they get its lock
+        with self.lock:
+            if self.sessions.get(session.key) is session:
+                del self.sessions[session.key]
+
+    def register(self, student_id, session_id, analyzer):
+        # For analyzers built elsewhere, e.g. the per-student views of a classroom session
+        key = (student_id, session_id)
+        with self.lock:
+            if key in self.sessions:
+                raise ValueError(f"Session already exists: {student_id}/{session_id}")
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionLimitError(f"Session limit reached ({self.max_sessions} concurrent sessions)")
+            session = TrackingSession(student_id, session_id)
+            session.analyzer = analyzer
+            self.sessions[key] = session
+        return session
+
+    def get(self, student_id, session_id=None):
+        with self.lock:
+            if session_id is not None:
+                session = self.sessions.get((student_id, session_id))
+            else:
+                # Without a session id, use the student's most recent session
+                candidates = [s for s in self.sessions.values() if s.student_id == student_id]
+                session = max(candidates, key=lambda s: s.created_at) if candidates else None
+        if session is not None:
+            session.touch()
+        return session
+
+    def remove(self, student_id, session_id=None):
+        session = self.get(student_id, session_id)
+        if session is None:
+            return None
+        with self.lock:
+            if self.sessions.get(session.key) is not session:
+                return None
+            del self.sessions[session.key]
+        self.close(session)
+        return session
+
+    def close(self, session):
+        with session.lock:
+            if session.analyzer is not None:
+                self.session_closer(session)
+
+    def list_sessions(self):
+        with self.lock:
+            return list(self.sessions.values())
+
+    def evict_idle(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            # A running session may have nobody polling it (SSE-only viewers, or just recording);
+            # only paused or never-started sessions count as abandoned
+            expired = [
+                s for s in self.sessions.values()
+                if not s.is_tracking and now - s.last_access > self.idle_timeout
+            ]
+            for session in expired:
+                del self.sessions[session.key]
+
+        for session in expired:
+            print(f"Evicting idle session {session.student_id}/{session.session_id}")
+            try:
+                self.close(session)
+            except Exception as e:
+                print(f"Error closing session {session.student_id}/{session.session_id}: {e}")
+        return [s.key for s in expired]
+
+    def start_eviction(self):
+        if self._eviction_thread is not None:
+            return
+        self._eviction_thread = threading.Thread(target=self._eviction_loop, daemon=True)
+        self._eviction_thread.start()
+
+    def _eviction_loop(self):
+        while not self._stop_event.wait(self.eviction_interval):
+            self.evict_idle()
+
+    def shutdown(self):
+        self._stop_event.set()
+        for session in self.list_sessions():
+            self.remove(session.student_id, session.session_id)
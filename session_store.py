@@ -0,0 +1,228 @@
+import threading
+
+import numpy as np
+
+EMOTIONS = ("neutral", "happy", "surprise", "fear", "sad", "angry", "disgust")
+
+SAMPLE_COLUMNS = (
+    ('timestamp', np.float64),
+    ('posture', np.float32),
+    ('eye_attention', np.float32),
+    ('face_attention', np.float32),
+    ('noise_attention', np.float32),
+    ('overall', np.float32),
+    ('emotion', 'category'),
+    ('gaze_score', np.float32),
+    ('blink_rate', np.float32),
+    ('ear_value', np.float32),
+    # Raw features kept so archived sessions can be rescored without replaying video.
+    # NaN marks a missing measurement (no pose detected, no noise reading yet).
+    ('head_turn', np.float32),
+    ('shoulder_turn', np.float32),
+    ('head_tilt', np.float32),
+    ('noise_db', np.float32),
+    ('face_detected', np.bool_)
+)
+
+class ColumnarSessionStore:
+    def __init__(self, columns=SAMPLE_COLUMNS, categories=None, capacity=1024):
+        self.columns = tuple(name for name, _ in columns)
+        self.dtypes = {}
+        # Categorical columns are stored as small-int codes into a per-column label list
+        self.categories = {}
+        for name, dtype in columns:
+            if dtype == 'category':
+                self.dtypes[name] = np.int8
+                labels = (categories or {}).get(name, EMOTIONS if name == 'emotion' else ())
+                self.categories[name] = list(labels)
+            else:
+                self.dtypes[name] = np.dtype(dtype)
+        self.missing = {
+            name: np.nan if self.dtypes[name].kind == 'f' else 0
+            for name in self.columns if name not in self.categories
+        }
+        self.capacity = max(1, capacity)
+        self.arrays = {name: np.zeros(self.capacity, dtype=self.dtypes[name]) for name in self.columns}
+        self.length = 0
+        # Bumped by clear() so cursors handed out before a reset are recognised as stale
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['arrays'] = {name: array[:self.length].copy() for name, array in self.arrays.items()}
+        state['capacity'] = max(1, self.length)
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        if name in self.categories:
+            return self.labels(name)
+        return self.column(name)
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name in self.columns:
+            grown = np.zeros(capacity, dtype=self.dtypes[name])
+            grown[:self.length] = self.arrays[name][:self.length]
+            self.arrays[name] = grown
+        self.capacity = capacity
+
+    def _encode(self, name, label):
+        labels = self.categories[name]
+        try:
+            return labels.index(label)
+        except ValueError:
+            labels.append(label)
+            return len(labels) - 1
+
+    def append(self, **values):
+        with self.lock:
+            if self.length >= self.capacity:
+                self._grow(self.length + 1)
+            index = self.length
+            written = 0
+            # Every column is written, so a row never inherits zeros or values from before clear().
+            # Columns left out are missing: NaN for floats, False for flags; categories are required.
+            for name in self.columns:
+                if name in values:
+                    value = values[name]
+                    written += 1
+                elif name in self.missing:
+                    value = self.missing[name]
+                else:
+                    raise KeyError(f"Missing value for column {name!r}")
+                if name in self.categories:
+                    value = self._encode(name, value)
+                self.arrays[name][index] = value
+            if written != len(values):
+                raise KeyError(f"Unknown columns: {sorted(set(values) - set(self.columns))}")
+            # Publish the row only once every column is written
+            self.length = index + 1
+
+    def extend(self, other):
+        with self.lock:
+            count = len(other)
+            if self.length + count > self.capacity:
+                self._grow(self.length + count)
+            for name in self.columns:
+                source = other.arrays[name][:count]
+                if name in self.categories:
+                    mapping = np.array([self._encode(name, label) for label in other.categories[name]] or [0], dtype=np.int8)
+                    source = mapping[source]
+                self.arrays[name][self.length:self.length + count] = source
+            self.length += count
+
+    def clear(self):
+        with self.lock:
+            self.length = 0
+            self.generation += 1
+
+    def cursor(self):
+        return f"{self.generation}:{self.length}"
+
+    def since(self, cursor=None, step=1):
+        if step < 1:
+            raise ValueError("step must be a positive integer")
+        generation, stop = self.generation, self.length
+        start, reset = 0, False
+        if cursor:
+            cursor_generation, _, cursor_index = str(cursor).partition(":")
+            cursor_generation, cursor_index = int(cursor_generation), int(cursor_index)
+            if cursor_generation == generation and 0 <= cursor_index <= stop:
+                start = cursor_index
+            else:
+                reset = True
+        return self.to_dict(start, stop, step), f"{generation}:{stop}", reset
+
+    def column(self, name, start=0, stop=None, step=1):
+        stop = self.length if stop is None else min(stop, self.length)
+        return self.arrays[name][start:stop:step]
+
+    def labels(self, name, start=0, stop=None, step=1):
+        lookup = np.array(self.categories[name], dtype=object)
+        return lookup[self.column(name, start, stop, step)]
+
+    def last(self, name, default=None):
+        if self.length == 0:
+            return default
+        value = self.arrays[name][self.length - 1]
+        if name in self.categories:
+            return self.categories[name][value]
+        return value.item()
+
+    def slice(self, start=0, stop=None, step=1):
+        return {name: self.column(name, start, stop, step) for name in self.columns}
+
+    def to_dict(self, start=0, stop=None, step=1):
+        result = {}
+        for name in self.columns:
+            if name in self.categories:
+                result[name] = self.labels(name, start, stop, step).tolist()
+            else:
+                values = self.column(name, start, stop, step)
+                if values.dtype.kind == 'f' and np.isnan(values).any():
+                    # NaN is not valid JSON
+                    result[name] = [None if np.isnan(v) else v for v in values.tolist()]
+                else:
+                    result[name] = values.tolist()
+        return result
+
+    def to_pandas(self, start=0, stop=None):
+        import pandas as pd
+
+        data = {}
+        for name in self.columns:
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(self.column(name, start, stop), self.categories[name])
+            else:
+                data[name] = self.column(name, start, stop)
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self, start=0, stop=None):
+        import pyarrow as pa
+
+        arrays = []
+        for name in self.columns:
+            if name in self.categories:
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(self.column(name, start, stop)), pa.array(self.categories[name])
+                ))
+            else:
+                arrays.append(pa.array(self.column(name, start, stop)))
+        return pa.Table.from_arrays(arrays, names=list(self.columns))
+
+    def save_npz(self, path):
+        arrays = dict(self.slice())
+        for name, labels in self.categories.items():
+            arrays[f"{name}__labels"] = np.array(labels, dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load_npz(cls, path):
+        with np.load(path) as archive:
+            names = [name for name in archive.files if not name.endswith("__labels")]
+            categories = {name[:-len("__labels")]: archive[name].tolist()
+                          for name in archive.files if name.endswith("__labels")}
+            columns = tuple((name, 'category' if name in categories else archive[name].dtype) for name in names)
+            store = cls(columns, categories, capacity=len(archive[names[0]]) if names else 1)
+            for name in names:
+                store.arrays[name][:len(archive[name])] = archive[name]
+            store.length = len(archive[names[0]]) if names else 0
+        return store
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
@@ -0,0 +1,78 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import classroom
+from classroom import ClassroomAnalyzer
+
+
+class ReplayFaceMesh:
+    def __init__(self, results):
+        self.results = iter(results)
+
+    def process(self, image):
+        return next(self.results)
+
+    def close(self):
+        pass
+
+
+def frames_with_faces(count, centers, rng):
+    results = []
+    for _ in range(count):
+        faces = []
+        for center in centers:
+            points = np.asarray(center) + rng.uniform(-0.03, 0.03, size=(478, 2))
+            faces.append(SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=0.0) for x, y in points]))
+        results.append(SimpleNamespace(multi_face_landmarks=faces or None))
+    return results
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_seated_students_resume_and_unseated_tracks_are_closed(tmp_path, monkeypatch):
+    # The Haar cascade is only a fallback for sessions without face mesh
+    monkeypatch.setattr(classroom, "create_face_cascade", object)
+    rng = np.random.default_rng(0)
+    seats = [(0.3, 0.5), (0.7, 0.5)]
+    # Both faces leave for longer than the tracker's max_missed, then come back
+    phases = [frames_with_faces(5, seats, rng), frames_with_faces(35, [], rng), frames_with_faces(5, seats, rng)]
+    lost = []
+    analyzer = ClassroomAnalyzer(
+        "room", "a", max_faces=2, seats={"alice": seats[0]}, live=False, output_folder=str(tmp_path),
+        face_mesh=ReplayFaceMesh([result for phase in phases for result in phase]),
+        classify=lambda face_roi: "happy", on_student_lost=lost.append
+    )
+    analyzer.is_tracking = True
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    timestamps = iter(i / 10 for i in range(sum(len(phase) for phase in phases)))
+
+    def replay(phase):
+        for _ in phase:
+            analyzer.process_frame(frame, draw_overlay=False, timestamp=next(timestamps))
+
+    replay(phases[0])
+    students = {s.student_id: s for s in analyzer.tracks.values()}
+    assert set(students) == {"alice", "room-02"}
+    alice, other = students["alice"], students["room-02"]
+
+    replay(phases[1])
+    assert analyzer.tracks == {}
+    assert analyzer.away == {"alice": alice} and not alice.active and not alice.stopped
+    # Dropped unseated tracks are finished off the frame thread
+    wait_for(lambda: lost == [other])
+    assert other.stopped
+    assert (tmp_path / "room-02" / "session_features.npz").exists()
+
+    replay(phases[2])
+    students = {s.student_id: s for s in analyzer.tracks.values()}
+    # Back in their seat, alice resumes the same session; the other face is a new student
+    assert students["alice"] is alice and alice.active
+    assert len(students) == 2 and "room-02" not in students
+    analyzer.stop()
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+
+from firebase_writer import FirebaseWriter, LocalRealtimeDatabase, replay_spools
+
+PATH = "students/s1/sessions/a/data"
+
+
+def make_writer(database, spool_path, path=PATH, **kwargs):
+    kwargs.setdefault("flush_interval", 0.5)
+    kwargs.setdefault("max_retries", 1)
+    kwargs.setdefault("backoff", 0.01)
+    return FirebaseWriter(path, spool_path=str(spool_path), reference=database.reference, **kwargs)
+
+
+def read_spool(spool_path):
+    with open(spool_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_samples_are_coalesced_into_batched_updates(tmp_path):
+    database = LocalRealtimeDatabase()
+    writer = make_writer(database, tmp_path / "a.jsonl", batch_size=50)
+    for i in range(120):
+        writer.submit({'timestamp': i, 'overall_attention': 50.0})
+    writer.close()
+
+    stored = database.get(PATH)
+    assert sorted(v['timestamp'] for v in stored.values()) == list(range(120))
+    assert database.update_calls == 3
+    assert writer.metrics()['batches'] == 3
+
+
+def test_offline_samples_are_spooled_with_their_path(tmp_path):
+    database = LocalRealtimeDatabase()
+    database.online = False
+    spool_path = tmp_path / "a.jsonl"
+    writer = make_writer(database, spool_path)
+    for i in range(10):
+        writer.submit({'timestamp': i})
+    writer.close()
+
+    assert database.get(PATH) is None
+    entries = read_spool(spool_path)
+    assert [entry['data']['timestamp'] for entry in entries] == list(range(10))
+    assert {entry['path'] for entry in entries} == {PATH}
+    assert writer.metrics()['spooled'] == 10
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_spool_is_replayed_when_the_writer_reconnects(tmp_path):
+    database = LocalRealtimeDatabase()
+    database.online = False
+    spool_path = tmp_path / "a.jsonl"
+    writer = make_writer(database, spool_path, flush_interval=0.05)
+    for i in range(5):
+        writer.submit({'timestamp': i})
+    wait_for(lambda: os.path.exists(spool_path))
+
+    database.online = True
+    wait_for(lambda: not os.path.exists(spool_path))
+    writer.submit({'timestamp': 5})
+    writer.close()
+
+    assert sorted(v['timestamp'] for v in database.get(PATH).values()) == list(range(6))
+    assert writer.metrics()['replayed'] == 5
+
+
+def test_orphaned_spool_is_replayed_by_another_writer(tmp_path):
+    database = LocalRealtimeDatabase()
+    database.online = False
+    closed = make_writer(database, tmp_path / "closed.jsonl")
+    for i in range(3):
+        closed.submit({'timestamp': i})
+    closed.close()
+    assert os.path.exists(tmp_path / "closed.jsonl")
+
+    database.online = True
+    other_path = "students/s2/sessions/b/data"
+    writer = make_writer(database, tmp_path / "other.jsonl", path=other_path)
+    writer.submit({'timestamp': 100})
+    writer.close()
+
+    assert sorted(v['timestamp'] for v in database.get(PATH).values()) == [0, 1, 2]
+    assert [v['timestamp'] for v in database.get(other_path).values()] == [100]
+    assert not os.path.exists(tmp_path / "closed.jsonl")
+
+
+def test_leftover_spools_are_replayed_at_startup(tmp_path):
+    database = LocalRealtimeDatabase()
+    database.online = False
+    writer = make_writer(database, tmp_path / "a.jsonl")
+    for i in range(4):
+        writer.submit({'timestamp': i})
+    writer.close()
+
+    database.online = True
+    assert replay_spools(str(tmp_path), reference=database.reference) == 4
+    assert sorted(v['timestamp'] for v in database.get(PATH).values()) == [0, 1, 2, 3]
+    assert os.listdir(tmp_path) == []
+
+
+def test_startup_replay_keeps_the_spool_while_still_offline(tmp_path):
+    database = LocalRealtimeDatabase()
+    database.online = False
+    writer = make_writer(database, tmp_path / "a.jsonl")
+    writer.submit({'timestamp': 0})
+    writer.close()
+
+    assert replay_spools(str(tmp_path), reference=database.reference) == 0
+    assert len(read_spool(tmp_path / "a.jsonl")) == 1
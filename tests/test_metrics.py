@@ -0,0 +1,18 @@
+from metrics import SessionMetrics
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = SessionMetrics(enabled=False)
+    metrics.observe('jpeg_encode', 0.01)
+    metrics.count('frames')
+    metrics.timer().done('inference')
+
+    assert metrics.histograms == {}
+    assert metrics.counters == {}
+
+
+def test_enabled_metrics_record_direct_observations():
+    metrics = SessionMetrics()
+    metrics.observe('jpeg_encode', 0.01)
+
+    assert metrics.histograms['jpeg_encode'].count == 1
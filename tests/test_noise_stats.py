@@ -0,0 +1,32 @@
+import pytest
+
+from noise_stats import NoiseStatistics
+
+
+def test_hop_levels_are_weighted_by_their_duration():
+    stats = NoiseStatistics(segment_seconds=20, threshold_db=55)
+    for i in range(200):
+        timestamp = i * 0.05
+        # A 100 ms burst between two 1 Hz samples
+        stats.add(timestamp, 80.0 if 4.5 <= timestamp < 4.6 else 40.0, 70.0, duration=0.05)
+    summary = stats.summary()
+
+    assert summary['peak_db'] == 80.0
+    assert summary['seconds'] == pytest.approx(10.0)
+    assert summary['seconds_above'] == pytest.approx(0.1)
+
+
+def test_merged_segments_match_a_single_pass():
+    whole = NoiseStatistics()
+    first, second = NoiseStatistics(), NoiseStatistics()
+    for i in range(80):
+        timestamp = i * 0.5
+        db, attention = 45.0 + (i % 7) * 3, 90.0 - (i % 7) * 4
+        whole.add(timestamp, db, attention, duration=0.5)
+        (first if timestamp < 20 else second).add(timestamp, db, attention, duration=0.5)
+    first.merge(second)
+
+    merged, expected = first.summary(), whole.summary()
+    for key in ('samples', 'seconds', 'mean_db', 'peak_db', 'seconds_above', 'mean_attention'):
+        assert merged[key] == pytest.approx(expected[key])
+    assert merged['correlation'] == pytest.approx(expected['correlation'])
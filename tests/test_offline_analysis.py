@@ -0,0 +1,34 @@
+import math
+
+import pytest
+
+from offline_analysis import plan_segments
+
+
+@pytest.mark.parametrize("fps", [29.97, 30.0, 25.0, 23.976, 59.94])
+def test_segments_start_on_interval_boundaries(fps):
+    frame_count = int(10 * 60 * fps) + 7
+    segments = plan_segments(frame_count, fps, 60)
+
+    assert segments[0][0] == 0
+    assert segments[-1][1] == frame_count
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end == start
+
+    for k, (start, _) in enumerate(segments):
+        boundary = k * 60
+        # First frame at or after the boundary, so the worker's interval start is the boundary itself
+        assert start / fps >= boundary - 1e-9
+        assert start == 0 or (start - 1) / fps < boundary
+        assert math.floor(start / fps / 10.0) * 10 == boundary
+
+
+def test_segment_length_rounds_up_to_whole_intervals():
+    # 25 s becomes 30 s segments; at 29.97 fps their boundaries fall between frames
+    assert plan_segments(900, 29.97, 25) == [(0, 900)]
+    segments = plan_segments(3000, 29.97, 25)
+    assert [start for start, _ in segments] == [0, 900, 1799, 2698]
+
+
+def test_empty_video_has_no_segments():
+    assert plan_segments(0, 29.97, 60) == []
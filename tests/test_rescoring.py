@@ -0,0 +1,73 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import classroom
+from classroom import ClassroomAnalyzer
+from rescoring import rescore_store
+from session_store import ColumnarSessionStore
+
+
+class ReplayFaceMesh:
+    def __init__(self, results):
+        self.results = iter(results)
+
+    def process(self, image):
+        return next(self.results)
+
+    def close(self):
+        pass
+
+
+def face_results(frames, seats, rng):
+    results = []
+    for _ in range(frames):
+        faces = []
+        for seat in seats:
+            points = seat + rng.uniform(-0.03, 0.03, size=(478, 2))
+            faces.append(SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=0.0) for x, y in points]))
+        results.append(SimpleNamespace(multi_face_landmarks=faces))
+    return results
+
+
+def test_classroom_archive_rescores_to_the_live_overall(tmp_path, monkeypatch):
+    # The Haar cascade is only a fallback for sessions without face mesh
+    monkeypatch.setattr(classroom, "create_face_cascade", object)
+    rng = np.random.default_rng(0)
+    frames = 80
+    analyzer = ClassroomAnalyzer(
+        "room", "a", max_faces=2, live=False, output_folder=str(tmp_path),
+        face_mesh=ReplayFaceMesh(face_results(frames, np.array([[0.3, 0.5], [0.7, 0.5]]), rng)),
+        classify=lambda face_roi: "sad", emotion_interval=1.0
+    )
+    analyzer.is_tracking = True
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    for i in range(frames):
+        analyzer.process_frame(frame, draw_overlay=False, timestamp=i / 10)
+    analyzer.stop()
+
+    assert {"room-01", "room-02"} <= set(os.listdir(tmp_path))
+    for student_id in ("room-01", "room-02"):
+        store = ColumnarSessionStore.load_npz(str(tmp_path / student_id / "session_features.npz"))
+        assert len(store) >= 5
+        assert np.isnan(store['posture']).all()
+        assert np.isnan(store['head_turn']).all()
+
+        scores = rescore_store(store)
+        assert np.isnan(scores['posture']).all()
+        np.testing.assert_allclose(scores['overall'], store['overall'], atol=0.05)
+        np.testing.assert_allclose(scores['eye_attention'], store['eye_attention'], atol=0.05)
+
+
+def test_sessions_with_posture_keep_the_four_way_weighting():
+    store = ColumnarSessionStore()
+    store.append(timestamp=1.0, posture=100.0, eye_attention=80.0, face_attention=90.0, noise_attention=100.0,
+                 overall=92.5, emotion="neutral", gaze_score=50.0, blink_rate=16.0, ear_value=0.3,
+                 head_turn=0.0, shoulder_turn=0.0, head_tilt=0.0, noise_db=np.nan, face_detected=True)
+    scores = rescore_store(store)
+
+    assert scores['posture'][0] == pytest.approx(100.0)
+    expected = (100.0 + scores['eye_attention'][0] + 90.0 + 100.0) / 4
+    assert scores['overall'][0] == pytest.approx(expected)
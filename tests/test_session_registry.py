@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from session_registry import SessionRegistry
+
+
+def test_caller_racing_a_failed_create_sees_no_analyzer():
+    building = threading.Event()
+    release = threading.Event()
+
+    def failing_factory(student_id, session_id):
+        building.set()
+        release.wait(5)
+        raise RuntimeError("models unavailable")
+
+    registry = SessionRegistry(failing_factory, lambda session: None)
+    errors = []
+
+    def create():
+        try:
+            registry.create("s1", "a")
+        except RuntimeError as e:
+            errors.append(e)
+
+    creator = threading.Thread(target=create)
+    creator.start()
+    building.wait(5)
+    session, created = registry.create("s1", "a")
+    assert not created
+    release.set()
+    creator.join(5)
+
+    with session.lock:
+        assert session.analyzer is None
+    assert errors and len(registry) == 0
+    registry.discard(session)
+    assert len(registry) == 0
+
+
+def test_idle_tracking_sessions_are_not_evicted():
+    class Analyzer:
+        is_tracking = True
+
+        def stop(self):
+            pass
+
+    registry = SessionRegistry(lambda student_id, session_id: Analyzer(), lambda session: None, idle_timeout=10)
+    tracking, _ = registry.create("s1", "a")
+    paused, _ = registry.create("s2", "a")
+    paused.analyzer.is_tracking = False
+
+    assert registry.evict_idle(now=tracking.last_access + 60) == [("s2", "a")]
+    assert registry.get("s1", "a") is tracking
+    with pytest.raises(ValueError):
+        registry.register("s1", "a", Analyzer())
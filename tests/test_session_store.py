@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from session_store import ColumnarSessionStore
+
+
+def test_missing_columns_are_stored_as_missing_not_zero():
+    store = ColumnarSessionStore()
+    store.append(timestamp=1.0, overall=70.0, emotion="happy", face_detected=True)
+
+    assert store.last('overall') == pytest.approx(70.0)
+    for name in ('posture', 'head_turn', 'shoulder_turn', 'head_tilt', 'noise_db'):
+        assert np.isnan(store.last(name))
+    assert store.to_dict()['head_turn'] == [None]
+
+
+def test_rows_after_clear_do_not_inherit_old_values():
+    store = ColumnarSessionStore()
+    store.append(timestamp=1.0, posture=80.0, head_turn=5.0, emotion="sad", face_detected=True)
+    store.clear()
+    store.append(timestamp=2.0, emotion="neutral")
+
+    assert np.isnan(store.last('posture'))
+    assert np.isnan(store.last('head_turn'))
+    assert store.last('face_detected') is False
+
+
+def test_unknown_and_missing_category_columns_raise():
+    store = ColumnarSessionStore()
+    with pytest.raises(KeyError):
+        store.append(timestamp=1.0, emotion="neutral", posture_score=50.0)
+    with pytest.raises(KeyError):
+        store.append(timestamp=1.0)
+    assert len(store) == 0